@@ -1,6 +1,12 @@
 # makes this a package
+import asyncio
+
 class LlmAgent:
     """A base class for agents that primarily use an LLM for complex, non-tool-based tasks."""
     def run(self, input: dict) -> dict:
         # This base method is designed to be overridden by child agents like WorkflowAgent.
-        raise NotImplementedError("Each LlmAgent must implement its own run method.")
\ No newline at end of file
+        raise NotImplementedError("Each LlmAgent must implement its own run method.")
+
+    async def arun(self, input: dict) -> dict:
+        # Child agents can override this with a native coroutine; by default run in a thread.
+        return await asyncio.to_thread(self.run, input)
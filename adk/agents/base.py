@@ -1,15 +1,90 @@
 # adk/agents/base.py
 
-from typing import Callable
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from utils.resilience import current_policy
 
 class ToolAgent:
-    def __init__(self, name: str, description: str, tool: Callable):
+    def __init__(self, name: str, description: str, tool: Callable,
+                 atool: Optional[Callable[[dict], Awaitable[dict]]] = None,
+                 cache_key_params: Optional[dict] = None,
+                 astream_tool: Optional[Callable[[dict], AsyncIterator[dict]]] = None):
         self.name = name
         self.description = description
         self.tool = tool  # this is a callable utility function
+        self.atool = atool  # optional native coroutine version of `tool`
+        self.astream_tool = astream_tool  # optional async generator of streaming events
+        # Prompt version / model params that make a cached response reusable
+        self.cache_key_params = cache_key_params or {}
+        # Optional response cache layer (see utils.response_cache), attached by the agent loader
+        self.response_cache = None
+        # Optional deadline/retry/hedging policy (see utils.resilience), attached by the agent loader
+        self.resilience = None
 
     def run(self, input_data: dict) -> dict:
-        return self.tool(input_data)
+        if self.response_cache is not None:
+            return self.response_cache.call(input_data, self._run_tool)
+        return self._run_tool(input_data)
+
+    async def arun(self, input_data: dict) -> dict:
+        """Async counterpart of `run`. Tools without an async version run in a worker thread."""
+        if self.response_cache is not None:
+            return await self.response_cache.acall(input_data, self._arun_tool)
+        return await self._arun_tool(input_data)
+
+    async def astream(self, input_data: dict) -> AsyncIterator[dict]:
+        """
+        Yields streaming events ({"event": ..., "data": ...}) ending with a
+        "result" (or "error") event. Tools without a streaming version yield
+        only the final result.
+        """
+        if self.response_cache is not None:
+            cached = self.response_cache.peek(input_data)
+            if cached is not None:
+                yield {"event": "result", "data": cached}
+                return
+
+        if self.astream_tool is None:
+            yield {"event": "result", "data": await self.arun(input_data)}
+            return
+
+        policy = self._policy()
+        events = policy.astream(self.astream_tool, input_data) if policy else self.astream_tool(input_data)
+        try:
+            async for event in events:
+                if event["event"] == "result" and self.response_cache is not None:
+                    self.response_cache.remember(input_data, event["data"])
+                yield event
+        except TimeoutError as e:
+            yield {"event": "error", "data": str(e)}
+
+    def _policy(self):
+        # Under an enclosing policy (e.g. a workflow step's) the agent's own one is skipped
+        return self.resilience if current_policy() is None else None
+
+    def _run_tool(self, input_data: dict) -> dict:
+        policy = self._policy()
+        if policy is None:
+            return self.tool(input_data)
+        try:
+            return policy.call(self.tool, input_data)
+        except TimeoutError as e:
+            return {"error": str(e)}
+
+    async def _arun_tool(self, input_data: dict) -> dict:
+        policy = self._policy()
+        if policy is None:
+            return await self._acall_tool(input_data)
+        try:
+            return await policy.acall(self._acall_tool, input_data)
+        except TimeoutError as e:
+            return {"error": str(e)}
+
+    async def _acall_tool(self, input_data: dict) -> dict:
+        if self.atool is not None:
+            return await self.atool(input_data)
+        return await asyncio.to_thread(self.tool, input_data)
 
 
 class LlmAgent:
@@ -23,3 +98,11 @@ class LlmAgent:
         prompt = self.prompt_template.format(**input_data)
         output = self.model(prompt)
         return {"output": output}
+
+    async def arun(self, input_data: dict) -> dict:
+        prompt = self.prompt_template.format(**input_data)
+        if asyncio.iscoroutinefunction(self.model):
+            output = await self.model(prompt)
+        else:
+            output = await asyncio.to_thread(self.model, prompt)
+        return {"output": output}
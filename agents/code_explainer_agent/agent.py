@@ -4,12 +4,16 @@ import os
 sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 
 from adk.agents import ToolAgent
-from .tool import tool
+from .tool import tool, atool, astream_tool, MODEL_PARAMS
+from .prompt import PROMPT_VERSION
 
 agent = ToolAgent(
     name="code_explainer_agent",
     description="Explains code step-by-step with summaries and recommendations.",
-    tool=tool
+    tool=tool,
+    atool=atool,
+    astream_tool=astream_tool,
+    cache_key_params={"prompt_version": PROMPT_VERSION, **MODEL_PARAMS}
 )
 
 
@@ -1,5 +1,8 @@
 # agents/code_explainer_agent/prompt.py
 
+# Bump when the template changes so cached responses are not reused
+PROMPT_VERSION = "1"
+
 PROMPT_TEMPLATE = """
 You are an expert software engineer.
 
@@ -1,12 +1,24 @@
 # agents/code_explainer_agent/tool.py
 
-from typing import Dict
-from langchain_openai import OpenAI
+from typing import AsyncIterator, Dict, Union
+from utils.llm_client import get_llm
+from utils.resilience import error_result
+from utils.streaming import stream_completion
 from agents.code_explainer_agent.prompt import build_explanation_prompt
 import os 
 from dotenv import load_dotenv
 load_dotenv()
 
+# Section markers of the explanation, in order (see prompt.py)
+SECTIONS = [
+    ("summary", "1. 📌 **High-Level Summary**"),
+    ("line_by_line", "2. 🔍 **Line-by-Line Explanation**"),
+    ("recommendations", "3. ✅ **Possible Improvements or Best Practices**"),
+]
+
+# LLM settings for this tool (also part of the response cache key)
+MODEL_PARAMS = {"model_name": "gpt-3.5-turbo-instruct", "temperature": 0.3}
+
 def tool(input: Dict[str, str]) -> Dict[str, str]:
     """
     Explains code with structured reasoning.
@@ -26,30 +38,63 @@ def tool(input: Dict[str, str]) -> Dict[str, str]:
         }
     """
     try:
-        code = input.get("code")
-        language = input.get("language", "Python")
-        depth = input.get("depth", "detailed")
+        prompt = _build_prompt(input)
+        if isinstance(prompt, dict):
+            return prompt
 
-        if not code:
-            return {"error": "Missing 'code' input."}
+        llm = get_llm(**MODEL_PARAMS)
+        output = llm.invoke(prompt)
+        return _parse_output(output)
 
-        prompt = build_explanation_prompt(code, language, depth)
+    except Exception as e:
+        return error_result(e)
 
-        llm = OpenAI(temperature=0.3, model_name="gpt-3.5-turbo-instruct")
-        output = llm.invoke(prompt)
+async def atool(input: Dict[str, str]) -> Dict[str, str]:
+    """Async version of `tool`; awaits the LLM instead of blocking a thread."""
+    try:
+        prompt = _build_prompt(input)
+        if isinstance(prompt, dict):
+            return prompt
 
-        # Parse into 3 sections (based on numbered structure)
-        sections = output.split("2. 🔍 **Line-by-Line Explanation**")
-        summary = sections[0].split("1. 📌 **High-Level Summary**")[-1].strip() if len(sections) > 1 else ""
-        rest = sections[1].split("3. ✅ **Possible Improvements or Best Practices**") if len(sections) > 1 else ["", ""]
-        line_by_line = rest[0].strip()
-        recommendations = rest[1].strip() if len(rest) > 1 else ""
-
-        return {
-            "summary": summary,
-            "line_by_line": line_by_line,
-            "recommendations": recommendations
-        }
+        llm = get_llm(**MODEL_PARAMS)
+        output = await llm.ainvoke(prompt)
+        return _parse_output(output)
 
     except Exception as e:
-        return {"error": str(e)}
+        return error_result(e)
+
+async def astream_tool(input: Dict[str, str]) -> AsyncIterator[dict]:
+    """Streams the completion as token events, then yields the parsed result."""
+    prompt = _build_prompt(input)
+    if isinstance(prompt, dict):
+        yield {"event": "error", "data": prompt["error"]}
+        return
+
+    llm = get_llm(**MODEL_PARAMS)
+    async for event in stream_completion(llm, prompt, _parse_output, sections=SECTIONS):
+        yield event
+
+def _build_prompt(input: Dict[str, str]) -> Union[str, Dict[str, str]]:
+    """Returns the prompt, or an error dict if the input is invalid."""
+    code = input.get("code")
+    language = input.get("language", "Python")
+    depth = input.get("depth", "detailed")
+
+    if not code:
+        return {"error": "Missing 'code' input."}
+
+    return build_explanation_prompt(code, language, depth)
+
+def _parse_output(output: str) -> Dict[str, str]:
+    # Parse into 3 sections (based on numbered structure)
+    sections = output.split(SECTIONS[1][1])
+    summary = sections[0].split(SECTIONS[0][1])[-1].strip() if len(sections) > 1 else ""
+    rest = sections[1].split(SECTIONS[2][1]) if len(sections) > 1 else ["", ""]
+    line_by_line = rest[0].strip()
+    recommendations = rest[1].strip() if len(rest) > 1 else ""
+
+    return {
+        "summary": summary,
+        "line_by_line": line_by_line,
+        "recommendations": recommendations
+    }
@@ -4,7 +4,8 @@ import os
 sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 
 from adk.agents import ToolAgent
-from .tool import tool
+from .tool import tool, atool
+from utils.qa_chain import MODEL_PARAMS, RETRIEVAL_PARAMS
 
 
 # agent = {
@@ -16,5 +17,7 @@ from .tool import tool
 agent = ToolAgent(
     name="doc_qa_agent",
     description="Answers questions from PDF documents.",
-    tool=tool
+    tool=tool,
+    atool=atool,
+    cache_key_params={"chain": "retrieval_qa_stuff", **MODEL_PARAMS, **RETRIEVAL_PARAMS}
 )
\ No newline at end of file
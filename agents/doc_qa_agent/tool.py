@@ -1,8 +1,9 @@
 # agents/doc_qa_agent/tool.py
 
-from utils.pdf_reader import extract_text_from_pdf
-from utils.vector_store import embed_and_store
+import asyncio
+from utils.vector_store import load_or_build_index
 from utils.qa_chain import build_qa_chain
+from utils.resilience import error_result
 
 def tool(input: dict) -> dict:
     """
@@ -27,16 +28,36 @@ def tool(input: dict) -> dict:
         return {"error": "Missing pdf_path or question"}
 
     try:
-        text = extract_text_from_pdf(pdf_path)
-        vectorstore, _ = embed_and_store(text)
-        qa = build_qa_chain(vectorstore)
+        qa = _build_chain(pdf_path)
         result = qa.invoke({"query": question})
-        
-        sources = [doc.page_content for doc in result["source_documents"]]
+        return _format_result(result)
+    except Exception as e:
+        return error_result(e)
 
-        return {
-            "answer": result["result"],
-            "sources": sources
-        }
+async def atool(input: dict) -> dict:
+    """Async version of `tool`. PDF parsing and indexing run in a worker thread."""
+    pdf_path = input.get("pdf_path")
+    question = input.get("question")
+
+    if not pdf_path or not question:
+        return {"error": "Missing pdf_path or question"}
+
+    try:
+        qa = await asyncio.to_thread(_build_chain, pdf_path)
+        result = await qa.ainvoke({"query": question})
+        return _format_result(result)
     except Exception as e:
-        return {"error": str(e)}
+        return error_result(e)
+
+def _build_chain(pdf_path: str):
+    # Reuses the saved index when this PDF was already ingested
+    vectorstore, _ = load_or_build_index(pdf_path)
+    return build_qa_chain(vectorstore)
+
+def _format_result(result: dict) -> dict:
+    sources = [doc.page_content for doc in result["source_documents"]]
+
+    return {
+        "answer": result["result"],
+        "sources": sources
+    }
@@ -1,5 +1,8 @@
 # agents/email_agent/prompt.py
 
+# Bump when the template changes so cached responses are not reused
+PROMPT_VERSION = "1"
+
 EMAIL_PROMPT_TEMPLATE = """
 You are an expert assistant that writes well-crafted, human-like emails.
 
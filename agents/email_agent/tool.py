@@ -1,12 +1,17 @@
 # agents/email_agent/tool.py
 
-from typing import Dict
+from typing import AsyncIterator, Dict, Union
 from openai import OpenAIError
-from langchain_openai import OpenAI
+from utils.llm_client import get_llm
+from utils.resilience import error_result
+from utils.streaming import stream_completion
 from agents.email_agent.prompt import build_email_prompt
 from dotenv import load_dotenv
 load_dotenv()
 
+# LLM settings for this tool (also part of the response cache key)
+MODEL_PARAMS = {"model_name": "gpt-3.5-turbo-instruct", "temperature": 0.3}
+
 def tool(input: Dict[str, str]) -> Dict[str, str]:
     """
     Generates an email given purpose, content brief, and tone.
@@ -25,32 +30,67 @@ def tool(input: Dict[str, str]) -> Dict[str, str]:
         }
     """
     try:
-        purpose = input.get("purpose", "")
-        content = input.get("content", "")
-        tone = input.get("tone", "formal")
+        prompt = _build_prompt(input)
+        if isinstance(prompt, dict):
+            return prompt
 
-        if not purpose or not content:
-            return {"error": "Missing required fields: purpose or content."}
+        llm = get_llm(**MODEL_PARAMS)
+        response = llm.invoke(prompt)
+        return _parse_output(response)
 
-        prompt = build_email_prompt(purpose, content, tone)
+    except OpenAIError as e:
+        return error_result(e, f"OpenAI API error: {e}")
+    except Exception as e:
+        return error_result(e)
 
-        llm = OpenAI(temperature=0.3, model_name="gpt-3.5-turbo-instruct")
-        response = llm.invoke(prompt)
+async def atool(input: Dict[str, str]) -> Dict[str, str]:
+    """Async version of `tool`; awaits the LLM instead of blocking a thread."""
+    try:
+        prompt = _build_prompt(input)
+        if isinstance(prompt, dict):
+            return prompt
 
-        # Simple parsing (could improve later)
-        if "Subject:" in response and "Body:" in response:
-            subject = response.split("Subject:")[1].split("Body:")[0].strip()
-            body = response.split("Body:")[1].strip()
-        else:
-            subject = "Generated Email"
-            body = response.strip()
-
-        return {
-            "subject": subject,
-            "body": body
-        }
+        llm = get_llm(**MODEL_PARAMS)
+        response = await llm.ainvoke(prompt)
+        return _parse_output(response)
 
     except OpenAIError as e:
-        return {"error": f"OpenAI API error: {e}"}
+        return error_result(e, f"OpenAI API error: {e}")
     except Exception as e:
-        return {"error": str(e)}
+        return error_result(e)
+
+async def astream_tool(input: Dict[str, str]) -> AsyncIterator[dict]:
+    """Streams the completion as token events, then yields the parsed result."""
+    prompt = _build_prompt(input)
+    if isinstance(prompt, dict):
+        yield {"event": "error", "data": prompt["error"]}
+        return
+
+    llm = get_llm(**MODEL_PARAMS)
+    async for event in stream_completion(llm, prompt, _parse_output):
+        yield event
+
+def _build_prompt(input: Dict[str, str]) -> Union[str, Dict[str, str]]:
+    """Returns the prompt, or an error dict if the input is invalid."""
+    purpose = input.get("purpose", "")
+    content = input.get("content", "")
+    tone = input.get("tone", "formal")
+
+    if not purpose or not content:
+        return {"error": "Missing required fields: purpose or content."}
+
+    return build_email_prompt(purpose, content, tone)
+
+def _parse_output(response: str) -> Dict[str, str]:
+    # Simple parsing (could improve later)
+    if "Subject:" in response and "Body:" in response:
+        subject = response.split("Subject:")[1].split("Body:")[0].strip()
+        body = response.split("Body:")[1].strip()
+    else:
+        subject = "Generated Email"
+        body = response.strip()
+
+    return {
+        "subject": subject,
+        "body": body
+    }
@@ -1,5 +1,8 @@
 # agents/resume_analyzer_agent/prompt.py
 
+# Bump when the template changes so cached responses are not reused
+PROMPT_VERSION = "1"
+
 PROMPT_TEMPLATE = """
 You are an expert career advisor and resume reviewer.
 
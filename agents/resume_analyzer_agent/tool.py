@@ -1,8 +1,10 @@
 # agents/resume_analyzer_agent/tool.py
 
 import logging
-from typing import Dict, Union
-from langchain_openai import OpenAI
+from typing import AsyncIterator, Dict, Union
+from utils.llm_client import get_llm
+from utils.resilience import error_result
+from utils.streaming import stream_completion
 from agents.resume_analyzer_agent.prompt import build_resume_prompt
 import json
 import os 
@@ -19,6 +21,9 @@ logger.setLevel(logging.DEBUG)
 
 openai_api_key = os.getenv("OPENAI_API_KEY")
 
+# LLM settings for this tool (also part of the response cache key)
+MODEL_PARAMS = {"model_name": "gpt-3.5-turbo-instruct", "temperature": 0.3}
+
 def tool(input: Dict[str, str]) -> Union[Dict, str]:
     """
     Analyzes a resume against a job description using LLM.
@@ -26,36 +31,66 @@ def tool(input: Dict[str, str]) -> Union[Dict, str]:
     logger.debug("Received input: %s", input)
 
     try:
-        resume = input.get("resume_text", "")
-        job_description = input.get("job_description", "")
+        prompt = _build_prompt(input)
+        if isinstance(prompt, dict):
+            return prompt
+
+        llm = get_llm(**MODEL_PARAMS)
+        result = llm.invoke(prompt).strip()
+        return _parse_output(result)
 
-        if not resume or not job_description:
-            logger.warning("Missing input fields.")
-            return {"error": "Missing required input: resume_text or job_description"}
+    except Exception as e:
+        logger.exception("Unexpected error occurred in resume analyzer tool")
+        return error_result(e)
 
-        prompt = build_resume_prompt(resume, job_description)
-        # logger.debug("Built prompt: %s", prompt)
+async def atool(input: Dict[str, str]) -> Union[Dict, str]:
+    """Async version of `tool`; awaits the LLM instead of blocking a thread."""
+    logger.debug("Received input: %s", input)
 
-        llm = OpenAI(
-            openai_api_key=openai_api_key,
-            temperature=0.3,
-            model_name="gpt-3.5-turbo-instruct"
-        )
+    try:
+        prompt = _build_prompt(input)
+        if isinstance(prompt, dict):
+            return prompt
 
-        result = llm.invoke(prompt).strip()
-        # logger.debug("LLM raw result: %s", result)
-
-        try:
-            parsed = json.loads(result)
-            # logger.debug("Parsed LLM result: %s", parsed)
-            return parsed
-        except json.JSONDecodeError:
-            logger.error("Failed to parse JSON from LLM result")
-            return {
-                "error": "LLM returned invalid JSON",
-                "raw_output": result
-            }
+        llm = get_llm(**MODEL_PARAMS)
+        result = (await llm.ainvoke(prompt)).strip()
+        return _parse_output(result)
 
     except Exception as e:
         logger.exception("Unexpected error occurred in resume analyzer tool")
-        return {"error": str(e)}
+        return error_result(e)
+
+async def astream_tool(input: Dict[str, str]) -> AsyncIterator[dict]:
+    """Streams the completion as token events, then yields the parsed result."""
+    prompt = _build_prompt(input)
+    if isinstance(prompt, dict):
+        yield {"event": "error", "data": prompt["error"]}
+        return
+
+    llm = get_llm(**MODEL_PARAMS)
+    async for event in stream_completion(llm, prompt, lambda text: _parse_output(text.strip())):
+        yield event
+
+def _build_prompt(input: Dict[str, str]) -> Union[str, Dict]:
+    """Returns the prompt, or an error dict if the input is invalid."""
+    resume = input.get("resume_text", "")
+    job_description = input.get("job_description", "")
+
+    if not resume or not job_description:
+        logger.warning("Missing input fields.")
+        return {"error": "Missing required input: resume_text or job_description"}
+
+    return build_resume_prompt(resume, job_description)
+
+def _parse_output(result: str) -> Dict:
+    # logger.debug("LLM raw result: %s", result)
+    try:
+        parsed = json.loads(result)
+        # logger.debug("Parsed LLM result: %s", parsed)
+        return parsed
+    except json.JSONDecodeError:
+        logger.error("Failed to parse JSON from LLM result")
+        return {
+            "error": "LLM returned invalid JSON",
+            "raw_output": result
+        }
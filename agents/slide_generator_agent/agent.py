@@ -4,12 +4,16 @@ import os
 sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 
 from adk.agents import ToolAgent
-from .tool import tool
+from .tool import tool, atool, astream_tool, MODEL_PARAMS
+from .prompt import PROMPT_VERSION
 
 agent = ToolAgent(
     name="slide_generator_agent",
     description="Generates structured slide content from a topic or bullet list.",
-    tool=tool
+    tool=tool,
+    atool=atool,
+    astream_tool=astream_tool,
+    cache_key_params={"prompt_version": PROMPT_VERSION, **MODEL_PARAMS}
 )
 
 
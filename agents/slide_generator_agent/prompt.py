@@ -1,5 +1,8 @@
 # agents/slide_generator_agent/prompt.py
 
+# Bump when the template changes so cached responses are not reused
+PROMPT_VERSION = "1"
+
 PROMPT_TEMPLATE_TOPIC = """
 You are a presentation design assistant.
 
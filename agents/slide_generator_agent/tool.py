@@ -1,7 +1,9 @@
 # agents/slide_generator_agent/tool.py
 
-from typing import Dict, Union
-from langchain_openai import OpenAI
+from typing import AsyncIterator, Dict, Union
+from utils.llm_client import get_llm
+from utils.resilience import error_result
+from utils.streaming import stream_completion
 from agents.slide_generator_agent.prompt import build_slide_prompt
 import json
 import os 
@@ -9,6 +11,9 @@ import re
 from dotenv import load_dotenv
 load_dotenv()
 
+# LLM settings for this tool (also part of the response cache key)
+MODEL_PARAMS = {"model_name": "gpt-3.5-turbo-instruct", "temperature": 0.4}
+
 def tool(input: Dict[str, Union[str, list]]) -> Union[Dict, str]:
     """
     Generates a slide deck from a topic or bullet points.
@@ -28,27 +33,60 @@ def tool(input: Dict[str, Union[str, list]]) -> Union[Dict, str]:
         }
     """
     try:
-        topic = input.get("topic", "").strip()
-        bullets = input.get("bullets", [])
+        prompt = _build_prompt(input)
+        if isinstance(prompt, dict):
+            return prompt
 
-        if not topic and not bullets:
-            return {"error": "Provide either a 'topic' or a list of 'bullets'."}
+        llm = get_llm(**MODEL_PARAMS)
+        result = llm.invoke(prompt).strip()
+        return _parse_output(result)
 
-        prompt = build_slide_prompt(topic=topic, bullets=bullets)
+    except Exception as e:
+        return error_result(e)
 
-        llm = OpenAI(temperature=0.4, model_name="gpt-3.5-turbo-instruct")
-        result = llm.invoke(prompt).strip()
+async def atool(input: Dict[str, Union[str, list]]) -> Union[Dict, str]:
+    """Async version of `tool`; awaits the LLM instead of blocking a thread."""
+    try:
+        prompt = _build_prompt(input)
+        if isinstance(prompt, dict):
+            return prompt
 
-        try:
-            # Clean up the JSON by removing trailing commas before parsing
-            clean_result = re.sub(r',\s*([\]}])', r'\1', result)
-            parsed = json.loads(clean_result)
-            return parsed
-        except json.JSONDecodeError:
-            return {
-                "error": "LLM returned invalid JSON",
-                "raw_output": result
-            }
+        llm = get_llm(**MODEL_PARAMS)
+        result = (await llm.ainvoke(prompt)).strip()
+        return _parse_output(result)
 
     except Exception as e:
-        return {"error": str(e)}
+        return error_result(e)
+
+async def astream_tool(input: Dict[str, Union[str, list]]) -> AsyncIterator[dict]:
+    """Streams the completion as token events, then yields the parsed result."""
+    prompt = _build_prompt(input)
+    if isinstance(prompt, dict):
+        yield {"event": "error", "data": prompt["error"]}
+        return
+
+    llm = get_llm(**MODEL_PARAMS)
+    async for event in stream_completion(llm, prompt, lambda text: _parse_output(text.strip())):
+        yield event
+
+def _build_prompt(input: Dict[str, Union[str, list]]) -> Union[str, Dict]:
+    """Returns the prompt, or an error dict if the input is invalid."""
+    topic = input.get("topic", "").strip()
+    bullets = input.get("bullets", [])
+
+    if not topic and not bullets:
+        return {"error": "Provide either a 'topic' or a list of 'bullets'."}
+
+    return build_slide_prompt(topic=topic, bullets=bullets)
+
+def _parse_output(result: str) -> Dict:
+    try:
+        # Clean up the JSON by removing trailing commas before parsing
+        clean_result = re.sub(r',\s*([\]}])', r'\1', result)
+        parsed = json.loads(clean_result)
+        return parsed
+    except json.JSONDecodeError:
+        return {
+            "error": "LLM returned invalid JSON",
+            "raw_output": result
+        }
@@ -1,5 +1,8 @@
 # agents/sql_generator_agent/prompt.py
 
+# Bump when the template changes so cached responses are not reused
+PROMPT_VERSION = "1"
+
 PROMPT_TEMPLATE = """
 You are a senior data engineer skilled in SQL.
 
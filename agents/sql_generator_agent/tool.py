@@ -1,12 +1,17 @@
 # agents/sql_generator_agent/tool.py
 
-from typing import Dict
-from langchain_openai import OpenAI
+from typing import AsyncIterator, Dict, Union
+from utils.llm_client import get_llm
+from utils.resilience import error_result
+from utils.streaming import stream_completion
 from agents.sql_generator_agent.prompt import build_sql_prompt
 import os 
 from dotenv import load_dotenv
 load_dotenv()
 
+# LLM settings for this tool (also part of the response cache key)
+MODEL_PARAMS = {"model_name": "gpt-3.5-turbo-instruct", "temperature": 0.2}
+
 def tool(input: Dict[str, str]) -> Dict[str, str]:
     """
     Generates a SQL query from natural language.
@@ -24,22 +29,55 @@ def tool(input: Dict[str, str]) -> Dict[str, str]:
         }
     """
     try:
-        instruction = input.get("instruction")
-        table_schema = input.get("table_schema", "")
-        dialect = input.get("dialect", "PostgreSQL")
-
-        if not instruction:
-            return {"error": "Missing 'instruction' input."}
+        prompt = _build_prompt(input)
+        if isinstance(prompt, dict):
+            return prompt
 
-        prompt = build_sql_prompt(instruction, table_schema, dialect)
-
-        llm = OpenAI(temperature=0.2, model_name="gpt-3.5-turbo-instruct")
+        llm = get_llm(**MODEL_PARAMS)
         raw_sql = llm.invoke(prompt).strip()
+        return _parse_output(raw_sql)
 
-        # Clean result (remove backticks, comments, explanations if needed)
-        sql = raw_sql.split(";")[0].strip() + ";" if ";" not in raw_sql else raw_sql.strip()
+    except Exception as e:
+        return error_result(e)
 
-        return {"sql": sql}
+async def atool(input: Dict[str, str]) -> Dict[str, str]:
+    """Async version of `tool`; awaits the LLM instead of blocking a thread."""
+    try:
+        prompt = _build_prompt(input)
+        if isinstance(prompt, dict):
+            return prompt
+
+        llm = get_llm(**MODEL_PARAMS)
+        raw_sql = (await llm.ainvoke(prompt)).strip()
+        return _parse_output(raw_sql)
 
     except Exception as e:
-        return {"error": str(e)}
+        return error_result(e)
+
+async def astream_tool(input: Dict[str, str]) -> AsyncIterator[dict]:
+    """Streams the completion as token events, then yields the parsed result."""
+    prompt = _build_prompt(input)
+    if isinstance(prompt, dict):
+        yield {"event": "error", "data": prompt["error"]}
+        return
+
+    llm = get_llm(**MODEL_PARAMS)
+    async for event in stream_completion(llm, prompt, lambda text: _parse_output(text.strip())):
+        yield event
+
+def _build_prompt(input: Dict[str, str]) -> Union[str, Dict[str, str]]:
+    """Returns the prompt, or an error dict if the input is invalid."""
+    instruction = input.get("instruction")
+    table_schema = input.get("table_schema", "")
+    dialect = input.get("dialect", "PostgreSQL")
+
+    if not instruction:
+        return {"error": "Missing 'instruction' input."}
+
+    return build_sql_prompt(instruction, table_schema, dialect)
+
+def _parse_output(raw_sql: str) -> Dict[str, str]:
+    # Clean result (remove backticks, comments, explanations if needed)
+    sql = raw_sql.split(";")[0].strip() + ";" if ";" not in raw_sql else raw_sql.strip()
+
+    return {"sql": sql}
@@ -1,50 +1,317 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed, FIRST_COMPLETED
 from adk import LlmAgent
 from orchestrator_agent import AGENTS
 from utils.memory import shared_memory
+from utils.context import LayeredContext
+from utils.concurrency import gather_bounded
+from utils.workflow_dag import compile_workflow, WorkflowError
+from utils.checkpoints import checkpoint_store, step_key, WORKFLOW_CHECKPOINTS
+from utils.agent_registry import agent_registry
 
-def format_recursively(data, context):
-    """Recursively formats strings in a nested data structure (dicts, lists)."""
-    if isinstance(data, dict):
-        # If it's a dictionary, format each value
-        return {k: format_recursively(v, context) for k, v in data.items()}
-    elif isinstance(data, list):
-        # If it's a list, format each item
-        return [format_recursively(item, context) for item in data]
-    elif isinstance(data, str):
-        # If it's a string, try to format it with the context
-        return data.format(**context)
-    else:
-        # Return data of other types as-is
-        return data
+# Upper bound on steps running at the same time (a workflow may lower it with "max_parallel")
+WORKFLOW_MAX_PARALLEL = int(os.getenv("WORKFLOW_MAX_PARALLEL", "4"))
+# Default number of items a "map" step runs at once (a step may set "concurrency")
+WORKFLOW_MAP_CONCURRENCY = int(os.getenv("WORKFLOW_MAP_CONCURRENCY", "8"))
 
 class WorkflowAgent(LlmAgent):
+    """
+    Runs `steps` as a dependency graph (see utils/workflow_dag.py): a step
+    starts as soon as the steps it references are done, so independent
+    steps run concurrently. The returned context lists outputs in step
+    order regardless of completion order. Step inputs use `{{name}}`
+    placeholders (utils/templates.py), compiled once per distinct workflow.
+
+    Checkpointing is opt-in: pass a "run_id" (or "checkpoint": true) in the
+    workflow input. Each step's output is then stored under a hash of
+    (agent, its cache_key_params, formatted input, contents of the files
+    it reads, upstream step hashes, run id). Rerunning with the same run id
+    reuses every step whose hash is unchanged and only executes the
+    invalidated ones; the per-step hits and misses are reported under
+    "_workflow" in the result. Agents whose config.json disables caching
+    are never checkpointed.
+
+    A "map" step fans its agent out over a list and stores the list of
+    results (failed items hold {"error": ...}) under its output_key. With
+    "on_error": "fail" any failed item turns the whole step into an error.
+
+    A step with "timeout" / "retries" / "hedge" keys runs its agent under
+    that budget (replacing those settings of the agent's config.json
+    policy); a step that runs out of time yields {"error": ...} instead of
+    stalling the run.
+    """
+
     def run(self, input):
+        plan, error = self._plan(input)
+        if error:
+            return error
+        run = _WorkflowRun(input, plan)
+
+        # Step outputs are buffered and written to memory once, when the run ends
+        with shared_memory.batch(), ThreadPoolExecutor(self._parallelism(input)) as pool:
+            running = {}
+            while not run.complete:
+                for step in run.ready(running.values()):
+                    agent, formatted_input = self._prepare_step(step, run)
+                    if run.is_done(step.index):
+                        continue
+                    print(f"--- [Workflow] {step.label}: Running {step.agent} ---")
+                    running[pool.submit(self._run_step, step, agent, formatted_input)] = step.index
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                # Completed steps are recorded in definition order
+                for future in sorted(finished, key=running.get):
+                    self._save_step_output(plan.steps[running.pop(future)], future.result(), run)
+
+        return run.result()
+
+    async def arun(self, input):
+        """Async version of `run`; ready steps' agents are awaited concurrently."""
+        return await self._arun(input)
+
+    async def astream(self, input):
+        """
+        Runs the workflow and yields events as it goes: a "step" event per
+        completed step, an "item" event per completed element of map steps
+        with "stream": true, then the final "result".
+        """
+        queue = asyncio.Queue()
+        task = asyncio.ensure_future(self._arun(input, queue.put_nowait))
+        try:
+            while not task.done() or not queue.empty():
+                getter = asyncio.ensure_future(queue.get())
+                await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+                if getter.done():
+                    yield getter.result()
+                else:
+                    getter.cancel()
+            yield {"event": "result", "data": task.result()}
+        finally:
+            task.cancel()
+
+    async def _arun(self, input, sink=None):
+        plan, error = self._plan(input)
+        if error:
+            return error
+        run = _WorkflowRun(input, plan, sink)
+        limit = self._parallelism(input)
+
+        with shared_memory.batch():
+            running = {}
+            try:
+                while not run.complete:
+                    for step in run.ready(running.values()):
+                        if len(running) >= limit:
+                            break
+                        agent, formatted_input = self._prepare_step(step, run)
+                        if run.is_done(step.index):
+                            continue
+                        print(f"--- [Workflow] {step.label}: Running {step.agent} ---")
+                        coro = self._arun_step(step, agent, formatted_input, run)
+                        running[asyncio.ensure_future(coro)] = step.index
+
+                    if not running:
+                        continue  # only checkpoint hits this round
+                    finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                    for task in sorted(finished, key=running.get):
+                        self._save_step_output(plan.steps[running.pop(task)], task.result(), run)
+            finally:
+                for task in running:
+                    task.cancel()
+
+        return run.result()
+
+    def _run_step(self, step, agent, formatted_input):
+        if step.kind != "map":
+            return self._call(step, agent, formatted_input)
+        if _is_error(formatted_input):
+            return formatted_input  # the "over" value was not a list
+
+        def run_item(item_input):
+            try:
+                return self._call(step, agent, item_input)
+            except Exception as e:
+                return {"error": str(e)}
+
+        results = [None] * len(formatted_input)
+        with ThreadPoolExecutor(self._map_concurrency(step)) as pool:
+            futures = {pool.submit(run_item, item_input): idx for idx, item_input in enumerate(formatted_input)}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                if step.definition.get("stream"):
+                    print(f"--- [Workflow] {step.label}: item {futures[future]+1}/{len(results)} done ---")
+        return self._map_result(step, results)
+
+    async def _arun_step(self, step, agent, formatted_input, run):
+        if step.kind != "map":
+            return await self._acall(step, agent, formatted_input)
+        if _is_error(formatted_input):
+            return formatted_input
+
+        async def run_item(idx):
+            try:
+                output = await self._acall(step, agent, formatted_input[idx])
+            except Exception as e:
+                output = {"error": str(e)}
+            if step.definition.get("stream"):
+                run.emit("item", {"step": step.index + 1, "output_key": step.output_key, "index": idx, "output": output})
+            return output
+
+        results = await gather_bounded(range(len(formatted_input)), run_item, self._map_concurrency(step))
+        return self._map_result(step, results)
+
+    def _call(self, step, agent, step_input):
+        """One agent call under the step's timeout/retry/hedge budget, if it sets one."""
+        policy = step.policy_for(agent)
+        if policy is None:
+            return agent.run(step_input)
+        try:
+            return policy.call(agent.run, step_input)
+        except TimeoutError as e:
+            return {"error": str(e)}
+
+    async def _acall(self, step, agent, step_input):
+        policy = step.policy_for(agent)
+        if policy is None:
+            return await agent.arun(step_input)
+        try:
+            return await policy.acall(agent.arun, step_input)
+        except TimeoutError as e:
+            return {"error": str(e)}
+
+    def _map_result(self, step, results):
+        failed = sum(1 for result in results if _is_error(result))
+        print(f"--- [Workflow] {step.label}: {len(results) - failed}/{len(results)} items succeeded ---")
+        if failed and step.definition.get("on_error") == "fail":
+            return {"error": f"{failed} of {len(results)} items failed", "results": results}
+        return results
+
+    def _plan(self, input):
+        """Builds and validates the step graph. Returns (plan, None) or (None, error)."""
         steps = input.get("steps", [])
-        context = input.copy()
+        print(f"[Workflow] Starting with initial context: {list(input.keys())}")
+        for step in steps:
+            if step.get("agent") not in AGENTS:
+                return None, {"error": f"Unknown agent: {step.get('agent')}"}
+        try:
+            plan = compile_workflow(steps, input.keys())
+            plan.validate(shared_memory)
+        except WorkflowError as e:
+            return None, {"error": str(e)}
+        print(f"[Workflow] Execution order: {[plan.steps[i].label for i in plan.order]}")
+        return plan, None
+
+    def _parallelism(self, input):
+        return max(1, min(int(input.get("max_parallel", WORKFLOW_MAX_PARALLEL)), WORKFLOW_MAX_PARALLEL))
+
+    def _map_concurrency(self, step):
+        return max(1, int(step.definition.get("concurrency", WORKFLOW_MAP_CONCURRENCY)))
+
+    def _prepare_step(self, step, run):
+        """
+        Formats the step's input (one input per element for map steps) and
+        computes its checkpoint key. On a checkpoint hit the step is
+        recorded as done right away.
+        """
+        # Layered view: step-specific context first, then shared memory (nothing is copied)
+        full_context = LayeredContext(run.context, shared_memory)
+        if step.kind == "map":
+            items = full_context.get(step.over)
+            if isinstance(items, list):
+                formatted_input = [
+                    step.template.render(full_context.new_child({step.item_var: item})) for item in items
+                ]
+            else:
+                formatted_input = {"error": f"'{step.over}' is not a list"}
+        else:
+            formatted_input = step.template.render(full_context)
+
+        agent = AGENTS[step.agent]
+        params = {"agent": getattr(agent, "cache_key_params", {}), "run_id": run.run_id}
+        key = step_key(step.agent, formatted_input, [run.keys[dep] for dep in sorted(step.deps)], params)
+        run.keys[step.index] = key
+        if run.checkpoints is not None and _checkpointable(step.agent):
+            found, output = run.checkpoints.get(key)
+            run.report[step.index]["checkpoint"] = "hit" if found else "miss"
+            if found:
+                print(f"--- [Workflow] {step.label}: checkpoint hit, skipping ---")
+                self._save_step_output(step, output, run)
+        return agent, formatted_input
+
+    def _save_step_output(self, step, output, run):
+        run.record(step, output)
+        shared_memory.store(step.output_key, output) # 🧠 Save to shared memory
+
+        print(f"--- [Workflow] {step.label} complete. Saved output to '{step.output_key}' ---")
+
+
+def _is_error(output) -> bool:
+    return isinstance(output, dict) and "error" in output
+
+
+def _checkpointable(agent_name) -> bool:
+    """False for agents whose config.json sets "cache": {"enabled": false} (answers must be fresh)."""
+    return agent_registry.config(agent_name).get("cache", {}).get("enabled", True) is not False
+
 
-        print(f"[Workflow] Starting with initial context: {list(context.keys())}")
+class _WorkflowRun:
+    """Mutable state of one workflow execution."""
 
-        for idx, step in enumerate(steps):
-            agent_name = step["agent"]
-            task_input = step["input"]
+    def __init__(self, input, plan, sink=None):
+        self.input = input
+        self.plan = plan
+        self.sink = sink
+        self.context = input.copy()
+        self.outputs = {}
+        self.keys = {}
+        # A run id scopes checkpoints to one resumable run; without one they are off by default
+        self.run_id = input.get("run_id")
+        use_checkpoints = input.get("checkpoint", WORKFLOW_CHECKPOINTS or self.run_id is not None)
+        self.checkpoints = checkpoint_store if use_checkpoints else None
+        self.report = [
+            {"step": step.index + 1, "agent": step.agent, "output_key": step.output_key, "checkpoint": "off"}
+            for step in plan.steps
+        ]
 
-            # Create a combined dictionary of step-specific context AND shared memory
-            full_context = {**shared_memory.all(), **context}
-            formatted_input = format_recursively(task_input, full_context)
+    @property
+    def complete(self) -> bool:
+        return len(self.outputs) == len(self.plan.steps)
 
-            agent = AGENTS.get(agent_name)
-            if not agent:
-                return {"error": f"Unknown agent: {agent_name}"}
+    def is_done(self, index) -> bool:
+        return index in self.outputs
 
-            print(f"--- [Workflow] Step {idx+1}: Running {agent_name} ---")
-            output = agent.run(formatted_input)
+    def ready(self, running):
+        done = set(self.outputs)
+        return self.plan.ready(done, done | set(running))
 
-            output_key = step.get("output_key", f"output_{idx+1}")
-            context[output_key] = output
-            shared_memory.store(output_key, output) # 🧠 Save to shared memory
+    def emit(self, event, data):
+        if self.sink is not None:
+            self.sink({"event": event, "data": data})
 
-            print(f"--- [Workflow] Step {idx+1} complete. Saved output to '{output_key}' ---")
+    def record(self, step, output):
+        self.outputs[step.index] = output
+        self.context[step.output_key] = output
+        failed = 0
+        if step.kind == "map" and isinstance(output, list):
+            failed = sum(1 for item in output if _is_error(item))
+            self.report[step.index].update(items=len(output), failed=failed)
+        # Partially failed map steps are not checkpointed, so a rerun retries them
+        if self.checkpoints is not None and self.report[step.index]["checkpoint"] == "miss" and not failed:
+            self.checkpoints.put(self.keys[step.index], output, step.agent)
+        self.emit("step", {"step": step.index + 1, "output_key": step.output_key, "output": output})
 
+    def result(self):
+        """Initial context followed by step outputs in definition order (later steps win)."""
+        context = self.input.copy()
+        for step in self.plan.steps:
+            context[step.output_key] = self.outputs[step.index]
+        if self.checkpoints is not None:
+            # Only checkpointed runs report; a plain run returns just the context
+            hits = sum(1 for item in self.report if item["checkpoint"] == "hit")
+            misses = sum(1 for item in self.report if item["checkpoint"] == "miss")
+            print(f"[Workflow] Checkpoints: {hits} hit(s), {misses} miss(es)")
+            context["_workflow"] = {"steps": self.report, "checkpoint_hits": hits, "checkpoint_misses": misses}
         return context
 
 agent = WorkflowAgent()
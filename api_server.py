@@ -1,9 +1,20 @@
 # api_server.py
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from orchestrator_agent import handle_user_input, AGENTS, AGENT_CONFIGS
-import uvicorn
+from orchestrator_agent import (
+    ahandle_user_input, ahandle_batch, astream_user_input, agent_event_stream, AGENTS
+)
+from utils.router import routing_stats
+from utils.agent_registry import agent_registry
+from utils.llm_client import client_stats
+from utils.response_cache import response_cache
+from utils.memory import shared_memory
+from utils.resilience import resilience_stats
+from utils.singleflight import SingleFlight, canonical_key
+from utils.concurrency import gather_bounded, batch_item
+from utils.streaming import sse_event
 import os
 import json
 from fastapi.middleware.cors import CORSMiddleware  # <-- ADD THIS
@@ -22,39 +33,69 @@ app.add_middleware(
 
 class InstructRequest(BaseModel):
     input: str | dict
+    session_id: str | None = None  # memory namespace for this session/user
 
-# --- Helper to load config from disk ---
-def get_agent_config_from_file(agent_name):
-    """
-    Reads the config.json for a specific agent to get its required inputs.
-    """
-    try:
-        config_path = f"agents/{agent_name}/config.json"
-        if os.path.exists(config_path):
-            with open(config_path, "r") as f:
-                return json.load(f)
-    except Exception:
-        pass
-    return {}
+class BatchRequest(BaseModel):
+    inputs: list[str | dict]
+    concurrency: int | None = None  # defaults to BATCH_CONCURRENCY
+    session_id: str | None = None  # memory namespace for this session/user
+
+# Concurrency limits for the batch endpoints
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "64"))
+
+def batch_concurrency(req: BatchRequest) -> int:
+    return max(1, min(req.concurrency or BATCH_CONCURRENCY, BATCH_MAX_CONCURRENCY))
+
+def parse_query_input(input: str) -> str | dict:
+    """GET stream routes take `input` as a query param: a JSON object or plain text."""
+    if input.strip().startswith("{"):
+        try:
+            return json.loads(input)
+        except json.JSONDecodeError:
+            pass
+    return input
+
+async def sse_stream(events):
+    async for event in events:
+        yield sse_event(event)
+
+def sse_response(events) -> StreamingResponse:
+    return StreamingResponse(
+        sse_stream(events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# Identical concurrent requests share one in-flight call
+instruct_flight = SingleFlight()
+agent_flight = SingleFlight()
 
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the Multi-Agent GenAI API! Use /docs for documentation."}
 
 @app.post("/instruct")
-def instruct_route(req: InstructRequest):
+async def instruct_route(req: InstructRequest):
     try:
-        result = handle_user_input(req.input)
+        result = await instruct_flight.do(
+            canonical_key("instruct", req.input, req.session_id),
+            lambda: ahandle_user_input(req.input, req.session_id),
+        )
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/agent/{agent_id}")
-def agent_route(agent_id: str, req: InstructRequest):
+async def agent_route(agent_id: str, req: InstructRequest):
     if agent_id not in AGENTS:
         raise HTTPException(status_code=404, detail="Agent not found")
     try:
-        result = AGENTS[agent_id].run(req.input)
+        agent = await AGENTS.aget(agent_id)
+        result = await agent_flight.do(
+            canonical_key("agent", agent_id, req.input),
+            lambda: agent.arun(req.input),
+        )
         return {
             "agent": agent_id,
             "output": result
@@ -62,26 +103,79 @@ def agent_route(agent_id: str, req: InstructRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/instruct/batch")
+async def instruct_batch_route(req: BatchRequest):
+    """
+    Routes the whole batch, then runs the agents concurrently.
+    Results are in input order; a failed item carries its own 'error'.
+    """
+    try:
+        results = await ahandle_batch(req.inputs, batch_concurrency(req), req.session_id)
+        return {"results": results}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/agent/{agent_id}/batch")
+async def agent_batch_route(agent_id: str, req: BatchRequest):
+    """Runs one agent over many inputs concurrently; results are in input order."""
+    if agent_id not in AGENTS:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    agent = await AGENTS.aget(agent_id)
+
+    results = await gather_bounded(req.inputs, agent.arun, batch_concurrency(req))
+
+    items = [batch_item(idx, result) for idx, result in enumerate(results)]
+    return {"agent": agent_id, "results": items}
+
+@app.post("/instruct/stream")
+async def instruct_stream_route(req: InstructRequest):
+    """Streams the orchestrator's events (route, token, section, result) over SSE."""
+    return sse_response(astream_user_input(req.input, req.session_id))
+
+@app.get("/instruct/stream")
+async def instruct_stream_get_route(input: str, session_id: str | None = None):
+    return sse_response(astream_user_input(parse_query_input(input), session_id))
+
+@app.post("/agent/{agent_id}/stream")
+async def agent_stream_route(agent_id: str, req: InstructRequest):
+    """Streams one agent's events (token, section, result) over SSE."""
+    if agent_id not in AGENTS:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    return sse_response(agent_event_stream(await AGENTS.aget(agent_id), req.input))
+
+@app.get("/agent/{agent_id}/stream")
+async def agent_stream_get_route(agent_id: str, input: str):
+    if agent_id not in AGENTS:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    return sse_response(agent_event_stream(await AGENTS.aget(agent_id), parse_query_input(input)))
+
 @app.get("/agents")
-def list_agents():
+def list_agents(request: Request):
     """
-    Returns a list of agents with their descriptions and REQUIRED INPUTS
-    loaded dynamically from their config.json files.
+    Returns a list of agents with their descriptions and REQUIRED INPUTS,
+    served from the in-memory agent registry. Supports ETag / If-None-Match.
     """
-    agent_list = []
-    for a in AGENT_CONFIGS:
-        # Load the real config from disk to ensure we have 'required_inputs'
-        file_config = get_agent_config_from_file(a["name"])
-        
-        # Merge the basic config with the file config
-        agent_info = {
-            "name": a["name"],
-            "description": file_config.get("description", a.get("description", "")),
-            # This is the critical part that was missing:
-            "required_inputs": file_config.get("required_inputs", [])
-        }
-        agent_list.append(agent_info)
-    return agent_list
+    agent_list = agent_registry.listing()
+    etag = agent_registry.etag
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return JSONResponse(agent_list, headers={"ETag": etag})
+
+@app.get("/metrics")
+def metrics():
+    """Returns runtime counters, e.g. routing cache hit rate."""
+    return {
+        "routing": routing_stats(),
+        "llm_clients": client_stats(),
+        "response_cache": response_cache.stats(),
+        "memory": shared_memory.stats(),
+        "resilience": resilience_stats(),
+        "singleflight": {
+            "instruct": instruct_flight.stats(),
+            "agent": agent_flight.stats(),
+        },
+    }
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run("api_server:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
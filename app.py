@@ -2,7 +2,7 @@ import streamlit as st
 import requests
 import os
 import json
-import re
+from utils.templates import render
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -37,20 +37,17 @@ def get_agents():
         st.error(f"⚠️ API Error: {e}")
         return {}
 
-def format_recursively(data, context):
-    """Recursively formats strings in a nested data structure."""
-    if isinstance(data, dict):
-        return {k: format_recursively(v, context) for k, v in data.items()}
-    elif isinstance(data, list):
-        return [format_recursively(item, context) for item in data]
-    elif isinstance(data, str):
-        placeholders = re.findall(r"\{\{(.*?)\}\}", data)
-        for placeholder in placeholders:
-            if placeholder in context:
-                data = data.replace(f"{{{{{placeholder}}}}}", str(context.get(placeholder, '')))
-        return data
-    else:
-        return data
+def stream_events(url, payload):
+    """Posts to an SSE endpoint and yields (event, data) pairs as they arrive."""
+    with requests.post(url, json=payload, stream=True) as res:
+        res.raise_for_status()
+        event = "message"
+        for line in res.iter_lines(decode_unicode=True):
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                yield event, json.loads(line[len("data:"):].strip())
+                event = "message"
 
 # Load Agents (No cache to ensure updates are seen)
 AVAILABLE_AGENTS = get_agents()
@@ -67,6 +64,7 @@ if 'chain' not in st.session_state:
 with st.sidebar:
     st.header("⚙️ Configuration")
     chaining_mode = st.checkbox("🔗 Enable Agent Chaining", value=False)
+    streaming_mode = st.checkbox("⚡ Stream Responses", value=True, disabled=chaining_mode)
     st.markdown("---")
     
     # SINGLE AGENT SELECTOR
@@ -203,7 +201,7 @@ if st.button("🚀 Run", type="primary"):
                 
                 # Format inputs
                 raw_inputs = step.get('inputs', {})
-                formatted_inputs = format_recursively(raw_inputs, context)
+                formatted_inputs = render(raw_inputs, context, strict=False)
                 
                 with st.status(f"Running Step {i+1}: {agent_name}...", expanded=True) as status:
                     st.write("**Inputs:**", formatted_inputs)
@@ -253,20 +251,49 @@ if st.button("🚀 Run", type="primary"):
                 payload["prompt_override"] = st.session_state.custom_prompts[selected_agent]
 
             try:
-                res = requests.post(endpoint, json=payload)
-                if res.status_code == 200:
-                    result = res.json().get("output", res.text)
-                    st.success("Done!")
+                if streaming_mode:
                     st.subheader("Result:")
+                    live_output = st.empty()
+                    sections_area = st.container()
+                    streamed_text = ""
+                    result = None
+                    for event, data in stream_events(f"{endpoint}/stream", payload):
+                        if event == "route":
+                            st.caption(f"Routed to `{data.get('agent')}` via {data.get('path')}")
+                        elif event == "token":
+                            streamed_text += data
+                            live_output.markdown(streamed_text)
+                        elif event == "section":
+                            with sections_area.expander(data["name"], expanded=True):
+                                st.markdown(data["content"])
+                        elif event == "result":
+                            result = data
+                        elif event == "error":
+                            st.error(f"Error: {data}")
+
+                    if result is not None:
+                        live_output.empty()
+                        st.success("Done!")
+                        if isinstance(result, (dict, list)):
+                            st.json(result)
+                        else:
+                            st.markdown(result)
+                        st.session_state.chat_history.append({"agent": agent_choice, "input": payload["input"], "output": result})
+                else:
+                    res = requests.post(endpoint, json=payload)
+                    if res.status_code == 200:
+                        result = res.json().get("output", res.text)
+                        st.success("Done!")
+                        st.subheader("Result:")
                     
-                    if isinstance(result, (dict, list)):
-                        st.json(result)
-                    else:
-                        st.markdown(result)
+                        if isinstance(result, (dict, list)):
+                            st.json(result)
+                        else:
+                            st.markdown(result)
                     
-                    st.session_state.chat_history.append({"agent": agent_choice, "input": payload["input"], "output": result})
-                else:
-                    st.error(f"Error: {res.text}")
+                        st.session_state.chat_history.append({"agent": agent_choice, "input": payload["input"], "output": result})
+                    else:
+                        st.error(f"Error: {res.text}")
             except Exception as e:
                 st.error(f"Connection Failed: {e}")
 
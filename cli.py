@@ -11,8 +11,16 @@ app = typer.Typer()
 
 
 @app.command()
-def mem():
-    """Displays all items currently in the shared memory."""
+def mem(gc: bool = typer.Option(False, "--gc", help="Delete blob files no longer referenced by any key.")):
+    """Displays all items currently in the shared memory, plus capacity/eviction stats."""
+    if gc:
+        print(f"[yellow]🧹 Removed {shared_memory.gc_blobs()} unreferenced blob(s).[/yellow]")
+
+    stats = shared_memory.stats()
+    limits = f"max_keys={stats['max_keys'] or '∞'}, max_bytes={stats['max_bytes'] or '∞'}"
+    print(f"\n[bold]📊 Memory Stats:[/bold] backend={stats['backend']}, keys={stats['keys']}, {limits}")
+    print(f"  evictions={stats['evictions']}, expirations={stats['expirations']}, blobs={stats['blob_dir']}")
+
     print("\n[bold]🧠 Current Memory:[/bold]")
     all_memory = shared_memory.all()
     if not all_memory:
@@ -57,6 +65,30 @@ def clear_mem():
 #     else:
 #         return data
 
+@app.command()
+def ingest(
+    pdf_paths: list[str] = typer.Argument(..., help="PDF files to index for doc_qa_agent."),
+):
+    """Builds (or verifies) the saved vector index of each PDF so later questions load it instantly."""
+    from utils.vector_store import load_or_build_index, index_cache
+
+    def progress(done, total):
+        print(f"  embedded {done}{f'/{total}' if total else ''} chunk(s)...", end="\r")
+
+    for pdf_path in pdf_paths:
+        try:
+            _, info = load_or_build_index(pdf_path, progress)
+        except Exception as e:
+            print(f"[bold red]❌ {pdf_path}: {e}[/bold red]")
+            continue
+        status = "already indexed" if info["cached"] else "indexed"
+        print(f"  [green]{pdf_path}[/green]: {status}, {info['chunks']} chunks "
+              f"({info['embedded']} embedded, {info['reused']} reused), {info['seconds']:.2f}s")
+
+    stats = index_cache.stats()
+    print(f"\n[bold]📚 Index cache:[/bold] {stats['indexes']} index(es), {stats['bytes']} bytes "
+          f"(max {stats['max_bytes'] or '∞'}), evictions={stats['evictions']}, dir={stats['directory']}")
+
 @app.command()
 def chat():
     print("[bold green]Multi-Agent CLI[/bold green]")
@@ -163,5 +195,6 @@ if __name__ == "__main__":
 # python cli.py json_input resume_chain_input.json
 
 
+# python cli.py ingest agents/doc_qa_agent/sample_docs/*.pdf
 # python cli.py mem
 # python cli.py clear
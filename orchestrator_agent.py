@@ -1,28 +1,25 @@
 # orchestrator_agent.py
 
-import importlib
+import asyncio
 import json
-from typing import Dict, Any
-from utils.router import choose_agent
+from typing import Dict, Any, List, AsyncIterator
+from utils.agent_loader import LazyAgentRegistry
+from utils.router import route, aroute, aroute_batch
+from utils.concurrency import gather_bounded, batch_item
 from utils.input_adapter import adapt_input_to_agent
-from utils.memory import shared_memory
+from utils.agent_registry import agent_registry
+from utils.memory import memory_for
 
-# Load the agents from config
-with open("config/agents_manifest.json") as f:
-    AGENT_CONFIGS = json.load(f)
+# Agents are registered from the manifest and imported on first use
+AGENTS = LazyAgentRegistry(agent_registry.manifest())
+# Follow manifest / config.json reloads, so dispatch matches what GET /agents serves
+agent_registry.on_reload(lambda: AGENTS.update(agent_registry.manifest()))
 
-AGENTS = {}
-
-# Dynamically import all agents
-for agent in AGENT_CONFIGS:
-    module_path = agent["path"]  # e.g., "agents.doc_qa_agent.agent"
-    module = importlib.import_module(module_path)
-    AGENTS[agent["name"]] = module.agent  # assumes each agent exports `agent`
-
-def handle_user_input(user_input: str | Dict[str, Any]) -> Dict[str, Any]:
+def handle_user_input(user_input: str | Dict[str, Any], session_id: str | None = None) -> Dict[str, Any]:
     """
     Orchestrator entry point.
     Accepts user input, routes to agent, returns output.
+    The interaction is remembered in the session's memory namespace (if given).
     """
     try:
         # Determine routing input text
@@ -33,7 +30,9 @@ def handle_user_input(user_input: str | Dict[str, Any]) -> Dict[str, Any]:
         else:
             return {"error": "Invalid input format."}
 
-        selected_agent_name = choose_agent(task_input, AGENT_CONFIGS)
+        decision = route(user_input, agent_registry.manifest())
+        selected_agent_name = decision["agent"]
+        print(f"[Orchestrator] Routed via {decision['path']} path (confidence {decision['confidence']:.2f})")
 
         if not selected_agent_name or selected_agent_name not in AGENTS:
             return {
@@ -67,21 +66,137 @@ def handle_user_input(user_input: str | Dict[str, Any]) -> Dict[str, Any]:
 
         adapted_input = adapt_input_to_agent(selected_agent_name, user_input)
         # print(adapted_input)
-        response = selected_agent.run(adapted_input)
-        # ... existing logic to get the response ...
+        # One memory write per request: the agent's stores and the interaction are batched
+        with memory_for(session_id).batch():
+            response = selected_agent.run(adapted_input)
+            # ... existing logic to get the response ...
 
-        # --- ADD THIS MEMORY LOGIC ---
-        # Save the final interaction to the shared memory
-        shared_memory.store("last_input", user_input)
-        # Convert dicts to a string for consistent storage
-        response_str = json.dumps(response) if isinstance(response, dict) else str(response)
-        shared_memory.store("last_response", response_str)
-        # --- END OF MEMORY LOGIC ---
+            # Save the final interaction to the shared memory
+            _remember(user_input, response, session_id)
 
         return response
     except Exception as e:
         return {"error": str(e)}
 
+async def ahandle_user_input(user_input: str | Dict[str, Any], session_id: str | None = None) -> Dict[str, Any]:
+    """
+    Async orchestrator entry point. Same behaviour as `handle_user_input`,
+    but routing and agent calls are awaited so many requests can share
+    one event loop.
+    """
+    try:
+        if not isinstance(user_input, (str, dict)):
+            return {"error": "Invalid input format."}
+
+        decision = await aroute(user_input, agent_registry.manifest())
+        return await _arun_routed(user_input, decision, session_id)
+    except Exception as e:
+        return {"error": str(e)}
+
+async def ahandle_batch(user_inputs: List[str | Dict[str, Any]], concurrency: int = 8,
+                        session_id: str | None = None) -> List[Dict[str, Any]]:
+    """
+    Handles a batch of inputs. The whole batch is routed first, then the
+    agents run with at most `concurrency` in flight. Interactions are
+    remembered in the session's memory namespace (if given).
+
+    Returns one item per input, in input order:
+        { "index": 0, "agent": "...", "output": {...} }  or
+        { "index": 0, "agent": "...", "error": "..." }
+    """
+    # Invalid items are answered directly; routing them would cost an LLM call each
+    valid_idx = [idx for idx, u in enumerate(user_inputs) if isinstance(u, (str, dict))]
+    routed = await aroute_batch([user_inputs[idx] for idx in valid_idx], agent_registry.manifest(), concurrency)
+    decisions: List[Dict[str, Any]] = [{} for _ in user_inputs]
+    for idx, decision in zip(valid_idx, routed):
+        decisions[idx] = decision
+
+    async def run_item(idx):
+        if not decisions[idx]:
+            return {"error": "Invalid input format."}
+        return await _arun_routed(user_inputs[idx], decisions[idx], session_id)
+
+    results = await gather_bounded(range(len(user_inputs)), run_item, concurrency)
+
+    return [
+        batch_item(idx, result, agent=decisions[idx].get("agent", ""))
+        for idx, result in enumerate(results)
+    ]
+
+async def astream_user_input(user_input: str | Dict[str, Any], session_id: str | None = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Streaming orchestrator entry point. Yields a "route" event, then the
+    selected agent's streaming events (see utils/streaming.py).
+    """
+    try:
+        if not isinstance(user_input, (str, dict)):
+            yield {"event": "error", "data": "Invalid input format."}
+            return
+
+        decision = await aroute(user_input, agent_registry.manifest())
+        yield {"event": "route", "data": decision}
+
+        selected_agent_name = decision["agent"]
+        if not selected_agent_name or selected_agent_name not in AGENTS:
+            yield {"event": "error", "data": "Could not determine appropriate agent."}
+            return
+
+        selected_agent = await AGENTS.aget(selected_agent_name)
+        adapted_input = adapt_input_to_agent(selected_agent_name, user_input)
+        async for event in agent_event_stream(selected_agent, adapted_input):
+            if event["event"] == "result":
+                # Memory writes are blocking file/SQLite I/O; keep them off the event loop
+                await asyncio.to_thread(_remember, user_input, event["data"], session_id)
+            yield event
+    except Exception as e:
+        yield {"event": "error", "data": str(e)}
+
+async def agent_event_stream(agent, input_data) -> AsyncIterator[Dict[str, Any]]:
+    """Streams an agent's events; agents without `astream` yield a single result."""
+    try:
+        if hasattr(agent, "astream"):
+            async for event in agent.astream(input_data):
+                yield event
+        else:
+            yield {"event": "result", "data": await agent.arun(input_data)}
+    except Exception as e:
+        yield {"event": "error", "data": str(e)}
+
+async def _arun_routed(user_input: str | Dict[str, Any], decision: Dict[str, Any],
+                       session_id: str | None = None) -> Dict[str, Any]:
+    """Runs the agent chosen by a routing decision and remembers the interaction."""
+    selected_agent_name = decision["agent"]
+    print(f"[Orchestrator] Routed via {decision['path']} path (confidence {decision['confidence']:.2f})")
+
+    if not selected_agent_name or selected_agent_name not in AGENTS:
+        task_input = json.dumps(user_input) if isinstance(user_input, dict) else user_input
+        return {
+            "error": "Could not determine appropriate agent.",
+            "input": task_input
+        }
+
+    # A first use imports the agent module (and its LLM/PDF libraries) in a worker thread
+    selected_agent = await AGENTS.aget(selected_agent_name)
+    print(f"[Orchestrator] Routing to agent: {selected_agent_name}")
+
+    adapted_input = adapt_input_to_agent(selected_agent_name, user_input)
+    # Opening a session namespace and the batch's single write both run off the event loop
+    memory = await asyncio.to_thread(memory_for, session_id)
+    async with memory.abatch():
+        response = await selected_agent.arun(adapted_input)
+        _remember(user_input, response, session_id)  # buffered by the batch, no I/O here
+
+    return response
+
+def _remember(user_input, response, session_id: str | None = None):
+    """Saves the last interaction to the shared memory (or the session's namespace)."""
+    memory = memory_for(session_id)
+    # Convert dicts to a string for consistent storage
+    response_str = json.dumps(response) if isinstance(response, dict) else str(response)
+    with memory.batch():  # both keys land in one write
+        memory.store("last_input", user_input)
+        memory.store("last_response", response_str)
+
 
 
 # if __name__ == "__main__":
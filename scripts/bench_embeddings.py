@@ -0,0 +1,67 @@
+# scripts/bench_embeddings.py
+#
+# Ingestion throughput of the embedding pipeline, offline. Uses the local
+# hashing embedder, optionally wrapped with a fixed per-call delay to
+# mimic API round trips, and compares batch sizes / in-flight batches.
+#
+#   python -m scripts.bench_embeddings
+#   python -m scripts.bench_embeddings --chunks 5000 --latency 0.2 --batch-size 64 --in-flight 1 --in-flight 8
+
+import argparse
+import time
+
+from utils.embeddings import HashingEmbeddings
+from utils.resilience import ResiliencePolicy
+from utils.vector_store import EmbeddingPipeline
+
+
+class SlowEmbeddings(HashingEmbeddings):
+    """Hashing embedder that sleeps `latency` seconds per call, like a remote API."""
+
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+
+    def embed_documents(self, texts):
+        time.sleep(self.latency)
+        return super().embed_documents(texts)
+
+
+def synthetic_chunks(count: int, size: int = 500):
+    words = "clause party agreement term payment notice liability warranty section schedule".split()
+    for idx in range(count):
+        text = " ".join(words[(idx * 7 + n) % len(words)] for n in range(size // 8))
+        yield f"chunk-{idx}", f"{idx} {text}"[:size]
+
+
+def bench(chunks: int, batch_size: int, in_flight: int, latency: float) -> float:
+    pipeline = EmbeddingPipeline(
+        SlowEmbeddings(latency),
+        batch_size=batch_size,
+        max_in_flight=in_flight,
+        policy=ResiliencePolicy(name="bench"),
+    )
+    start = time.perf_counter()
+    vectors = pipeline.run(synthetic_chunks(chunks))
+    elapsed = time.perf_counter() - start
+    assert len(vectors) == chunks
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.1, help="Simulated seconds per embedding call.")
+    parser.add_argument("--batch-size", type=int, action="append", dest="batch_sizes")
+    parser.add_argument("--in-flight", type=int, action="append", dest="in_flight")
+    args = parser.parse_args()
+
+    print(f"{'batch':>6} {'in-flight':>10} {'seconds':>9} {'chunks/s':>10}")
+    for batch_size in args.batch_sizes or [16, 64]:
+        for in_flight in args.in_flight or [1, 4, 8]:
+            elapsed = bench(args.chunks, batch_size, in_flight, args.latency)
+            print(f"{batch_size:>6} {in_flight:>10} {elapsed:>9.2f} {args.chunks / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
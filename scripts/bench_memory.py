@@ -0,0 +1,90 @@
+# scripts/bench_memory.py
+#
+# Memory store throughput benchmark. Pre-populates each storage backend with
+# N keys, then times a run of `Memory.store` calls against it, plus the
+# startup load (snapshot read + journal replay).
+#
+#   python -m scripts.bench_memory
+#   python -m scripts.bench_memory --keys 10000 --keys 100000 --stores 500
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+
+from utils.memory import JournalBackend, JsonFileBackend, Memory, SQLiteBackend
+
+BACKEND_NAMES = ["json", "journal", "sqlite"]
+
+DEFAULT_KEYS = [10_000, 100_000]
+
+
+def make_backend(name: str, workdir: str):
+    snapshot = os.path.join(workdir, "memory.json")
+    if name == "json":
+        return JsonFileBackend(snapshot)
+    if name == "sqlite":
+        return SQLiteBackend(os.path.join(workdir, "memory.db"))
+    return JournalBackend(snapshot, os.path.join(workdir, "memory.journal"))
+
+
+def bench(name: str, keys: int, stores: int, value_size: int):
+    value = "x" * value_size
+    with tempfile.TemporaryDirectory() as workdir:
+        initial = {f"key_{i}": value for i in range(keys)}
+        with open(os.path.join(workdir, "memory.json"), "w") as f:
+            json.dump(initial, f)
+        if name == "sqlite":
+            preload = SQLiteBackend(os.path.join(workdir, "memory.db"))
+            with preload._conn() as conn:
+                conn.executemany(
+                    "INSERT INTO memory (namespace, key, value, updated_at) VALUES (?, ?, ?, 0)",
+                    [(preload.namespace, k, json.dumps(v)) for k, v in initial.items()],
+                )
+            preload.close()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            memory = Memory(make_backend(name, workdir))
+            load_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for i in range(stores):
+                memory.store(f"bench_{i}", value)
+            store_s = time.perf_counter() - start
+
+            # Journal startup cost after the writes above
+            memory.close()
+            start = time.perf_counter()
+            reloaded = Memory(make_backend(name, workdir))
+            reload_s = time.perf_counter() - start
+            assert len(reloaded.all()) == keys + stores
+            reloaded.close()
+
+    return load_s, store_s, reload_s
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory backend store throughput.")
+    parser.add_argument("--keys", type=int, action="append", help="Pre-populated key count (repeatable).")
+    parser.add_argument("--stores", type=int, default=200, help="Store calls timed per run.")
+    parser.add_argument("--value-size", type=int, default=64, help="Bytes per stored value.")
+    parser.add_argument("--backend", action="append", choices=BACKEND_NAMES,
+                        help="Backend to measure (repeatable). Defaults to all.")
+    args = parser.parse_args()
+
+    for keys in args.keys or DEFAULT_KEYS:
+        for name in args.backend or BACKEND_NAMES:
+            load_s, store_s, reload_s = bench(name, keys, args.stores, args.value_size)
+            print(
+                f"[MemoryBench] {name:8s} keys={keys:<7d} "
+                f"{args.stores / store_s:10.0f} stores/s  "
+                f"load {load_s * 1000:7.1f} ms  reload {reload_s * 1000:7.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
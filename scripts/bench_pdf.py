@@ -0,0 +1,79 @@
+# scripts/bench_pdf.py
+#
+# PDF extraction benchmark on a synthetic multi-page PDF. Compares the old
+# single-threaded join of every page with the page iterator (process pool,
+# cold page cache) and a repeat ingest (warm page cache), and reports the
+# time until the first page is available to the splitter.
+#
+#   python -m scripts.bench_pdf
+#   python -m scripts.bench_pdf --pages 1000 --workers 4
+
+import argparse
+import os
+import tempfile
+import time
+
+from utils import pdf_reader
+
+
+def make_pdf(path: str, pages: int, lines_per_page: int = 40):
+    import fitz
+
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page()
+        text = "\n".join(
+            f"Page {number + 1}, line {line + 1}: clause {number}.{line} of the synthetic contract text."
+            for line in range(lines_per_page)
+        )
+        page.insert_text((36, 36), text, fontsize=8)
+    doc.save(path)
+    doc.close()
+
+
+def single_threaded(path: str) -> str:
+    import fitz
+
+    doc = fitz.open(path)
+    return "\n".join([page.get_text() for page in doc]).strip()
+
+
+def timed_iter(path: str, workers: int):
+    start = time.perf_counter()
+    first = None
+    count = 0
+    for _ in pdf_reader.iter_pdf_pages(path, workers=workers):
+        if first is None:
+            first = time.perf_counter() - start
+        count += 1
+    return time.perf_counter() - start, first, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=pdf_reader.PDF_WORKERS)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "synthetic.pdf")
+        make_pdf(path, args.pages)
+        pdf_reader.page_cache = pdf_reader.PageTextCache(os.path.join(workdir, "pages.db"))
+        pdf_reader.PDF_WORKERS = args.workers
+
+        start = time.perf_counter()
+        single_threaded(path)
+        baseline = time.perf_counter() - start
+        print(f"{'single-threaded join':<28} {baseline:8.3f}s  first page after {baseline:.3f}s")
+
+        if args.workers > 1:
+            pdf_reader._get_pool().submit(int).result()  # start the workers outside the timing
+
+        for label in ("iterator, cold cache", "iterator, warm cache"):
+            total, first, count = timed_iter(path, args.workers)
+            print(f"{label:<28} {total:8.3f}s  first page after {first:.3f}s  "
+                  f"({count} pages, {baseline / total:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# scripts/bench_startup.py
+#
+# Cold-start import time benchmark. Runs `python -X importtime -c "import <module>"`
+# in a fresh interpreter for each entry point and fails if any of them
+# regresses past its budget.
+#
+#   python -m scripts.bench_startup
+#   python -m scripts.bench_startup --module orchestrator_agent --budget-ms 300
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+# Cold-start budgets in milliseconds (cumulative import time of the module)
+DEFAULT_BUDGETS_MS = {
+    "orchestrator_agent": 300,
+    "cli": 800,
+    "api_server": 1500,
+}
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_import(module: str, runs: int = 3):
+    """
+    Imports `module` in fresh interpreters and returns the best cumulative
+    import time (ms) together with the slowest nested imports of that run.
+    """
+    best_ms, best_entries = None, []
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+
+        entries = []
+        total_us = None
+        for line in proc.stderr.splitlines():
+            match = IMPORTTIME_LINE.match(line)
+            if not match:
+                continue
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((name, int(self_us), int(cumulative_us)))
+            if name == module and len(indent) <= 1:
+                total_us = int(cumulative_us)
+
+        total_ms = (total_us or 0) / 1000
+        if best_ms is None or total_ms < best_ms:
+            best_ms, best_entries = total_ms, entries
+    return best_ms, best_entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start import time budget check.")
+    parser.add_argument("--module", action="append", help="Module to measure (repeatable).")
+    parser.add_argument("--budget-ms", type=float, help="Budget applied to every --module.")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters per module; best run counts.")
+    parser.add_argument("--top", type=int, default=10, help="How many of the slowest imports to show.")
+    args = parser.parse_args()
+
+    budgets = (
+        {m: args.budget_ms or DEFAULT_BUDGETS_MS.get(m, 500) for m in args.module}
+        if args.module else DEFAULT_BUDGETS_MS
+    )
+
+    failed = False
+    for module, budget_ms in budgets.items():
+        total_ms, entries = measure_import(module, args.runs)
+        status = "OK" if total_ms <= budget_ms else "OVER BUDGET"
+        failed = failed or total_ms > budget_ms
+        print(f"[Startup] {module}: {total_ms:.1f} ms (budget {budget_ms:.0f} ms) {status}")
+
+        for name, self_us, _ in sorted(entries, key=lambda e: e[1], reverse=True)[:args.top]:
+            print(f"    {self_us / 1000:8.1f} ms  {name}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# scripts/test_checkpoints.py
+#
+# Workflow checkpoint keys and store: which changes invalidate a step,
+# TTL expiry and size-based eviction. No LLM calls.
+#
+#   python -m scripts.test_checkpoints
+
+import os
+import tempfile
+import time
+
+from utils.checkpoints import CheckpointStore, step_key
+
+with tempfile.TemporaryDirectory() as workdir:
+    pdf_path = os.path.join(workdir, "contract.pdf")
+    with open(pdf_path, "w") as f:
+        f.write("version 1")
+
+    step_input = {"pdf_path": pdf_path, "question": "What is clause 4?"}
+    base = step_key("doc_qa_agent", step_input, ["upstream"], {"agent": {"model": "m1"}})
+    assert base == step_key("doc_qa_agent", dict(step_input), ["upstream"], {"agent": {"model": "m1"}})
+
+    # Agent, input, upstream outputs, cache_key_params and run id all change the key
+    assert base != step_key("email_agent", step_input, ["upstream"], {"agent": {"model": "m1"}})
+    assert base != step_key("doc_qa_agent", {**step_input, "question": "Clause 5?"}, ["upstream"], {"agent": {"model": "m1"}})
+    assert base != step_key("doc_qa_agent", step_input, ["changed"], {"agent": {"model": "m1"}})
+    assert base != step_key("doc_qa_agent", step_input, ["upstream"], {"agent": {"model": "m2"}})
+    assert base != step_key("doc_qa_agent", step_input, ["upstream"], {"agent": {"model": "m1"}, "run_id": "r1"})
+
+    # Replacing the file at the same path changes the key
+    time.sleep(0.01)
+    with open(pdf_path, "w") as f:
+        f.write("version 2")
+    assert base != step_key("doc_qa_agent", step_input, ["upstream"], {"agent": {"model": "m1"}})
+
+    # Store: hits, error outputs never stored, TTL expiry
+    store = CheckpointStore(os.path.join(workdir, "checkpoints"), ttl=3600, max_bytes=0)
+    store.put("k1", {"answer": 42}, "doc_qa_agent")
+    store.put("k2", {"error": "boom"}, "doc_qa_agent")
+    assert store.get("k1") == (True, {"answer": 42})
+    assert store.get("k2") == (False, None)
+
+    store.ttl = 0.05
+    time.sleep(0.1)
+    assert store.get("k1") == (False, None)
+    assert not os.path.exists(os.path.join(store.directory, "k1.json"))
+
+    # Size cap: least recently used checkpoints go first
+    store = CheckpointStore(os.path.join(workdir, "bounded"), ttl=0, max_bytes=300)
+    for idx in range(5):
+        store.put(f"k{idx}", {"text": "x" * 60}, "agent")
+        time.sleep(0.01)
+    assert store.evictions > 0
+    assert store.stats()["bytes"] <= 300
+    assert store.get("k4")[0]
+    assert not store.get("k0")[0]
+
+    # Under the cap, writes keep a running total instead of rescanning the directory
+    store = CheckpointStore(os.path.join(workdir, "large"), ttl=3600, max_bytes=10 ** 6)
+    scans = []
+    entries = store.entries
+    store.entries = lambda: scans.append(1) or entries()
+    for idx in range(20):
+        store.put(f"k{idx}", {"text": "x" * 60}, "agent")
+    assert len(scans) == 1, scans
+    assert store._bytes == store.stats()["bytes"]
+
+print("Checkpoint tests passed.")
@@ -0,0 +1,59 @@
+# scripts/test_embedding_cache.py
+#
+# Embedding-cache reuse: re-indexing an edited document embeds only the
+# changed chunks. Uses the local hashing embedder; no API calls.
+#
+#   python -m scripts.test_embedding_cache
+
+import os
+import shutil
+import tempfile
+
+workdir = tempfile.mkdtemp(prefix="embedding_cache_test_")
+os.environ["EMBEDDING_CACHE_DB"] = os.path.join(workdir, "embedding_cache.db")
+os.environ["EMBEDDING_BACKEND"] = "hashing"
+
+from utils.embedding_cache import EmbeddingCache, chunk_hash, pack_vector, unpack_vector
+from utils.embeddings import HashingEmbeddings
+from utils.vector_store import embed_chunks
+
+
+class CountingEmbeddings(HashingEmbeddings):
+    """Hashing embedder that records how many texts it was asked to embed."""
+
+    def __init__(self):
+        super().__init__()
+        self.embedded = 0
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return super().embed_documents(texts)
+
+
+# Vectors round-trip through float32 blobs
+vector = [0.25, -1.5, 3.0]
+assert unpack_vector(pack_vector(vector)) == vector
+
+cache = EmbeddingCache(os.path.join(workdir, "direct.db"))
+cache.put_many("model-a", {chunk_hash("hello"): vector})
+assert cache.get_many("model-a", [chunk_hash("hello"), chunk_hash("missing")]) == {chunk_hash("hello"): vector}
+assert cache.get_many("model-b", [chunk_hash("hello")]) == {}  # vectors are per model
+
+chunks = [f"Section {idx}: the parties agree to term {idx}." for idx in range(50)]
+
+backend = CountingEmbeddings()
+pairs, report = embed_chunks(chunks, backend)
+assert report == {"chunks": 50, "embedded": 50, "reused": 0}, report
+assert [text for text, _ in pairs] == chunks
+
+# One edited chunk (and one duplicate) on re-index: only the edit is embedded
+edited = chunks[:10] + ["Section 10: the parties agree to a NEW term."] + chunks[11:] + [chunks[0]]
+backend = CountingEmbeddings()
+pairs, report = embed_chunks(edited, backend)
+assert backend.embedded == 1, backend.embedded
+assert report == {"chunks": 51, "embedded": 1, "reused": 50}, report
+assert [text for text, _ in pairs] == edited
+assert pairs[0][1] == pairs[-1][1]
+
+shutil.rmtree(workdir, ignore_errors=True)
+print("Embedding cache tests passed.")
@@ -0,0 +1,160 @@
+# scripts/test_memory.py
+#
+# Journal backend compaction and recovery, the SQLite backend,
+# namespaces, bounded scopes, batched and write-behind writes, and LRU / TTL eviction. Runs in a temporary directory; no LLM calls.
+#
+#   python -m scripts.test_memory
+
+import os
+import shutil
+import tempfile
+import time
+
+project_dir = os.getcwd()
+workdir = tempfile.mkdtemp(prefix="memory_test_")
+os.chdir(workdir)  # utils.memory creates `shared_memory` in the working directory on import
+
+from utils.memory import BlobStore, JournalBackend, Memory, SQLiteBackend, memory_for
+
+
+def journal(name: str, compact_bytes: int = 10 ** 9) -> JournalBackend:
+    return JournalBackend(f"{name}.json", f"{name}.journal", compact_bytes=compact_bytes)
+
+
+# Compaction folds the journal into the snapshot without losing writes
+backend = journal("compact", compact_bytes=2000)
+for idx in range(200):
+    backend.set(f"key{idx}", {"value": idx})
+backend.delete_many(["key0"])
+backend.close()
+assert backend.compactions > 0
+reopened = journal("compact")
+assert len(reopened) == 199 and reopened.get("key199") == {"value": 199} and reopened.get("key0") is None
+reopened.close()
+
+# A clear is replayed like any other record
+backend = journal("cleared")
+backend.set("a", 1)
+backend.clear()
+backend.set("b", 2)
+backend.close()
+reopened = journal("cleared")
+assert reopened.all() == {"b": 2}
+reopened.close()
+
+# An interrupted compaction (leftover .old journal) is finished on startup
+backend = journal("crash")
+backend.set_many({"a": 1, "b": 2})
+backend.close()
+os.replace("crash.journal", "crash.journal.old")
+reopened = journal("crash")
+assert reopened.all() == {"a": 1, "b": 2}
+assert not os.path.exists("crash.journal.old")
+reopened.close()
+
+# A torn final line from a crash mid-append is skipped
+with open("crash.journal", "a") as f:
+    f.write('{"op":"set","key":"c"')
+reopened = journal("crash")
+assert reopened.all() == {"a": 1, "b": 2}
+reopened.close()
+
+# SQLite: separate connections (as in separate workers) see each other's writes
+first = SQLiteBackend("memory.db")
+second = SQLiteBackend("memory.db")
+first.set("k", {"n": 1})
+assert second.get("k") == {"n": 1} and len(second) == 1
+first.close()
+second.close()
+
+# Namespaces keep the same key apart, in both backends
+for backend in (journal("spaces"), SQLiteBackend("spaces.db")):
+    backend.set("k", "root")
+    backend.scoped("alice").set("k", "alice")
+    backend.scoped("bob").set("k", "bob")
+    assert backend.get("k") == "root"
+    assert backend.scoped("alice").get("k") == "alice" and backend.scoped("bob").get("k") == "bob"
+    backend.scoped("alice").clear()
+    assert backend.scoped("alice").get("k") is None and backend.scoped("bob").get("k") == "bob"
+    backend.close()
+
+# memory_for returns one Memory per session, and the shared one without a session
+assert memory_for() is memory_for(None)
+assert memory_for("s1") is memory_for("s1") and memory_for("s1") is not memory_for("s2")
+
+# Namespaces share the backend's files and never collide
+backend = journal("shared")
+backend.set("k", "root")
+backend.scoped("a b").set("k", "space")
+backend.scoped("a_b").set("k", "underscore")
+backend.close()
+assert not any(name.startswith("shared.a") for name in os.listdir("."))
+reopened = journal("shared")
+assert reopened.get("k") == "root"
+assert reopened.scoped("a b").get("k") == "space" and reopened.scoped("a_b").get("k") == "underscore"
+assert BlobStore("blobs", "a b").path != BlobStore("blobs", "a_b").path
+reopened.close()
+
+# Memory persists through its backend
+memory = Memory(journal("memory"))
+memory.store("user", {"name": "Ada"})
+memory.close()
+memory = Memory(journal("memory"))
+assert memory.get("user") == {"name": "Ada"}
+memory.close()
+
+# A batch is visible inside the block and reaches the backend as one write
+memory = Memory(journal("batch"))
+with memory.batch():
+    memory.store("a", 1)
+    memory.store("b", 2)
+    assert memory.get("a") == 1 and memory.all() == {"a": 1, "b": 2}
+    assert memory.backend.get("a") is None
+assert memory.flushes == 1 and memory.backend.all() == {"a": 1, "b": 2}
+memory.close()
+
+# Write-behind: stores are buffered until the dirty-key limit or close
+memory = Memory(journal("behind"), write_behind=True, flush_interval=3600, flush_dirty_keys=3)
+memory.store("a", 1)
+memory.store("b", 2)
+assert memory.get("a") == 1 and memory.backend.get("a") is None
+memory.store("c", 3)
+assert memory.flushes == 1 and memory.backend.get("c") == 3
+memory.store("d", 4)
+memory.close()
+reopened = journal("behind")
+assert reopened.all() == {"a": 1, "b": 2, "c": 3, "d": 4}
+reopened.close()
+
+# LRU eviction by key count: reading a key keeps it
+memory = Memory(journal("lru"), max_keys=3, blobs=BlobStore("lru_blobs"))
+for key in ("a", "b", "c"):
+    memory.store(key, key)
+memory.get("a")
+memory.store("d", "d")
+assert memory.get("b") is None and memory.get("a") == "a" and memory.get("d") == "d"
+assert memory.evictions == 1
+
+# TTL expiry
+memory.store("short", 1, ttl=0.05)
+time.sleep(0.1)
+assert memory.get("short") is None and memory.expirations == 1
+
+# Large values go to the blob store and come back intact
+memory.blob_threshold = 100
+memory.store("big", "x" * 1000)
+assert memory.get("big") == "x" * 1000
+assert os.listdir(memory.blobs.path)
+memory.close()
+
+# Scoped memories are bounded; an evicted scope is closed and its data kept
+memory = Memory(journal("scopes"), blobs=BlobStore("scope_blobs"))
+for idx in range(5):
+    memory.scoped(f"session {idx}", max_scopes=2).store("turn", idx)
+assert len(memory._scopes) == 2
+assert memory.scoped("session 0", max_scopes=2).get("turn") == 0
+memory.close()
+
+os.chdir(project_dir)
+shutil.rmtree(workdir, ignore_errors=True)
+print("Memory tests passed.")
@@ -0,0 +1,40 @@
+# scripts/test_retrieval.py
+#
+# BM25 ranking, reciprocal-rank fusion and the lexical reranker. No LLM
+# or embedding calls.
+#
+#   python -m scripts.test_retrieval
+
+from utils.bm25 import BM25Index, LexicalReranker, reciprocal_rank_fusion, tokenize
+
+# Compound identifiers are kept whole and split into their parts
+assert tokenize("See Clause 4.2 and SKU-1138") == ["see", "clause", "4.2", "4", "2", "and", "sku-1138", "sku", "1138"]
+
+docs = [
+    "The supplier shall deliver goods within thirty days.",
+    "Clause 4.2: payment is due within 14 days of invoice.",
+    "Termination requires ninety days written notice.",
+    "Payment terms are described in the payment schedule.",
+]
+index = BM25Index(docs)
+assert len(index) == 4
+
+# The exact identifier wins; rarer terms weigh more
+assert index.search("clause 4.2", k=1)[0][0] == 1
+assert index.search("termination notice", k=1)[0][0] == 2
+assert index.idf("payment") < index.idf("termination")
+assert index.search("unrelated words", k=3) == []
+assert [doc for doc, _ in index.search("payment", k=4)] == [3, 1]
+
+# RRF: items ranked well in both lists come first; ties keep first-seen order
+fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1, 4]], k=60)
+assert [item for item, _ in fused] == [1, 3, 2, 4], fused
+assert abs(fused[0][1] - (1 / 61 + 1 / 62)) < 1e-12
+
+# The reranker lifts the candidate that covers every distinctive query term
+reranker = LexicalReranker(index)
+candidates = [(3, docs[3], 0.033), (1, docs[1], 0.030), (0, docs[0], 0.029)]
+reranked = reranker.rerank("payment clause 4.2", candidates)
+assert reranked[0][0] == 1, reranked
+
+print("Retrieval tests passed.")
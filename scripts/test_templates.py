@@ -0,0 +1,37 @@
+# scripts/test_templates.py
+#
+# `{{name}}` template compilation and rendering. No LLM calls.
+#
+#   python -m scripts.test_templates
+
+from utils.templates import compile_template, render
+
+context = {"name": "Ada", "count": 3, "profile": {"role": "engineer"}, "tags": ["a", "b"]}
+
+# Placeholders inside text are stringified; dicts and lists as JSON
+assert render("Hello {{name}}, you have {{ count }} items", context) == "Hello Ada, you have 3 items"
+assert render("Profile: {{profile}}", context) == 'Profile: {"role": "engineer"}'
+
+# A string that is exactly one placeholder keeps the value's type
+assert render("{{profile}}", context) == {"role": "engineer"}
+assert render("{{tags}}", context) == ["a", "b"]
+assert render("{{count}}", context) == 3
+
+# Nested structures are rendered; other values and single braces are left alone
+data = {"input": ["{{name}}", {"n": "{{count}}"}], "json": '{"a": 1}', "flag": True}
+assert render(data, context) == {"input": ["Ada", {"n": 3}], "json": '{"a": 1}', "flag": True}
+
+# References are collected at compile time
+template = compile_template({"a": "{{name}} {{count}}", "b": ["{{tags}}"], "c": "{x}"})
+assert template.refs == {"name", "count", "tags"}, template.refs
+
+# Strict rendering raises on unknown names; lenient rendering leaves them in place
+try:
+    render("{{unknown}}", context)
+    raise AssertionError("missing key not raised")
+except KeyError:
+    pass
+assert render("Hi {{unknown}}", context, strict=False) == "Hi {{unknown}}"
+assert render("{{unknown}}", context, strict=False) == "{{unknown}}"
+
+print("Template tests passed.")
@@ -0,0 +1,83 @@
+# scripts/test_workflow_dag.py
+#
+# Workflow step graph: dependency ordering, parallel-ready steps, overwrite
+# ordering and cycle / unknown-reference detection. No LLM calls.
+#
+#   python -m scripts.test_workflow_dag
+
+from utils.workflow_dag import WorkflowError, WorkflowPlan
+
+# Two independent steps feed a third
+plan = WorkflowPlan(
+    [
+        {"agent": "a", "input": {"text": "{{topic}}"}, "output_key": "summary"},
+        {"agent": "b", "input": {"text": "{{topic}}"}, "output_key": "sql"},
+        {"agent": "c", "input": {"text": "{{summary}} {{sql}}"}, "output_key": "report"},
+    ],
+    ["topic"],
+)
+assert plan.order == [0, 1, 2], plan.order
+assert [step.index for step in plan.ready(set(), set())] == [0, 1]
+assert [step.index for step in plan.ready({0}, {0, 1})] == []
+assert [step.index for step in plan.ready({0, 1}, {0, 1})] == [2]
+
+# A step may reference a later producer; depends_on adds explicit edges
+plan = WorkflowPlan(
+    [
+        {"agent": "a", "input": {"text": "{{late}}"}, "output_key": "first"},
+        {"agent": "b", "input": {}, "output_key": "late"},
+        {"agent": "c", "input": {}, "output_key": "last", "depends_on": ["first"]},
+    ],
+    [],
+)
+assert plan.order == [1, 0, 2], plan.order
+
+# Overwriting a key keeps readers of the old value before the next writer
+plan = WorkflowPlan(
+    [
+        {"agent": "a", "input": {}, "output_key": "draft"},
+        {"agent": "b", "input": {"text": "{{draft}}"}, "output_key": "review"},
+        {"agent": "c", "input": {}, "output_key": "draft"},
+    ],
+    [],
+)
+assert plan.steps[2].deps == {0, 1}, plan.steps[2].deps
+
+# Cycles and unknown references are rejected before anything runs
+try:
+    WorkflowPlan(
+        [
+            {"agent": "a", "input": {}, "output_key": "x", "depends_on": ["y"]},
+            {"agent": "b", "input": {}, "output_key": "y", "depends_on": ["x"]},
+        ],
+        [],
+    )
+    raise AssertionError("cycle not detected")
+except WorkflowError as e:
+    assert "cycle" in str(e), e
+
+try:
+    WorkflowPlan([{"agent": "a", "input": {}, "depends_on": ["nope"]}], [])
+    raise AssertionError("unknown dependency not detected")
+except WorkflowError as e:
+    assert "unknown step" in str(e), e
+
+plan = WorkflowPlan([{"agent": "a", "input": {"text": "{{missing}}"}}], [])
+try:
+    plan.validate({})
+    raise AssertionError("unknown reference not detected")
+except WorkflowError as e:
+    assert "missing" in str(e), e
+
+# Map steps depend on their list; without "input" each element is passed as is
+plan = WorkflowPlan(
+    [
+        {"agent": "a", "input": {}, "output_key": "resumes"},
+        {"type": "map", "agent": "b", "over": "resumes", "output_key": "analyses"},
+    ],
+    [],
+)
+assert plan.steps[1].deps == {0}
+assert plan.steps[1].template.render({"item": {"name": "Ada"}}) == {"name": "Ada"}
+
+print("Workflow DAG tests passed.")
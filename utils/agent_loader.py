@@ -0,0 +1,86 @@
+# utils/agent_loader.py
+
+import asyncio
+import importlib
+import threading
+from collections.abc import Mapping
+from typing import Dict, List
+
+from utils.input_adapter import load_agent_manifest
+from utils.response_cache import AgentResponseCache
+from utils.resilience import ResiliencePolicy, register
+
+
+class LazyAgentRegistry(Mapping):
+    """
+    Maps agent names to agent objects, importing each agent module on first use.
+
+    Agents are registered from the manifest (name -> module path) but their
+    modules, and the heavy LLM/PDF libraries they pull in, are only imported
+    when the agent is actually looked up.
+    """
+
+    def __init__(self, agent_configs: List[Dict]):
+        self._paths = {agent["name"]: agent["path"] for agent in agent_configs}
+        self._loaded = {}
+        self._lock = threading.RLock()
+
+    def update(self, agent_configs: List[Dict]):
+        """
+        Switches to a reloaded manifest. Removed agents (or ones whose module
+        path changed) are dropped; agents still loaded get their
+        config.json settings re-applied.
+        """
+        with self._lock:
+            self._paths = {agent["name"]: agent["path"] for agent in agent_configs}
+            for name in list(self._loaded):
+                if self._loaded[name][0] != self._paths.get(name):
+                    del self._loaded[name]
+                else:
+                    self._configure(name, self._loaded[name][1])
+
+    def __getitem__(self, name):
+        if name not in self._paths:
+            raise KeyError(name)
+        entry = self._loaded.get(name)
+        if entry is None:
+            with self._lock:
+                entry = self._loaded.get(name)
+                if entry is None:
+                    module = importlib.import_module(self._paths[name])
+                    agent = module.agent  # assumes each agent exports `agent`
+                    self._configure(name, agent)
+                    entry = self._loaded[name] = (self._paths[name], agent)
+        return entry[1]
+
+    async def aget(self, name):
+        """`self[name]` for async callers: a first-use import runs in a worker thread, off the event loop."""
+        if name in self._loaded:
+            return self[name]
+        return await asyncio.to_thread(self.__getitem__, name)
+
+    def _configure(self, name, agent):
+        """Applies per-agent settings from the agent's config.json."""
+        config = load_agent_manifest(name)
+        policy = config.get("cache", {})
+        if hasattr(agent, "response_cache"):
+            # A reload that turns caching off must also detach the old cache
+            enabled = policy.get("enabled")
+            agent.response_cache = AgentResponseCache(agent.name, policy, agent.cache_key_params) if enabled else None
+        if hasattr(agent, "resilience"):
+            # Agents without a "resilience" block get the AGENT_* env defaults
+            agent.resilience = register(ResiliencePolicy.from_config(config.get("resilience", {}), name=name))
+
+    def __contains__(self, name):
+        # Checking membership must not trigger an import
+        return name in self._paths
+
+    def __iter__(self):
+        return iter(self._paths)
+
+    def __len__(self):
+        return len(self._paths)
+
+    def loaded(self) -> List[str]:
+        """Names of the agents whose modules have been imported so far."""
+        return list(self._loaded)
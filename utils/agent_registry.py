@@ -0,0 +1,173 @@
+# utils/agent_registry.py
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+MANIFEST_PATH = "config/agents_manifest.json"
+AGENTS_DIR = "agents"
+
+# How often (seconds) file mtimes are checked for changes
+CHECK_INTERVAL = float(os.getenv("AGENT_REGISTRY_CHECK_INTERVAL", "2"))
+
+
+class InputSchema:
+    """
+    An agent's `required_inputs`, compiled once into an adaptation strategy
+    so adapting a request needs no config lookups.
+    """
+
+    def __init__(self, required_inputs: List[str]):
+        self.required = tuple(required_inputs or ())
+
+    def adapt(self, user_query):
+        """Maps a raw string/dict query onto the agent's required inputs."""
+        if not self.required:
+            return user_query
+        if isinstance(user_query, dict):
+            return {field: user_query.get(field) for field in self.required}
+        if len(self.required) == 1:
+            return {self.required[0]: user_query}
+        # Default fallback: use the string query for all fields
+        return {field: user_query for field in self.required}
+
+    def missing(self, data) -> List[str]:
+        """Required fields that are absent or empty in `data`."""
+        if not isinstance(data, dict):
+            return list(self.required)
+        return [field for field in self.required if data.get(field) in (None, "")]
+
+
+class CompiledAgent:
+    """Manifest entry merged with the agent's config.json, plus its compiled input schema."""
+
+    def __init__(self, manifest_entry: Dict[str, Any], file_config: Dict[str, Any]):
+        self.name = manifest_entry["name"]
+        self.path = manifest_entry.get("path")
+        self.config = {**manifest_entry, **file_config, "name": self.name}
+        self.schema = InputSchema(self.config.get("required_inputs", []))
+
+    def public_info(self) -> Dict[str, Any]:
+        """What GET /agents exposes for this agent."""
+        return {
+            "name": self.name,
+            "description": self.config.get("description", ""),
+            "required_inputs": list(self.schema.required),
+        }
+
+
+class AgentRegistry:
+    """
+    In-memory registry built from `config/agents_manifest.json` and every
+    agent's `config.json`.
+
+    Files are read once; afterwards only their mtimes are checked (at most
+    every CHECK_INTERVAL seconds) and the registry is rebuilt when one of
+    them changes. Reload hooks let caches derived from the configs
+    (e.g. the routing cache) invalidate themselves.
+    """
+
+    def __init__(self, manifest_path: str = MANIFEST_PATH, agents_dir: str = AGENTS_DIR,
+                 check_interval: float = CHECK_INTERVAL):
+        self.manifest_path = manifest_path
+        self.agents_dir = agents_dir
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._hooks: List[Callable[[], None]] = []
+        self._agents: Dict[str, CompiledAgent] = {}
+        self._manifest: List[Dict[str, Any]] = []
+        self._listing: List[Dict[str, Any]] = []
+        self._mtimes: Dict[str, Optional[float]] = {}
+        self._last_check = 0.0
+        self.version = 0
+        self.etag = ""
+        self._load()
+
+    def _config_path(self, agent_name: str) -> str:
+        return os.path.join(self.agents_dir, agent_name, "config.json")
+
+    @staticmethod
+    def _mtime(path: str) -> Optional[float]:
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return None
+
+    def _load(self):
+        with open(self.manifest_path, "r") as f:
+            manifest = json.load(f)
+
+        agents, mtimes = {}, {self.manifest_path: self._mtime(self.manifest_path)}
+        for entry in manifest:
+            path = self._config_path(entry["name"])
+            mtimes[path] = self._mtime(path)
+            file_config = {}
+            if mtimes[path] is None:
+                logging.warning(f"No config.json found for agent '{entry['name']}'")
+            else:
+                with open(path, "r") as f:
+                    file_config = json.load(f)
+            agents[entry["name"]] = CompiledAgent(entry, file_config)
+
+        listing = [agent.public_info() for agent in agents.values()]
+        etag = hashlib.sha1(json.dumps(listing, sort_keys=True).encode("utf-8")).hexdigest()
+
+        with self._lock:
+            self._manifest = manifest
+            self._agents = agents
+            self._mtimes = mtimes
+            self._listing = listing
+            self.etag = f'"{etag}"'
+            self.version += 1
+            self._last_check = time.monotonic()
+
+    def refresh(self, force: bool = False) -> bool:
+        """Reloads if any watched file changed. Returns True when a reload happened."""
+        now = time.monotonic()
+        if not force and now - self._last_check < self.check_interval:
+            return False
+        self._last_check = now
+
+        changed = force or any(self._mtime(path) != mtime for path, mtime in self._mtimes.items())
+        if not changed:
+            return False
+
+        print("[AgentRegistry] Agent configs changed, reloading.")
+        try:
+            self._load()
+        except (OSError, ValueError, KeyError) as e:
+            # Keep serving the last good snapshot; _mtimes is unchanged, so the
+            # next check sees the change again and retries
+            logging.warning(f"Agent registry reload failed, keeping version {self.version}: {e}")
+            return False
+        for hook in self._hooks:
+            hook()
+        return True
+
+    def on_reload(self, hook: Callable[[], None]):
+        """Registers a callback fired after the registry reloads."""
+        self._hooks.append(hook)
+
+    def get(self, agent_name: str) -> Optional[CompiledAgent]:
+        self.refresh()
+        return self._agents.get(agent_name)
+
+    def config(self, agent_name: str) -> Dict[str, Any]:
+        agent = self.get(agent_name)
+        return agent.config if agent else {}
+
+    def manifest(self) -> List[Dict[str, Any]]:
+        self.refresh()
+        return self._manifest
+
+    def listing(self) -> List[Dict[str, Any]]:
+        self.refresh()
+        return self._listing
+
+
+# Shared registry, built once at import
+agent_registry = AgentRegistry()
@@ -0,0 +1,97 @@
+# utils/bm25.py
+
+import math
+import re
+from collections import Counter
+from typing import Dict, Hashable, Iterable, List, Sequence, Tuple
+
+# Words, numbers and dotted/dashed identifiers ("4.2", "sku-1138") as one token
+_TOKEN = re.compile(r"[a-z0-9]+(?:[.\-_/][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased tokens. Compound identifiers are kept whole and also split
+    into their parts, so "Clause 4.2" matches both "4.2" and "clause 4".
+    """
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(re.split(r"[.\-_/]", token))
+    return tokens
+
+
+class BM25Index:
+    """
+    In-process inverted index with Okapi BM25 scoring over a fixed list of
+    documents (chunk texts, in the same order as the FAISS index).
+
+    Postings map each term to (doc_id, term frequency) pairs, so a query
+    only touches the documents that contain one of its terms.
+    """
+
+    def __init__(self, texts: Iterable[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.doc_lengths: List[int] = []
+        for doc_id, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            self.doc_lengths.append(sum(counts.values()))
+            for term, freq in counts.items():
+                self.postings.setdefault(term, []).append((doc_id, freq))
+        self.avg_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self) - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[int, float]]:
+        """Top-k (doc_id, score), best first."""
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf(term)
+            for doc_id, freq in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / (self.avg_length or 1))
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * freq * (self.k1 + 1) / (freq + norm)
+        return sorted(scores.items(), key=lambda item: -item[1])[:k]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Hashable]], k: int = 60) -> List[Tuple[Hashable, float]]:
+    """Fuses ranked lists: score(d) = sum over lists of 1 / (k + rank of d), best first."""
+    scores: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])
+
+
+class LexicalReranker:
+    """
+    Cheap local reranker: the share of the query's (idf-weighted) terms a
+    candidate contains, blended with its fused retrieval score. Candidates
+    that cover every distinctive term of the question move to the top.
+    """
+
+    def __init__(self, index: BM25Index, weight: float = 0.5):
+        self.index = index
+        self.weight = weight
+
+    def rerank(self, query: str, candidates: List[Tuple[Hashable, str, float]]) -> List[Tuple[Hashable, float]]:
+        """`candidates` are (id, text, fused score); returns (id, blended score), best first."""
+        terms = {term: self.index.idf(term) for term in set(tokenize(query))}
+        total = sum(terms.values()) or 1.0
+        top = max((score for _, _, score in candidates), default=0.0) or 1.0
+        rescored = []
+        for item, text, score in candidates:
+            present = set(tokenize(text))
+            coverage = sum(idf for term, idf in terms.items() if term in present) / total
+            rescored.append((item, self.weight * coverage + (1 - self.weight) * score / top))
+        return sorted(rescored, key=lambda entry: -entry[1])
@@ -0,0 +1,220 @@
+# utils/checkpoints.py
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from utils.pdf_reader import file_hash
+
+# Where workflow step outputs are checkpointed. Off unless a workflow passes a
+# "run_id" / "checkpoint": true, or WORKFLOW_CHECKPOINTS=1 turns it on by default
+WORKFLOW_CHECKPOINT_DIR = os.getenv("WORKFLOW_CHECKPOINT_DIR", ".workflow_checkpoints")
+WORKFLOW_CHECKPOINTS = os.getenv("WORKFLOW_CHECKPOINTS", "0") == "1"
+# Seconds a checkpoint stays valid (0 = forever) and total size cap in bytes (0 = unlimited)
+WORKFLOW_CHECKPOINT_TTL = float(os.getenv("WORKFLOW_CHECKPOINT_TTL", str(7 * 24 * 3600)))
+WORKFLOW_CHECKPOINT_MAX_BYTES = int(os.getenv("WORKFLOW_CHECKPOINT_MAX_BYTES", str(64 * 1024 * 1024)))
+# Seconds between directory sweeps for expired checkpoints; under the size cap writes don't scan
+WORKFLOW_CHECKPOINT_SWEEP_INTERVAL = float(os.getenv("WORKFLOW_CHECKPOINT_SWEEP_INTERVAL", "3600"))
+
+# (path, size, mtime) -> content hash, so unchanged files are not re-read on every step
+_file_hashes: Dict[Tuple[str, int, int], str] = {}
+_file_hashes_lock = threading.Lock()
+
+
+def _content_hash(path: str) -> str:
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _file_hashes_lock:
+        digest = _file_hashes.get(memo_key)
+    if digest is None:
+        digest = file_hash(path)
+        with _file_hashes_lock:
+            _file_hashes[memo_key] = digest
+    return digest
+
+
+def file_fingerprints(value: Any) -> Dict[str, str]:
+    """
+    Content hashes of the files a step input points at ("pdf_path", "path",
+    ... values naming an existing file), so replacing a file in place
+    invalidates the checkpoint.
+    """
+    found = {}
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if isinstance(item, str) and (key == "path" or key.endswith("_path")) and os.path.isfile(item):
+                found[item] = _content_hash(item)
+            else:
+                found.update(file_fingerprints(item))
+    elif isinstance(value, list):
+        for item in value:
+            found.update(file_fingerprints(item))
+    return found
+
+
+def step_key(agent: str, formatted_input: Any, upstream: Iterable[str],
+             params: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Hash of a step's agent, its fully formatted input, the contents of the
+    files it reads, its upstream steps' keys and `params` (the agent's
+    cache_key_params, the run id).
+    """
+    payload = json.dumps(
+        {
+            "agent": agent,
+            "input": formatted_input,
+            "files": file_fingerprints(formatted_input),
+            "upstream": list(upstream),
+            "params": params or {},
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _ignore_missing(fn, path: str):
+    """Runs a file operation that may race with another process removing the file."""
+    try:
+        fn(path)
+    except FileNotFoundError:
+        pass
+
+
+class CheckpointStore:
+    """
+    On-disk store of workflow step outputs, one JSON file per step key.
+
+    A rerun of a workflow looks each step up by its key: unchanged steps
+    are served from here, and a step whose input (or any upstream output)
+    changed gets a new key and runs again. Error outputs are never stored.
+    Checkpoints older than `ttl` are ignored and deleted; past `max_bytes`
+    the least recently used ones are evicted. Writes keep a running total
+    of the directory's size, so it is only scanned when the total passes
+    `max_bytes` or every `sweep_interval` seconds (for expired files).
+    """
+
+    def __init__(self, directory: str = WORKFLOW_CHECKPOINT_DIR, ttl: float = WORKFLOW_CHECKPOINT_TTL,
+                 max_bytes: int = WORKFLOW_CHECKPOINT_MAX_BYTES,
+                 sweep_interval: float = WORKFLOW_CHECKPOINT_SWEEP_INTERVAL):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Running size of the directory (None until the first scan), reset by every sweep
+        self._bytes: Optional[int] = None
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Tuple[bool, Optional[Any]]:
+        """Returns (found, output)."""
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return False, None
+        if self.ttl and time.time() - record.get("stored_at", 0) > self.ttl:
+            size = _size(path)
+            _ignore_missing(os.remove, path)
+            self._add_bytes(-size)
+            self.misses += 1
+            return False, None
+        _ignore_missing(os.utime, path)  # mark as recently used
+        self.hits += 1
+        return True, record["output"]
+
+    def put(self, key: str, output, agent: str):
+        if isinstance(output, dict) and "error" in output:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        replaced = _size(path)
+        tmp_path = path + f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"agent": agent, "output": output, "stored_at": time.time()}, f, default=str)
+            written = f.tell()
+        os.replace(tmp_path, path)
+        self._add_bytes(written - replaced)
+        if self._sweep_due():
+            self.evict()
+
+    def _add_bytes(self, delta: int):
+        with self._lock:
+            if self._bytes is not None:
+                self._bytes += delta
+
+    def _sweep_due(self) -> bool:
+        with self._lock:
+            if self._bytes is None:
+                return True  # size of what earlier runs left behind is unknown yet
+            over_limit = self.max_bytes and self._bytes > self.max_bytes
+            expired_due = self.ttl and time.monotonic() - self._last_sweep >= self.sweep_interval
+        return bool(over_limit or expired_due)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Checkpoint files with their size and last use, least recently used first."""
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append({"path": entry.path, "bytes": stat.st_size, "last_used": stat.st_mtime})
+        return sorted(entries, key=lambda entry: entry["last_used"])
+
+    def evict(self) -> int:
+        """Deletes expired checkpoints, then least recently used ones beyond `max_bytes`."""
+        entries = self.entries()
+        total = sum(entry["bytes"] for entry in entries)
+        cutoff = time.time() - self.ttl if self.ttl else None
+        removed = 0
+        for entry in entries[:-1]:  # never evict the checkpoint just written
+            expired = cutoff is not None and entry["last_used"] < cutoff
+            if not expired and (not self.max_bytes or total <= self.max_bytes):
+                break
+            _ignore_missing(os.remove, entry["path"])
+            total -= entry["bytes"]
+            removed += 1
+        with self._lock:
+            self._bytes = total
+            self._last_sweep = time.monotonic()
+        self.evictions += removed
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self.entries()
+        return {
+            "directory": self.directory,
+            "checkpoints": len(entries),
+            "bytes": sum(entry["bytes"] for entry in entries),
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+checkpoint_store = CheckpointStore()
@@ -0,0 +1,35 @@
+# utils/concurrency.py
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Iterable, List
+
+
+async def gather_bounded(items: Iterable[Any], fn: Callable[[Any], Awaitable[Any]], limit: int) -> List[Any]:
+    """
+    Runs `fn(item)` for every item with at most `limit` calls in flight.
+
+    Results come back in input order. An exception raised for one item is
+    returned in that item's slot instead of failing the whole batch.
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run_one(item):
+        async with semaphore:
+            return await fn(item)
+
+    return await asyncio.gather(*(run_one(item) for item in items), return_exceptions=True)
+
+
+def batch_item(index: int, result: Any, **extra) -> Dict[str, Any]:
+    """
+    Shapes one batch result: `output` on success, `error` when the call raised
+    or returned an error dict.
+    """
+    item = {"index": index, **extra}
+    if isinstance(result, BaseException):
+        item["error"] = str(result)
+    elif isinstance(result, dict) and "error" in result:
+        item["error"] = result["error"]
+    else:
+        item["output"] = result
+    return item
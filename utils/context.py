@@ -0,0 +1,56 @@
+# utils/context.py
+
+from collections.abc import Mapping
+from typing import Any, Iterator
+
+
+class LayeredContext(Mapping):
+    """
+    Read-only view over several context layers, searched in order
+    (e.g. step context -> workflow context -> memory).
+
+    Nothing is copied: a key is resolved only when it is looked up, so
+    `str.format_map(LayeredContext(...))` touches just the keys a template
+    references. Dict layers are checked with `in`; `Memory` layers with
+    `get` (a stored None counts as missing).
+    """
+
+    def __init__(self, *layers):
+        self.layers = [layer for layer in layers if layer is not None]
+
+    def __getitem__(self, key: str) -> Any:
+        for layer in self.layers:
+            if isinstance(layer, Mapping):
+                if key in layer:
+                    return layer[key]
+            else:
+                value = layer.get(key)
+                if value is not None:
+                    return value
+        raise KeyError(key)
+
+    def __contains__(self, key) -> bool:
+        try:
+            self[key]
+            return True
+        except KeyError:
+            return False
+
+    def _keys(self):
+        keys = {}
+        for layer in self.layers:
+            source = layer if isinstance(layer, Mapping) else layer.all()
+            for key in source:
+                keys.setdefault(key, None)
+        return keys
+
+    # Iteration has to enumerate every layer; avoid it on hot paths
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys())
+
+    def __len__(self) -> int:
+        return len(self._keys())
+
+    def new_child(self, layer) -> "LayeredContext":
+        """A view with `layer` searched before the existing layers."""
+        return LayeredContext(layer, *self.layers)
@@ -0,0 +1,104 @@
+# utils/embedding_cache.py
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, List, Sequence
+
+# Content-addressed chunk vectors, shared by every document; EMBEDDING_CACHE=0 disables it
+EMBEDDING_CACHE_DB = os.getenv("EMBEDDING_CACHE_DB", "embedding_cache.db")
+EMBEDDING_CACHE = os.getenv("EMBEDDING_CACHE", "1") == "1"
+
+_SQL_BATCH = 500  # stays under SQLite's bound-parameter limit
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def pack_vector(vector: Sequence[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def unpack_vector(blob: bytes) -> List[float]:
+    vector = array("f")
+    vector.frombytes(blob)
+    return vector.tolist()
+
+
+class EmbeddingCache:
+    """
+    Chunk vectors keyed by (embedding model, sha256 of the chunk text),
+    stored as float32 blobs in SQLite (WAL mode, per-thread connections).
+
+    An edited document shares most of its chunks with the previous
+    version, so re-indexing it only embeds the chunks whose text changed.
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_DB, busy_timeout: float = 5.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        # Guards the counters: documents indexed by concurrent requests share this cache
+        self._counter_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        # Never reuse a connection inherited across fork()
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model      TEXT NOT NULL,
+                    chunk_hash TEXT NOT NULL,
+                    dim        INTEGER NOT NULL,
+                    vector     BLOB NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (model, chunk_hash)
+                ) WITHOUT ROWID
+                """
+            )
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get_many(self, model: str, hashes: Iterable[str]) -> Dict[str, List[float]]:
+        """Vectors found for these chunk hashes (missing ones are simply absent)."""
+        hashes = list(dict.fromkeys(hashes))
+        found = {}
+        conn = self._conn()
+        for start in range(0, len(hashes), _SQL_BATCH):
+            batch = hashes[start:start + _SQL_BATCH]
+            rows = conn.execute(
+                f"SELECT chunk_hash, vector FROM embeddings WHERE model = ? AND chunk_hash IN ({','.join('?' * len(batch))})",
+                [model, *batch],
+            ).fetchall()
+            found.update((digest, unpack_vector(blob)) for digest, blob in rows)
+        with self._counter_lock:
+            self.hits += len(found)
+            self.misses += len(hashes) - len(found)
+        return found
+
+    def put_many(self, model: str, vectors: Dict[str, Sequence[float]]):
+        now = time.time()
+        with self._conn() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, chunk_hash, dim, vector, created_at) VALUES (?, ?, ?, ?, ?)",
+                [(model, digest, len(vector), pack_vector(vector), now) for digest, vector in vectors.items()],
+            )
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def stats(self) -> Dict[str, int]:
+        return {"path": self.path, "vectors": len(self), "hits": self.hits, "misses": self.misses}
+
+
+embedding_cache = EmbeddingCache()
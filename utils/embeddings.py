@@ -0,0 +1,68 @@
+# utils/embeddings.py
+#
+# Pluggable embedding backends. Every backend is a LangChain `Embeddings`
+# (embed_documents / embed_query), so FAISS can use it for queries too.
+# Imported lazily by utils/vector_store.py (LangChain is heavy to import).
+
+import hashlib
+import math
+import os
+import re
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+# "openai" (network) or "hashing" (deterministic, local; for tests and benchmarks)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002")
+HASHING_EMBEDDING_DIM = int(os.getenv("HASHING_EMBEDDING_DIM", "384"))
+
+_TOKEN = re.compile(r"\w+")
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Feature-hashing embedder: word unigrams and bigrams are hashed into
+    `dim` signed buckets, counts are log-scaled and the vector is L2
+    normalized. Needs no network or model download and always returns the
+    same vector for the same text, so ingestion can be tested and
+    benchmarked offline. Retrieval quality is lexical, not semantic.
+    """
+
+    def __init__(self, dim: int = HASHING_EMBEDDING_DIM):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        tokens = _TOKEN.findall(text.lower())
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = [0.0] * self.dim
+        for feature in self._features(text):
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        vector = [math.copysign(math.log1p(abs(value)), value) for value in vector]
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+
+def backend_id(name: str = EMBEDDING_BACKEND) -> str:
+    """Identifies the vectors a backend produces (embedding cache and index keys)."""
+    if name == "hashing":
+        return f"hashing:{HASHING_EMBEDDING_DIM}"
+    return f"{name}:{EMBEDDING_MODEL}"
+
+
+def get_embedding_backend(name: str = EMBEDDING_BACKEND, max_retries: Optional[int] = None) -> Embeddings:
+    """`max_retries` sets the API client's own retries (see utils.llm_client.get_embeddings)."""
+    if name == "hashing":
+        return HashingEmbeddings()
+    if name == "openai":
+        from utils.llm_client import get_embeddings
+
+        return get_embeddings(max_retries=max_retries, model=EMBEDDING_MODEL)
+    raise ValueError(f"Unknown EMBEDDING_BACKEND '{name}' (expected 'openai' or 'hashing')")
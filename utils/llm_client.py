@@ -0,0 +1,146 @@
+# utils/llm_client.py
+
+import os
+import threading
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+
+from utils.resilience import current_policy
+
+load_dotenv()
+openai_key = os.getenv("OPENAI_API_KEY")
+
+# Connection pool settings shared by every LLM/embedding client in the process
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "20"))
+LLM_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_KEEPALIVE_CONNECTIONS", str(LLM_POOL_SIZE)))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+# Built-in client retries, used only when no ResiliencePolicy is retrying the call
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+
+DEFAULT_MODEL = "gpt-3.5-turbo-instruct"
+
+_lock = threading.Lock()
+_clients: Dict[tuple, Any] = {}
+_http_client = None
+_http_async_client = None
+
+
+def _pool_settings():
+    import httpx
+
+    limits = httpx.Limits(
+        max_connections=LLM_POOL_SIZE,
+        max_keepalive_connections=LLM_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+    return limits, timeout
+
+
+def get_http_client():
+    """Returns the process-wide pooled (keep-alive) sync HTTP transport."""
+    global _http_client
+    if _http_client is None:
+        with _lock:
+            if _http_client is None:
+                import httpx
+
+                limits, timeout = _pool_settings()
+                _http_client = httpx.Client(limits=limits, timeout=timeout)
+    return _http_client
+
+
+def get_http_async_client():
+    """Returns the process-wide pooled async HTTP transport."""
+    global _http_async_client
+    if _http_async_client is None:
+        with _lock:
+            if _http_async_client is None:
+                import httpx
+
+                limits, timeout = _pool_settings()
+                _http_async_client = httpx.AsyncClient(limits=limits, timeout=timeout)
+    return _http_async_client
+
+
+def _max_retries(max_retries: Optional[int]) -> int:
+    """Client-level retries: none when the caller's ResiliencePolicy already retries."""
+    if max_retries is not None:
+        return max_retries
+    policy = current_policy()
+    return 0 if policy is not None and policy.retries else LLM_MAX_RETRIES
+
+
+def _registry_key(kind: str, params: Dict[str, Any]) -> tuple:
+    return (kind,) + tuple(sorted((k, repr(v)) for k, v in params.items()))
+
+
+def _get_or_create(kind: str, params: Dict[str, Any], factory):
+    key = _registry_key(kind, params)
+    client = _clients.get(key)
+    if client is None:
+        # Build the transports outside the registry lock (they take it themselves)
+        http_client, http_async_client = get_http_client(), get_http_async_client()
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = factory(http_client, http_async_client)
+                _clients[key] = client
+    return client
+
+
+def get_llm(model_name: str = DEFAULT_MODEL, temperature: float = 0.0, max_retries: Optional[int] = None,
+            **params):
+    """
+    Returns a shared `langchain_openai.OpenAI` client for these settings.
+
+    Clients are cached per (model_name, temperature, other params) and all
+    of them share one pooled HTTP transport, so connections are reused
+    across calls instead of paying a new TLS handshake each time. Called
+    under a retrying `ResiliencePolicy` (an agent's or the router's), the
+    client gets max_retries=0 so the two retry loops don't multiply.
+    """
+    settings = {"model_name": model_name, "temperature": temperature, "max_retries": _max_retries(max_retries),
+                **params}
+
+    def factory(http_client, http_async_client):
+        from langchain_openai import OpenAI
+
+        return OpenAI(
+            openai_api_key=openai_key,
+            http_client=http_client,
+            http_async_client=http_async_client,
+            **settings,
+        )
+
+    return _get_or_create("llm", settings, factory)
+
+
+def get_embeddings(max_retries: Optional[int] = None, **params):
+    """Returns a shared `langchain_openai.OpenAIEmbeddings` client using the pooled transport."""
+    params = {"max_retries": _max_retries(max_retries), **params}
+
+    def factory(http_client, http_async_client):
+        from langchain_openai import OpenAIEmbeddings
+
+        return OpenAIEmbeddings(
+            openai_api_key=openai_key,
+            http_client=http_client,
+            http_async_client=http_async_client,
+            **params,
+        )
+
+    return _get_or_create("embeddings", params, factory)
+
+
+def client_stats() -> Dict[str, Any]:
+    """Pool configuration and number of cached clients."""
+    return {
+        "clients": len(_clients),
+        "pool_size": LLM_POOL_SIZE,
+        "keepalive_connections": LLM_KEEPALIVE_CONNECTIONS,
+        "timeout": LLM_TIMEOUT,
+        "connect_timeout": LLM_CONNECT_TIMEOUT,
+    }
@@ -1,45 +1,839 @@
 # utils/memory.py
+import asyncio
+import atexit
+import contextlib
+import copy
+import contextvars
+import hashlib
 import json
 import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
 
 MEMORY_FILE = "memory.json" # The file where memory will be stored
+JOURNAL_FILE = "memory.journal" # Append-only log replayed on top of MEMORY_FILE
+MEMORY_DB = os.getenv("MEMORY_DB", "memory.db") # SQLite database for the "sqlite" backend
 
-class Memory:
-    """A simple key-value store that persists to a JSON file."""
-    def __init__(self):
-        self._mem = {}
-        self._load() # Load from file on initialization
-        print(f"[Memory] Initialized. Loaded {len(self._mem)} items from {MEMORY_FILE}")
-
-    def _load(self):
-        if os.path.exists(MEMORY_FILE):
-            with open(MEMORY_FILE, "r") as f:
+# Storage backend: "journal" (append-only log + snapshot), "json" (rewrite the whole file)
+# or "sqlite" (shared database, safe with several worker processes)
+MEMORY_BACKEND = os.getenv("MEMORY_BACKEND", "journal")
+# Namespace used by `shared_memory`; sessions/users get their own via `Memory.scoped`
+MEMORY_NAMESPACE = os.getenv("MEMORY_NAMESPACE", "default")
+# Journal size (bytes) after which it is compacted into a fresh snapshot
+MEMORY_COMPACT_BYTES = int(os.getenv("MEMORY_COMPACT_BYTES", str(4 * 1024 * 1024)))
+# "buffered": a flush hands writes to the OS; "fsync": every flush is fsync'ed to disk
+MEMORY_DURABILITY = os.getenv("MEMORY_DURABILITY", "buffered")
+
+# Write-behind: buffer stores and flush every MEMORY_FLUSH_INTERVAL seconds or
+# once MEMORY_FLUSH_DIRTY_KEYS keys are dirty (and on shutdown)
+MEMORY_WRITE_BEHIND = os.getenv("MEMORY_WRITE_BEHIND", "0") == "1"
+MEMORY_FLUSH_INTERVAL = float(os.getenv("MEMORY_FLUSH_INTERVAL", "1.0"))
+MEMORY_FLUSH_DIRTY_KEYS = int(os.getenv("MEMORY_FLUSH_DIRTY_KEYS", "100"))
+
+# Capacity limits (0 = unlimited). Least recently used keys are evicted first.
+MEMORY_MAX_KEYS = int(os.getenv("MEMORY_MAX_KEYS", "0"))
+MEMORY_MAX_BYTES = int(os.getenv("MEMORY_MAX_BYTES", "0"))
+# Default per-key TTL in seconds (0 = keys never expire); `store(..., ttl=)` overrides it
+MEMORY_DEFAULT_TTL = float(os.getenv("MEMORY_DEFAULT_TTL", "0"))
+# Values whose JSON is larger than this many bytes are kept in the blob directory
+MEMORY_BLOB_THRESHOLD = int(os.getenv("MEMORY_BLOB_THRESHOLD", str(64 * 1024)))
+MEMORY_BLOB_DIR = os.getenv("MEMORY_BLOB_DIR", "memory_blobs")
+
+# Scoped Memory instances kept open by `Memory.scoped`; the least recently used is closed beyond this
+MEMORY_MAX_SCOPES = int(os.getenv("MEMORY_MAX_SCOPES", "128"))
+
+# Marks a stored envelope (TTL and/or blob reference) as opposed to a plain value
+ENVELOPE_KEY = "__memory__"
+# Top-level key of a memory file that holds several namespaces
+NAMESPACES_KEY = "__namespaces__"
+
+
+def _read_json_file(path: str) -> dict:
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            try:
+                return json.load(f)
+            except json.JSONDecodeError:
+                # If the file is empty or corrupt, start with an empty memory
+                return {}
+    return {}
+
+
+def _namespace_dir(namespace: str) -> str:
+    """Directory name for a namespace: readable prefix plus a hash, so "a b" and "a_b" never share one."""
+    safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in namespace)[:32]
+    return f"{safe}-{hashlib.sha256(namespace.encode('utf-8')).hexdigest()[:16]}"
+
+
+def _load_spaces(path: str, namespace: str) -> dict:
+    """namespace -> map from a memory file. A plain map (the original format) belongs to `namespace`."""
+    data = _read_json_file(path)
+    if isinstance(data, dict) and set(data) == {NAMESPACES_KEY}:
+        return data[NAMESPACES_KEY]
+    return {namespace: data} if data else {}
+
+
+def _dump_spaces(spaces: dict, namespace: str) -> dict:
+    """Inverse of `_load_spaces`: stays a plain map while only `namespace` holds keys."""
+    if any(mem for ns, mem in spaces.items() if ns != namespace):
+        return {NAMESPACES_KEY: {ns: mem for ns, mem in spaces.items() if mem}}
+    return spaces.get(namespace, {})
+
+
+class BlobStore:
+    """
+    Content-addressed directory for large values: `<sha256>.json` per value.
+    Identical values share one file; the main map only keeps the hash.
+    """
+
+    def __init__(self, root: str = MEMORY_BLOB_DIR, namespace: str = MEMORY_NAMESPACE):
+        self.root = root
+        self.namespace = namespace
+        self.path = os.path.join(root, _namespace_dir(namespace))
+
+    def _file(self, digest: str) -> str:
+        return os.path.join(self.path, f"{digest}.json")
+
+    def put(self, data: str) -> str:
+        digest = hashlib.sha256(data.encode("utf-8")).hexdigest()
+        if not os.path.exists(self._file(digest)):
+            os.makedirs(self.path, exist_ok=True)
+            tmp_path = self._file(digest) + f".{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(data)
+            os.replace(tmp_path, self._file(digest))
+        return digest
+
+    def get(self, digest: str):
+        try:
+            with open(self._file(digest), "r") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def gc(self, referenced) -> int:
+        """Deletes blobs whose hash is not in `referenced`. Returns how many were removed."""
+        if not os.path.isdir(self.path):
+            return 0
+        removed = 0
+        for name in os.listdir(self.path):
+            digest, ext = os.path.splitext(name)
+            if ext == ".json" and digest not in referenced:
+                os.remove(os.path.join(self.path, name))
+                removed += 1
+        return removed
+
+    def scoped(self, namespace: str) -> "BlobStore":
+        return BlobStore(self.root, namespace)
+
+
+class JsonFileBackend:
+    """
+    Original storage: the whole map is rewritten to one JSON file on every change.
+
+    Namespaces share the file; `scoped` returns a view onto it rather than
+    opening another file.
+    """
+
+    def __init__(self, path: str = MEMORY_FILE, durability: str = MEMORY_DURABILITY,
+                 namespace: str = MEMORY_NAMESPACE):
+        self.path = path
+        self.durability = durability
+        self.namespace = namespace
+        self._root_namespace = namespace
+        self._lock = threading.RLock()
+        self._spaces = _load_spaces(path, namespace)
+
+    @property
+    def _mem(self) -> dict:
+        return self._spaces.setdefault(self.namespace, {})
+
+    def _save(self):
+        with open(self.path, "w") as f:
+            json.dump(_dump_spaces(self._spaces, self._root_namespace), f, indent=2)
+            if self.durability == "fsync":
+                f.flush()
+                os.fsync(f.fileno())
+
+    def get(self, key: str):
+        return self._mem.get(key)
+
+    def set(self, key: str, value):
+        self.set_many({key: value})
+
+    def set_many(self, items: dict):
+        """Applies several writes with a single file rewrite."""
+        with self._lock:
+            self._mem.update(items)
+            self._save()
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._mem.pop(key, None)
+            self._save()
+
+    def all(self) -> dict:
+        with self._lock:
+            return self._mem.copy()
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+            self._save()
+
+    def __len__(self):
+        return len(self._mem)
+
+    def stats(self) -> dict:
+        return {"backend": "json", "path": self.path, "namespace": self.namespace, "keys": len(self._mem)}
+
+    def scoped(self, namespace: str):
+        view = copy.copy(self)
+        view.namespace = namespace
+        return view
+
+    def close(self):
+        pass
+
+
+class _Journal:
+    """The snapshot and journal files of a `JournalBackend`, shared by all its namespaces."""
+
+    def __init__(self, snapshot_path: str, journal_path: str, compact_bytes: int, durability: str,
+                 namespace: str):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.compact_bytes = compact_bytes
+        self.durability = durability
+        # Records without an "ns" field (and a plain snapshot) belong to this namespace
+        self.namespace = namespace
+        self.lock = threading.Lock()
+        self.compactor = None
+        self.compactions = 0
+
+        self.spaces = _load_spaces(snapshot_path, namespace)
+        # A leftover ".old" journal means a compaction was interrupted; replaying it is idempotent
+        for path in (self.old_journal_path, journal_path):
+            self._replay(path)
+
+        if os.path.exists(self.old_journal_path):
+            # Finish the interrupted compaction before accepting writes
+            self._write_snapshot(self.spaces)
+            os.remove(self.old_journal_path)
+            open(journal_path, "w").close()
+
+        self.file = open(journal_path, "a")
+        self.bytes = self.file.tell()
+
+    @property
+    def old_journal_path(self) -> str:
+        return self.journal_path + ".old"
+
+    def _replay(self, path: str):
+        if not os.path.exists(path):
+            return
+        with open(path, "r") as f:
+            for line in f:
                 try:
-                    self._mem = json.load(f)
+                    record = json.loads(line)
                 except json.JSONDecodeError:
-                    # If the file is empty or corrupt, start with an empty memory
-                    self._mem = {}
+                    # Torn final line from a crash mid-append
+                    continue
+                mem = self.spaces.setdefault(record.get("ns", self.namespace), {})
+                if record.get("op") == "set":
+                    mem[record["key"]] = record["value"]
+                elif record.get("op") == "del":
+                    mem.pop(record["key"], None)
+                elif record.get("op") == "clear":
+                    mem.clear()
 
-    def _save(self):
-        """Saves the current memory state to the file."""
-        with open(MEMORY_FILE, "w") as f:
-            json.dump(self._mem, f, indent=2)
+    def append(self, namespace: str, *records: dict):
+        if namespace != self.namespace:
+            records = [{**record, "ns": namespace} for record in records]
+        data = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records)
+        self.file.write(data)
+        self.file.flush()
+        if self.durability == "fsync":
+            os.fsync(self.file.fileno())
+        self.bytes += len(data)
 
-    def store(self, key: str, value):
-        print(f"[Memory] Storing '{key}'...")
-        self._mem[key] = value
-        self._save() # <-- Save after every change
+    def maybe_compact(self):
+        if self.bytes < self.compact_bytes:
+            return
+        if self.compactor is not None and self.compactor.is_alive():
+            return
+        self.compactor = threading.Thread(target=self.compact, daemon=True)
+        self.compactor.start()
+
+    def compact(self):
+        with self.lock:
+            snapshot = {ns: mem.copy() for ns, mem in self.spaces.items()}
+            # Rotate: records written from now on go to a fresh journal
+            self.file.close()
+            os.replace(self.journal_path, self.old_journal_path)
+            self.file = open(self.journal_path, "a")
+            self.bytes = 0
+
+        self._write_snapshot(snapshot)
+        os.remove(self.old_journal_path)
+        self.compactions += 1
+        keys = sum(len(mem) for mem in snapshot.values())
+        print(f"[Memory] Compacted journal into {self.snapshot_path} ({keys} keys).")
+
+    def _write_snapshot(self, spaces: dict):
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(_dump_spaces(spaces, self.namespace), f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+    def close(self):
+        if self.compactor is not None:
+            self.compactor.join()
+        with self.lock:
+            self.file.close()
+
+
+class JournalBackend:
+    """
+    Snapshot + append-only journal.
+
+    Each `set`/`clear` appends one compact JSON record to the journal, so a
+    write costs O(record) instead of O(memory). On startup the snapshot is
+    loaded and the journal replayed over it. Once the journal grows past
+    `compact_bytes`, a background thread writes a new snapshot and drops
+    the records it covers.
+
+    Namespaces live in the same two files (records carry an "ns" field), so
+    `scoped` returns a view that opens no file of its own.
+    """
+
+    def __init__(self, snapshot_path: str = MEMORY_FILE, journal_path: str = JOURNAL_FILE,
+                 compact_bytes: int = MEMORY_COMPACT_BYTES, durability: str = MEMORY_DURABILITY,
+                 namespace: str = MEMORY_NAMESPACE, journal: _Journal = None):
+        self.namespace = namespace
+        self._owner = journal is None
+        self._log = journal or _Journal(snapshot_path, journal_path, compact_bytes, durability, namespace)
+
+    @property
+    def snapshot_path(self) -> str:
+        return self._log.snapshot_path
+
+    @property
+    def journal_path(self) -> str:
+        return self._log.journal_path
+
+    @property
+    def compactions(self) -> int:
+        return self._log.compactions
+
+    @property
+    def _mem(self) -> dict:
+        return self._log.spaces.setdefault(self.namespace, {})
 
     def get(self, key: str):
         return self._mem.get(key)
 
+    def set(self, key: str, value):
+        self.set_many({key: value})
+
+    def set_many(self, items: dict):
+        """Appends all records with one write."""
+        with self._log.lock:
+            self._mem.update(items)
+            self._log.append(self.namespace, *({"op": "set", "key": key, "value": value} for key, value in items.items()))
+            self._log.maybe_compact()
+
+    def delete_many(self, keys):
+        with self._log.lock:
+            for key in keys:
+                self._mem.pop(key, None)
+            self._log.append(self.namespace, *({"op": "del", "key": key} for key in keys))
+
+    def all(self) -> dict:
+        with self._log.lock:
+            return self._mem.copy()
+
+    def clear(self):
+        with self._log.lock:
+            self._mem.clear()
+            self._log.append(self.namespace, {"op": "clear"})
+
+    def __len__(self):
+        return len(self._mem)
+
+    def compact(self):
+        """Writes the current state as the snapshot and truncates the journal."""
+        self._log.compact()
+
+    def stats(self) -> dict:
+        return {
+            "backend": "journal",
+            "path": self.snapshot_path,
+            "journal": self.journal_path,
+            "namespace": self.namespace,
+            "keys": len(self._mem),
+            "journal_bytes": self._log.bytes,
+            "compactions": self.compactions,
+        }
+
+    def scoped(self, namespace: str):
+        return JournalBackend(namespace=namespace, journal=self._log)
+
+    def close(self):
+        # Views share the owner's files; only the owner closes them
+        if self._owner:
+            self._log.close()
+
+
+class SQLiteBackend:
+    """
+    Key-value rows in a SQLite database in WAL mode.
+
+    Readers never block the writer and every worker process can open the
+    same file, so several uvicorn workers share one memory without losing
+    writes. Rows are keyed by (namespace, key), so a lookup is a primary
+    key seek rather than a full load. Connections are per thread and per
+    process.
+    """
+
+    def __init__(self, path: str = MEMORY_DB, namespace: str = MEMORY_NAMESPACE,
+                 busy_timeout: float = 5.0, durability: str = MEMORY_DURABILITY):
+        self.path = path
+        self.namespace = namespace
+        self.busy_timeout = busy_timeout
+        self.durability = durability
+        self._owner = True
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS memory (
+                    namespace  TEXT NOT NULL,
+                    key        TEXT NOT NULL,
+                    value      TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                ) WITHOUT ROWID
+                """
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        # Never reuse a connection inherited across fork()
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA synchronous={'FULL' if self.durability == 'fsync' else 'NORMAL'}")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key: str):
+        row = self._conn().execute(
+            "SELECT value FROM memory WHERE namespace = ? AND key = ?", (self.namespace, key)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value):
+        self.set_many({key: value})
+
+    def set_many(self, items: dict):
+        """Upserts all items in one transaction."""
+        now = time.time()
+        with self._conn() as conn:
+            conn.executemany(
+                """
+                INSERT INTO memory (namespace, key, value, updated_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+                """,
+                [(self.namespace, key, json.dumps(value), now) for key, value in items.items()],
+            )
+
+    def delete_many(self, keys):
+        with self._conn() as conn:
+            conn.executemany(
+                "DELETE FROM memory WHERE namespace = ? AND key = ?",
+                [(self.namespace, key) for key in keys],
+            )
+
+    def all(self) -> dict:
+        rows = self._conn().execute(
+            "SELECT key, value FROM memory WHERE namespace = ?", (self.namespace,)
+        ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def clear(self):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM memory WHERE namespace = ?", (self.namespace,))
+
+    def __len__(self):
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM memory WHERE namespace = ?", (self.namespace,)
+        ).fetchone()[0]
+
+    def stats(self) -> dict:
+        return {"backend": "sqlite", "path": self.path, "namespace": self.namespace, "keys": len(self)}
+
+    def scoped(self, namespace: str):
+        # Same database and per-thread connections, different namespace
+        view = copy.copy(self)
+        view.namespace = namespace
+        view._owner = False
+        return view
+
+    def close(self):
+        if not self._owner:
+            return
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+            self._local.conn = None
+
+
+BACKENDS = {
+    "json": JsonFileBackend,
+    "journal": JournalBackend,
+    "sqlite": SQLiteBackend,
+}
+
+
+def make_backend(name: str = MEMORY_BACKEND):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown MEMORY_BACKEND '{name}'. Choose from: {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
+
+
+class Memory:
+    """
+    A simple key-value store persisted by a pluggable storage backend.
+
+    Writes can be grouped: inside `with memory.batch():` stores are buffered
+    (and visible to `get`/`all` in the same context) and reach the backend
+    as one write when the block exits. With `write_behind=True` every store
+    is buffered and flushed by a background thread every `flush_interval`
+    seconds, as soon as `flush_dirty_keys` keys are dirty, and on shutdown.
+
+    Capacity: once more than `max_keys` keys or `max_bytes` bytes of values
+    are stored, least recently used keys are evicted. Keys may carry a TTL,
+    and values over `blob_threshold` bytes live in a content-addressed
+    `BlobStore`, loaded only when read. The LRU order and sizes are tracked
+    per process.
+    """
+    def __init__(self, backend=None, write_behind: bool = MEMORY_WRITE_BEHIND,
+                 flush_interval: float = MEMORY_FLUSH_INTERVAL,
+                 flush_dirty_keys: int = MEMORY_FLUSH_DIRTY_KEYS,
+                 max_keys: int = MEMORY_MAX_KEYS, max_bytes: int = MEMORY_MAX_BYTES,
+                 default_ttl: float = MEMORY_DEFAULT_TTL,
+                 blob_threshold: int = MEMORY_BLOB_THRESHOLD, blobs: BlobStore = None):
+        self.backend = backend if backend is not None else make_backend()
+        self.write_behind = write_behind
+        self.flush_interval = flush_interval
+        self.flush_dirty_keys = flush_dirty_keys
+        self.max_keys = max_keys
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.blob_threshold = blob_threshold
+        self.blobs = blobs if blobs is not None else BlobStore()
+        self.flushes = 0
+        # Eviction counters are cumulative across runs (persisted next to the blobs on close)
+        counters = _read_json_file(self._counters_path)
+        self.evictions = counters.get("evictions", 0)
+        self.expirations = counters.get("expirations", 0)
+        self._batch = contextvars.ContextVar(f"memory_batch_{id(self)}", default=None)
+        self._dirty = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.RLock()
+        self._closed = threading.Event()
+        self._scopes = OrderedDict()
+        self._scopes_lock = threading.Lock()
+
+        # key -> stored size in bytes, oldest access first (only kept when bounded)
+        self._sizes = OrderedDict()
+        self._total_bytes = 0
+        if self.bounded:
+            for key, stored in self.backend.all().items():
+                self._track(key, stored)
+
+        if write_behind:
+            threading.Thread(target=self._flush_periodically, daemon=True).start()
+        print(f"[Memory] Initialized. Loaded {len(self.backend)} items from {self.backend.stats()['path']}")
+
+    @property
+    def _counters_path(self) -> str:
+        return os.path.join(self.blobs.path, "counters.meta")
+
+    def _save_counters(self):
+        if not (self.evictions or self.expirations):
+            return
+        os.makedirs(self.blobs.path, exist_ok=True)
+        with open(self._counters_path, "w") as f:
+            json.dump({"evictions": self.evictions, "expirations": self.expirations}, f)
+
+    @property
+    def bounded(self) -> bool:
+        return bool(self.max_keys or self.max_bytes)
+
+    # --- Stored representation ---
+
+    def _encode(self, value, ttl):
+        """Turns a value into what the backend stores: the value itself or an envelope."""
+        ttl = self.default_ttl if ttl is None else ttl
+        envelope = {ENVELOPE_KEY: 1}
+        if ttl:
+            envelope["expires_at"] = time.time() + ttl
+        data = json.dumps(value)
+        if self.blob_threshold and len(data) > self.blob_threshold:
+            envelope.update(blob=self.blobs.put(data), size=len(data))
+        elif not ttl:
+            return value
+        else:
+            envelope["value"] = value
+        return envelope
+
+    @staticmethod
+    def _is_envelope(stored) -> bool:
+        return isinstance(stored, dict) and stored.get(ENVELOPE_KEY) == 1
+
+    def _expired(self, stored) -> bool:
+        return self._is_envelope(stored) and stored.get("expires_at", float("inf")) <= time.time()
+
+    def _decode(self, stored):
+        if not self._is_envelope(stored):
+            return stored
+        if "blob" in stored:
+            return self.blobs.get(stored["blob"])
+        return stored.get("value")
+
+    def _stored_size(self, stored) -> int:
+        if self._is_envelope(stored) and "blob" in stored:
+            return stored["size"]
+        return len(json.dumps(stored))
+
+    # --- Public API ---
+
+    def store(self, key: str, value, ttl: float = None):
+        print(f"[Memory] Storing '{key}'...")
+        stored = self._encode(value, ttl)
+        pending = self._batch.get()
+        if pending is not None:
+            pending[key] = stored
+        else:
+            self._write({key: stored})
+
+    def get(self, key: str):
+        stored = self._raw_get(key)
+        if stored is None:
+            return None
+        if self._expired(stored):
+            self._expire([key])
+            return None
+        with self._lock:
+            if key in self._sizes:
+                self._sizes.move_to_end(key)
+        return self._decode(stored)
+
+    def _raw_get(self, key: str):
+        pending = self._batch.get()
+        if pending and key in pending:
+            return pending[key]
+        with self._lock:
+            if key in self._dirty:
+                return self._dirty[key]
+        return self.backend.get(key)
+
     def all(self):
-        return self._mem.copy()
+        with self._lock:
+            dirty = self._dirty.copy()
+        stored = {**self.backend.all(), **dirty, **(self._batch.get() or {})}
+        expired = [key for key, item in stored.items() if self._expired(item)]
+        if expired:
+            self._expire(expired)
+        return {key: self._decode(item) for key, item in stored.items() if key not in expired}
 
     def clear(self):
         print("[Memory] Clearing all values.")
-        self._mem = {}
-        self._save() # <-- Save after clearing
+        pending = self._batch.get()
+        if pending:
+            pending.clear()
+        with self._flush_lock:
+            with self._lock:
+                self._dirty = {}
+                self._sizes.clear()
+                self._total_bytes = 0
+            self.backend.clear()
+            self.blobs.gc(set())
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Buffers every `store` in this block and writes them once on exit."""
+        if self._batch.get() is not None:
+            yield  # nested: the outer batch flushes
+            return
+        pending = {}
+        token = self._batch.set(pending)
+        try:
+            yield
+        finally:
+            self._batch.reset(token)
+            if pending:
+                self._write(pending)
+
+    @contextlib.asynccontextmanager
+    async def abatch(self):
+        """`batch` for async code: the buffered stores are written in a worker thread, off the event loop."""
+        if self._batch.get() is not None:
+            yield  # nested: the outer batch flushes
+            return
+        pending = {}
+        token = self._batch.set(pending)
+        try:
+            yield
+        finally:
+            self._batch.reset(token)
+            if pending:
+                await asyncio.to_thread(self._write, pending)
+
+    # --- Writing and eviction ---
+
+    def _write(self, items: dict):
+        if not self.write_behind or self._closed.is_set():
+            self._persist(items)
+            return
+        with self._lock:
+            self._dirty.update(items)
+            full = len(self._dirty) >= self.flush_dirty_keys
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Writes all dirty keys to the backend in one go."""
+        with self._flush_lock:
+            with self._lock:
+                items, self._dirty = self._dirty, {}
+            if items:
+                self._persist(items)
+
+    def _persist(self, items: dict):
+        with self._flush_lock:
+            self.backend.set_many(items)
+            self.flushes += 1
+            if not self.bounded:
+                return
+            with self._lock:
+                for key, stored in items.items():
+                    self._track(key, stored)
+                victims = self._pick_victims()
+            if victims:
+                self.backend.delete_many(victims)
+                self.evictions += len(victims)
+                print(f"[Memory] Evicted {len(victims)} least recently used keys.")
+
+    def _track(self, key: str, stored):
+        self._total_bytes -= self._sizes.pop(key, 0)
+        self._sizes[key] = self._stored_size(stored)
+        self._total_bytes += self._sizes[key]
+
+    def _pick_victims(self):
+        victims = []
+        # Always keep the most recent key, even if it alone exceeds max_bytes
+        while len(self._sizes) > 1 and (
+            (self.max_keys and len(self._sizes) > self.max_keys)
+            or (self.max_bytes and self._total_bytes > self.max_bytes)
+        ):
+            key, size = self._sizes.popitem(last=False)
+            self._total_bytes -= size
+            victims.append(key)
+        return victims
+
+    def _expire(self, keys):
+        with self._flush_lock:
+            with self._lock:
+                for key in keys:
+                    self._dirty.pop(key, None)
+                    self._total_bytes -= self._sizes.pop(key, 0)
+            pending = self._batch.get()
+            for key in keys:
+                if pending:
+                    pending.pop(key, None)
+            self.backend.delete_many(keys)
+            self.expirations += len(keys)
+
+    def gc_blobs(self) -> int:
+        """Removes blob files no longer referenced by any key. Returns how many were removed."""
+        self.flush()
+        referenced = {
+            stored["blob"] for stored in self.backend.all().values()
+            if self._is_envelope(stored) and "blob" in stored
+        }
+        return self.blobs.gc(referenced)
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
+
+    def stats(self):
+        return {
+            **self.backend.stats(),
+            "write_behind": self.write_behind,
+            "dirty": len(self._dirty),
+            "flushes": self.flushes,
+            "max_keys": self.max_keys,
+            "max_bytes": self.max_bytes,
+            "tracked_bytes": self._total_bytes if self.bounded else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "blob_dir": self.blobs.path,
+        }
+
+    def scoped(self, namespace: str, max_scopes: int = MEMORY_MAX_SCOPES) -> "Memory":
+        """
+        Memory for one session/user; keys never collide with other namespaces.
+        The namespace lives in this memory's backend. At most `max_scopes`
+        scoped instances stay open; the least recently used one is flushed
+        and closed, and reopened on its next use.
+        """
+        evicted = []
+        with self._scopes_lock:
+            scope = self._scopes.get(namespace)
+            if scope is None:
+                scope = self._scopes[namespace] = Memory(
+                    self.backend.scoped(namespace),
+                    self.write_behind,
+                    self.flush_interval,
+                    self.flush_dirty_keys,
+                    self.max_keys,
+                    self.max_bytes,
+                    self.default_ttl,
+                    self.blob_threshold,
+                    self.blobs.scoped(namespace),
+                )
+            self._scopes.move_to_end(namespace)
+            while max_scopes and len(self._scopes) > max_scopes:
+                evicted.append(self._scopes.popitem(last=False)[1])
+        for old in evicted:
+            old.close()
+        return scope
+
+    def close(self):
+        """Flushes pending writes and releases the backend (runs at exit for `shared_memory`)."""
+        self._closed.set()
+        self.flush()
+        self._save_counters()
+        with self._scopes_lock:
+            scopes, self._scopes = list(self._scopes.values()), OrderedDict()
+        for scope in scopes:
+            scope.close()
+        self.backend.close()
+
+# This shared instance loads on import and persists every change through its backend
+shared_memory = Memory()
+atexit.register(shared_memory.close)
+
 
-# This shared instance will now automatically load and save to memory.json
-shared_memory = Memory()
\ No newline at end of file
+def memory_for(session_id: str = None) -> Memory:
+    """The shared memory, or the namespace of `session_id` when one is given."""
+    return shared_memory.scoped(session_id) if session_id else shared_memory
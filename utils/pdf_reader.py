@@ -1,14 +1,193 @@
 # utils/pdf_reader.py
 
-import fitz  # PyMuPDF
+import atexit
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, Optional, Tuple
+
+# Page extraction runs in a process pool for documents with more than 2 * PDF_PAGES_PER_TASK pages
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(os.cpu_count() or 1)))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+# Extracted page text, keyed by (file hash, page number); PDF_PAGE_CACHE=0 disables it
+PDF_PAGE_CACHE_DB = os.getenv("PDF_PAGE_CACHE_DB", "pdf_page_cache.db")
+PDF_PAGE_CACHE = os.getenv("PDF_PAGE_CACHE", "1") == "1"
+
+
+def file_hash(path: str) -> str:
+    """sha256 of a file's bytes, read in 1 MB blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class PageTextCache:
+    """
+    Extracted text of PDF pages in SQLite (WAL mode, per-thread connections),
+    plus each document's page count, so a fully cached document is served
+    without opening it with PyMuPDF at all.
+    """
+
+    def __init__(self, path: str = PDF_PAGE_CACHE_DB, busy_timeout: float = 5.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        # Never reuse a connection inherited across fork()
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents (file_hash TEXT PRIMARY KEY, pages INTEGER NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS pages (
+                    file_hash TEXT NOT NULL,
+                    page      INTEGER NOT NULL,
+                    text      TEXT NOT NULL,
+                    PRIMARY KEY (file_hash, page)
+                ) WITHOUT ROWID
+                """
+            )
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def page_count(self, digest: str) -> Optional[int]:
+        row = self._conn().execute("SELECT pages FROM documents WHERE file_hash = ?", (digest,)).fetchone()
+        return row[0] if row else None
+
+    def get_pages(self, digest: str) -> Dict[int, str]:
+        rows = self._conn().execute("SELECT page, text FROM pages WHERE file_hash = ?", (digest,)).fetchall()
+        return dict(rows)
+
+    def put_pages(self, digest: str, page_count: int, texts: Dict[int, str]):
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO documents (file_hash, pages, updated_at) VALUES (?, ?, ?)",
+                (digest, page_count, time.time()),
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO pages (file_hash, page, text) VALUES (?, ?, ?)",
+                [(digest, page, text) for page, text in texts.items()],
+            )
+
+
+page_cache = PageTextCache()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS)
+            atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+        return _pool
+
+
+def _page_count(pdf_path: str) -> int:
+    import fitz  # PyMuPDF, deferred so importing this module stays cheap
+
+    with fitz.open(pdf_path) as doc:
+        return len(doc)
+
+
+def _extract_range(pdf_path: str, start: int, stop: int, doc=None):
+    """
+    Worker: text of pages [start, stop). Runs in a pool process, which
+    opens and closes the document for its range; in-process callers may
+    pass the document they already have open.
+    """
+    if doc is not None:
+        return [page.get_text() for page in doc.pages(start, stop)]
+    import fitz
+
+    with fitz.open(pdf_path) as doc:
+        return [page.get_text() for page in doc.pages(start, stop)]
+
+
+def iter_pdf_pages(pdf_path: str, workers: Optional[int] = None,
+                   digest: Optional[str] = None) -> Iterator[Tuple[int, str]]:
+    """
+    Yields (page_number, text) in page order while later pages are still
+    being extracted.
+
+    Cached pages are served from `page_cache`; the rest are extracted in
+    ranges of PDF_PAGES_PER_TASK pages by a process pool (in-process for
+    short documents or workers=1, through one document held open until
+    the iterator finishes) and cached as they arrive. Pass `digest` when
+    the caller already hashed the file.
+    """
+    workers = PDF_WORKERS if workers is None else workers
+    if PDF_PAGE_CACHE:
+        digest = digest or file_hash(pdf_path)
+    else:
+        digest = None
+    page_count = page_cache.page_count(digest) if digest else None
+    cached = page_cache.get_pages(digest) if page_count is not None else {}
+    if page_count is None:
+        page_count = _page_count(pdf_path)
+
+    missing = [page for page in range(page_count) if page not in cached]
+    ranges = []  # consecutive runs of missing pages, at most PDF_PAGES_PER_TASK long
+    for page in missing:
+        if ranges and ranges[-1][1] == page and ranges[-1][1] - ranges[-1][0] < PDF_PAGES_PER_TASK:
+            ranges[-1][1] = page + 1
+        else:
+            ranges.append([page, page + 1])
+
+    pending = {}
+    if workers > 1 and len(missing) > 2 * PDF_PAGES_PER_TASK:
+        pool = _get_pool()
+        pending = {start: pool.submit(_extract_range, pdf_path, start, stop) for start, stop in ranges}
+
+    doc = None  # opened on the first range extracted in-process
+    try:
+        range_starts = dict(ranges)
+        page = 0
+        while page < page_count:
+            if page in cached:
+                yield page, cached[page]
+                page += 1
+                continue
+            stop = range_starts[page]
+            future = pending.pop(page, None)
+            if future is not None:
+                texts = future.result()
+            else:
+                if doc is None:
+                    import fitz
+
+                    doc = fitz.open(pdf_path)
+                texts = _extract_range(pdf_path, page, stop, doc)
+            if digest:
+                page_cache.put_pages(digest, page_count, dict(zip(range(page, stop), texts)))
+            for text in texts:
+                yield page, text
+                page += 1
+    finally:
+        for future in pending.values():
+            future.cancel()
+        if doc is not None:
+            doc.close()
+
 
 def extract_text_from_pdf(pdf_path: str) -> str:
     """
     Extracts and returns clean text from a PDF file.
     """
     try:
-        doc = fitz.open(pdf_path)
-        text = "\n".join([page.get_text() for page in doc])
-        return text.strip()
+        return "\n".join(text for _, text in iter_pdf_pages(pdf_path)).strip()
     except Exception as e:
         raise RuntimeError(f"Failed to extract text: {e}")
@@ -1,24 +1,64 @@
 # utils/qa_chain.py
 
-from langchain.chains import RetrievalQA
-from langchain_openai import OpenAI
-from langchain.vectorstores.base import VectorStore
+from typing import TYPE_CHECKING, Optional
 import os 
 from dotenv import load_dotenv
+from utils.llm_client import get_llm
 load_dotenv()
 openai_key = os.getenv("OPENAI_API_KEY")
 
-def build_qa_chain(vectorstore: VectorStore) -> RetrievalQA:
+# LLM settings for the QA chain (also part of the response cache key)
+MODEL_PARAMS = {"model_name": "gpt-3.5-turbo-instruct", "temperature": 0.2}  # fast + low cost
+
+# Retrieval settings (also part of the response cache key):
+#   QA_RETRIEVAL  "hybrid" (BM25 + vector, fused with reciprocal-rank fusion) or "vector"
+#   QA_K          chunks stuffed into the prompt
+#   QA_FETCH_K    candidates taken from each retriever before fusion / reranking
+#   QA_RERANKER   "lexical" (local, no model) or "none"
+RETRIEVAL_PARAMS = {
+    "retrieval": os.getenv("QA_RETRIEVAL", "hybrid"),
+    "k": int(os.getenv("QA_K", "4")),
+    "fetch_k": int(os.getenv("QA_FETCH_K", "20")),
+    "reranker": os.getenv("QA_RERANKER", "lexical"),
+}
+
+if TYPE_CHECKING:
+    from langchain.chains import RetrievalQA
+    from langchain.vectorstores.base import VectorStore
+
+def build_retriever(vectorstore: "VectorStore", params: Optional[dict] = None):
     """
-    Creates a LangChain RetrievalQA chain using an OpenAI LLM and a vector retriever.
+    Returns the retriever described by `params` (defaults to RETRIEVAL_PARAMS).
+    Hybrid retrieval needs a FAISS store; its BM25 index is built once per store.
     """
-    retriever = vectorstore.as_retriever(search_type="similarity", k=4)
-    
-    llm = OpenAI(
-        temperature=0.2,
-        model_name="gpt-3.5-turbo-instruct",  # fast + low cost
+    params = {**RETRIEVAL_PARAMS, **(params or {})}
+    if params["retrieval"] != "hybrid":
+        return vectorstore.as_retriever(search_type="similarity", search_kwargs={"k": params["k"]})
+
+    # Deferred so importing this module stays cheap
+    from utils.retrieval import HybridRetriever, lexical_index_for, make_reranker
+
+    lexical_index = lexical_index_for(vectorstore)
+    return HybridRetriever(
+        vectorstore=vectorstore,
+        lexical_index=lexical_index,
+        k=params["k"],
+        fetch_k=params["fetch_k"],
+        reranker=make_reranker(params["reranker"], lexical_index),
     )
 
+def build_qa_chain(vectorstore: "VectorStore") -> "RetrievalQA":
+    """
+    Creates a LangChain RetrievalQA chain using an OpenAI LLM and the retriever
+    configured by RETRIEVAL_PARAMS (hybrid BM25 + vector by default).
+    """
+    # Deferred so importing this module stays cheap
+    from langchain.chains import RetrievalQA
+
+    retriever = build_retriever(vectorstore)
+    
+    llm = get_llm(**MODEL_PARAMS)
+
     qa_chain = RetrievalQA.from_chain_type(
         llm=llm,
         retriever=retriever,
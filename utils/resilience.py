@@ -0,0 +1,435 @@
+# utils/resilience.py
+
+import asyncio
+import contextvars
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+# Defaults for agents whose config.json has no "resilience" block
+# No deadline by default: a sync call with a deadline runs in its own thread, and one that
+# times out is abandoned (still running) rather than killed. Set it per agent or step instead
+AGENT_TIMEOUT = float(os.getenv("AGENT_TIMEOUT", "0"))  # seconds for the whole call, 0 = none
+AGENT_RETRIES = int(os.getenv("AGENT_RETRIES", "2"))
+AGENT_BACKOFF_BASE = float(os.getenv("AGENT_BACKOFF_BASE", "0.5"))
+AGENT_BACKOFF_MAX = float(os.getenv("AGENT_BACKOFF_MAX", "8"))
+# Hedging is off by default: a sync hedge cannot cancel the losing attempt, so it doubles the load
+AGENT_HEDGE = os.getenv("AGENT_HEDGE", "0") == "1"
+# Latency samples needed before the p95 hedge delay is trusted
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+
+POLICY_KEYS = ("timeout", "retries", "backoff_base", "backoff_max", "hedge", "hedge_after")
+
+# HTTP statuses worth retrying: request timeout, conflict, rate limit and 5xx
+TRANSIENT_STATUS = {408, 409, 429}
+# Client exception classes (openai, httpx) that mean timeout / network / rate limit / server error.
+# Matched by class name so neither library has to be imported here.
+TRANSIENT_ERRORS = {
+    "APITimeoutError", "APIConnectionError", "RateLimitError", "InternalServerError",
+    "TimeoutException", "NetworkError", "RemoteProtocolError",
+}
+
+# The policy currently running a call in this context (see `current_policy`)
+_current = contextvars.ContextVar("resilience_policy", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a call did not finish within its policy's timeout."""
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_transient(outcome) -> bool:
+    """
+    True for failures a retry may fix: timeouts, network errors, rate
+    limits and 5xx, judged by exception type or HTTP status. Tools that
+    turn exceptions into {"error": ...} results mark them with
+    "retryable": true (see `error_result`).
+    """
+    if isinstance(outcome, dict):
+        return "error" in outcome and outcome.get("retryable") is True
+    if not isinstance(outcome, BaseException):
+        return False
+    if isinstance(outcome, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = _status_code(outcome)
+    if status is not None:
+        return status in TRANSIENT_STATUS or status >= 500
+    return any(cls.__name__ in TRANSIENT_ERRORS for cls in type(outcome).__mro__)
+
+
+def error_result(error: BaseException, message: Optional[str] = None) -> Dict[str, Any]:
+    """The {"error": ...} result a tool returns for `error`, flagged "retryable" when it is transient."""
+    result = {"error": message if message is not None else str(error)}
+    if is_transient(error):
+        result["retryable"] = True
+    return result
+
+
+def current_policy() -> Optional["ResiliencePolicy"]:
+    """
+    The policy already running the current call, if any. Nested calls run
+    under it instead of adding their own retries, and LLM clients created
+    under a retrying policy skip their built-in retries.
+    """
+    return _current.get()
+
+
+def retry_after(outcome) -> Optional[float]:
+    """Seconds the server asked us to wait (Retry-After header on the exception's response), if any."""
+    if not isinstance(outcome, BaseException):
+        return None
+    headers = getattr(getattr(outcome, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        return None
+    return None
+
+
+class LatencyTracker:
+    """Sliding window of recent successful call latencies (seconds)."""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def __len__(self):
+        return len(self._samples)
+
+
+def _in_thread(fn, *args) -> Future:
+    """
+    Runs fn in a daemon thread (with the caller's context variables). Used
+    instead of a pool so nested calls can't deadlock.
+    """
+    future = Future()
+    context = contextvars.copy_context()
+
+    def target():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(context.run(fn, *args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=target, daemon=True).start()
+    return future
+
+
+class ResiliencePolicy:
+    """
+    Deadline, retries and hedging around one kind of call (an agent, a
+    workflow step, the router LLM).
+
+    Settings (config.json "resilience" block, or keys of a workflow step):
+        {
+            "timeout": 60,        # seconds for the whole call, retries included (0/None = none)
+            "retries": 2,         # extra attempts for transient failures
+            "backoff_base": 0.5,  # full-jitter exponential backoff: U(0, min(max, base * 2^n))
+            "backoff_max": 8,
+            "hedge": false,       # start a 2nd attempt if the 1st is slower than p95 ...
+            "hedge_after": 3.0    # ... or after this many seconds
+        }
+
+    Transient failures are timeouts, rate limits, 5xx and network errors
+    (see `is_transient`); a Retry-After header on a rate-limit error sets
+    the minimum pause. When retries run out the last error result is
+    returned (or exception raised); running out of time raises
+    `DeadlineExceeded`. Sync calls that time out, and losing sync hedges,
+    are abandoned, not killed (counted in "abandoned", and while still
+    running in "abandoned_running"), so deadlines and hedging are best
+    kept for async callers.
+
+    While a policy runs a call it is the `current_policy`: calls nested
+    inside it (an agent inside a workflow step) don't apply a policy of
+    their own, so retries never multiply.
+    """
+
+    def __init__(self, name: str = "", timeout: Optional[float] = None, retries: int = 0,
+                 backoff_base: float = AGENT_BACKOFF_BASE, backoff_max: float = AGENT_BACKOFF_MAX,
+                 hedge: bool = False, hedge_after: Optional[float] = None):
+        self.name = name
+        self.timeout = timeout or None
+        self.retries = max(0, int(retries))
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = bool(hedge)
+        self.hedge_after = hedge_after
+        self.latency = LatencyTracker()
+        self.counters = {"calls": 0, "retries": 0, "timeouts": 0, "hedges": 0, "hedge_wins": 0, "abandoned": 0}
+        # Sync attempts given up on (timed out or lost a hedge) whose threads are still running
+        self._abandoned = set()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], name: str = "", use_defaults: bool = True) -> "ResiliencePolicy":
+        """Builds a policy from a settings dict; missing keys fall back to the env defaults (or to "off")."""
+        settings = {
+            "timeout": AGENT_TIMEOUT, "retries": AGENT_RETRIES, "hedge": AGENT_HEDGE,
+        } if use_defaults else {}
+        settings.update({k: config[k] for k in POLICY_KEYS if k in config})
+        return cls(name=name, **settings)
+
+    def override(self, settings: Dict[str, Any], name: str = "") -> "ResiliencePolicy":
+        """A new policy with this one's settings, replaced by the `POLICY_KEYS` present in `settings`."""
+        merged = {
+            "timeout": self.timeout, "retries": self.retries, "backoff_base": self.backoff_base,
+            "backoff_max": self.backoff_max, "hedge": self.hedge, "hedge_after": self.hedge_after,
+        }
+        merged.update({k: settings[k] for k in POLICY_KEYS if k in settings})
+        return ResiliencePolicy(name=name or self.name, **merged)
+
+    @property
+    def active(self) -> bool:
+        return bool(self.timeout or self.retries or self.hedge)
+
+    def hedge_delay(self) -> Optional[float]:
+        if not self.hedge:
+            return None
+        if self.hedge_after is not None:
+            return float(self.hedge_after)
+        if len(self.latency) < HEDGE_MIN_SAMPLES:
+            return None
+        return self.latency.quantile(0.95)
+
+    def _backoff(self, attempt: int, outcome=None) -> float:
+        pause = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        # A rate-limited call waits at least as long as the server asked
+        return max(pause, retry_after(outcome) or 0.0)
+
+    def _remaining(self, deadline: Optional[float]) -> Optional[float]:
+        return None if deadline is None else deadline - time.monotonic()
+
+    def _timed_out(self):
+        self.counters["timeouts"] += 1
+        return DeadlineExceeded(f"{self.name or 'call'} exceeded its {self.timeout:g}s deadline")
+
+    # --- sync ---
+
+    def call(self, fn: Callable[..., Any], *args):
+        if not self.active:
+            return fn(*args)
+        token = _current.set(self)
+        try:
+            return self._call(fn, args)
+        finally:
+            _current.reset(token)
+
+    def _call(self, fn, args):
+        self.counters["calls"] += 1
+        deadline = time.monotonic() + self.timeout if self.timeout else None
+
+        for attempt in range(self.retries + 1):
+            try:
+                outcome = self._attempt(fn, args, deadline)
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                outcome = e
+            if not is_transient(outcome) or attempt == self.retries:
+                break
+            pause = self._backoff(attempt, outcome)
+            remaining = self._remaining(deadline)
+            if remaining is not None and remaining <= pause:
+                break
+            self.counters["retries"] += 1
+            print(f"[Resilience] {self.name}: transient failure, retry {attempt+1}/{self.retries} in {pause:.2f}s")
+            time.sleep(pause)
+
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    def _attempt(self, fn, args, deadline):
+        started = time.monotonic()
+        hedge_delay = self.hedge_delay()
+        if deadline is None and hedge_delay is None:
+            result = fn(*args)
+            self.latency.add(time.monotonic() - started)
+            return result
+
+        first = _in_thread(fn, *args)
+        futures = {first}
+        if hedge_delay is not None:
+            done, _ = wait(futures, timeout=self._clip(hedge_delay, deadline))
+            if not done and (deadline is None or time.monotonic() < deadline):
+                self.counters["hedges"] += 1
+                futures.add(_in_thread(fn, *args))
+
+        done, pending = wait(futures, timeout=self._remaining(deadline), return_when=FIRST_COMPLETED)
+        self._abandon(pending)
+        if not done:
+            raise self._timed_out()
+        winner = done.pop()
+        if winner is not first:
+            self.counters["hedge_wins"] += 1
+        result = winner.result()
+        self.latency.add(time.monotonic() - started)
+        return result
+
+    def _abandon(self, futures):
+        """Tracks attempt threads that are left running until they finish on their own."""
+        for future in futures:
+            self.counters["abandoned"] += 1
+            self._abandoned.add(future)
+            future.add_done_callback(self._abandoned.discard)
+
+    def _clip(self, delay: float, deadline: Optional[float]) -> float:
+        remaining = self._remaining(deadline)
+        return delay if remaining is None else max(0.0, min(delay, remaining))
+
+    # --- async ---
+
+    async def acall(self, afn: Callable[..., Awaitable[Any]], *args):
+        if not self.active:
+            return await afn(*args)
+        token = _current.set(self)
+        try:
+            return await self._acall(afn, args)
+        finally:
+            _current.reset(token)
+
+    async def _acall(self, afn, args):
+        self.counters["calls"] += 1
+        deadline = time.monotonic() + self.timeout if self.timeout else None
+
+        for attempt in range(self.retries + 1):
+            try:
+                outcome = await self._aattempt(afn, args, deadline)
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                outcome = e
+            if not is_transient(outcome) or attempt == self.retries:
+                break
+            pause = self._backoff(attempt, outcome)
+            remaining = self._remaining(deadline)
+            if remaining is not None and remaining <= pause:
+                break
+            self.counters["retries"] += 1
+            print(f"[Resilience] {self.name}: transient failure, retry {attempt+1}/{self.retries} in {pause:.2f}s")
+            await asyncio.sleep(pause)
+
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    async def _aattempt(self, afn, args, deadline):
+        started = time.monotonic()
+        first = asyncio.ensure_future(afn(*args))
+        tasks = {first}
+        try:
+            hedge_delay = self.hedge_delay()
+            if hedge_delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=self._clip(hedge_delay, deadline))
+                if not done and (deadline is None or time.monotonic() < deadline):
+                    self.counters["hedges"] += 1
+                    tasks.add(asyncio.ensure_future(afn(*args)))
+
+            done, _ = await asyncio.wait(tasks, timeout=self._remaining(deadline), return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                raise self._timed_out()
+            winner = done.pop()
+            if winner is not first:
+                self.counters["hedge_wins"] += 1
+            result = winner.result()
+            self.latency.add(time.monotonic() - started)
+            return result
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def astream(self, agen_fn: Callable[..., AsyncIterator[Any]], *args) -> AsyncIterator[Any]:
+        """
+        Yields the events of `agen_fn(*args)` under the deadline (for the
+        whole stream). A transient failure is retried only before the first
+        event, since events already sent can't be taken back. No hedging.
+        """
+        if not self.active:
+            async for event in agen_fn(*args):
+                yield event
+            return
+        self.counters["calls"] += 1
+        deadline = time.monotonic() + self.timeout if self.timeout else None
+
+        for attempt in range(self.retries + 1):
+            stream = agen_fn(*args)
+            started = False
+            try:
+                while True:
+                    # Each step runs as a task that sees this policy as `current_policy`
+                    token = _current.set(self)
+                    try:
+                        step = asyncio.ensure_future(stream.__anext__())
+                    finally:
+                        _current.reset(token)
+                    try:
+                        event = await asyncio.wait_for(step, self._remaining(deadline))
+                    except StopAsyncIteration:
+                        return
+                    except asyncio.TimeoutError:
+                        raise self._timed_out()
+                    started = True
+                    yield event
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                pause = self._backoff(attempt, e)
+                remaining = self._remaining(deadline)
+                if started or not is_transient(e) or attempt == self.retries or (
+                    remaining is not None and remaining <= pause
+                ):
+                    raise
+                self.counters["retries"] += 1
+                print(f"[Resilience] {self.name}: transient failure, retry {attempt+1}/{self.retries} in {pause:.2f}s")
+                await asyncio.sleep(pause)
+            finally:
+                await stream.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "timeout": self.timeout,
+            "retries_allowed": self.retries,
+            "hedge": self.hedge,
+            "abandoned_running": len(self._abandoned),
+            "p50": self.latency.quantile(0.5),
+            "p95": self.latency.quantile(0.95),
+        }
+
+
+_registry: Dict[str, ResiliencePolicy] = {}
+
+
+def register(policy: ResiliencePolicy) -> ResiliencePolicy:
+    """Makes a named policy's counters visible in `resilience_stats`."""
+    _registry[policy.name] = policy
+    return policy
+
+
+def resilience_stats() -> Dict[str, Any]:
+    return {name: policy.stats() for name, policy in _registry.items()}
@@ -0,0 +1,223 @@
+# utils/response_cache.py
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+def _is_error(value) -> bool:
+    return isinstance(value, dict) and "error" in value
+
+
+class ResponseCache:
+    """
+    Two-tier content-addressed store for agent responses: an in-memory LRU
+    and an optional on-disk tier (one JSON file per key).
+    """
+
+    def __init__(self, max_entries: int = 1024, disk_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_served = 0
+        self.evictions = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def get(self, key: str):
+        """Returns (value, stored_at) or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        if self.disk_dir and os.path.exists(self._disk_path(key)):
+            try:
+                with open(self._disk_path(key), "r") as f:
+                    record = json.load(f)
+                entry = (record["value"], record["stored_at"])
+                self._remember(key, entry)  # promote to the memory tier
+                return entry
+            except (OSError, ValueError, KeyError):
+                return None
+        return None
+
+    def put(self, key: str, value):
+        entry = (value, time.time())
+        self._remember(key, entry)
+        if self.disk_dir:
+            tmp_path = self._disk_path(key) + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"value": value, "stored_at": entry[1]}, f)
+            os.replace(tmp_path, self._disk_path(key))
+
+    def _remember(self, key: str, entry: tuple):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "disk_dir": self.disk_dir,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_served": self.stale_served,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Shared store for all agents; set RESPONSE_CACHE_DIR to enable the disk tier
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "1024")),
+    disk_dir=os.getenv("RESPONSE_CACHE_DIR") or None,
+)
+
+
+class AgentResponseCache:
+    """
+    Per-agent caching policy in front of a tool call.
+
+    Policy (from the agent's config.json `cache` block):
+        {
+            "enabled": true,
+            "ttl": 86400,                    # seconds an answer is fresh
+            "stale_while_revalidate": 3600   # extra seconds a stale answer may be served
+        }
+
+    A stale answer is returned immediately while a refresh runs in the
+    background; once past the stale window it is never served.
+    """
+
+    def __init__(self, agent_name: str, policy: Dict[str, Any], key_params: Dict[str, Any],
+                 store: ResponseCache = response_cache):
+        self.agent_name = agent_name
+        self.ttl = float(policy.get("ttl", 3600))
+        self.stale_ttl = float(policy.get("stale_while_revalidate", 0))
+        self.key_params = key_params
+        self.store = store
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+        self._background_tasks = set()
+
+    def make_key(self, input_data) -> str:
+        """Hash of agent name, (adapted) input, prompt template version and model params."""
+        payload = json.dumps(
+            {"agent": self.agent_name, "input": input_data, "params": self.key_params},
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _lookup(self, key: str):
+        """Returns (value, state) where state is 'fresh', 'stale' or 'expired', or None."""
+        entry = self.store.get(key)
+        if entry is None:
+            self.store.misses += 1
+            return None
+        value, stored_at = entry
+        age = time.time() - stored_at
+        if age <= self.ttl:
+            self.store.hits += 1
+            return value, "fresh"
+        self.store.misses += 1
+        return value, "stale" if age <= self.ttl + self.stale_ttl else "expired"
+
+    def peek(self, input_data):
+        """Returns a fresh cached value for this input, or None."""
+        cached = self._lookup(self.make_key(input_data))
+        return cached[0] if cached and cached[1] == "fresh" else None
+
+    def remember(self, input_data, value):
+        """Stores a value produced outside `call`/`acall` (e.g. by a stream)."""
+        if not _is_error(value):
+            self.store.put(self.make_key(input_data), value)
+
+    def _claim_refresh(self, key: str) -> bool:
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _finish_refresh(self, key: str, value):
+        if not _is_error(value):
+            self.store.put(key, value)
+        with self._refresh_lock:
+            self._refreshing.discard(key)
+
+    def call(self, input_data, compute: Callable[[Any], Any]):
+        key = self.make_key(input_data)
+        cached = self._lookup(key)
+
+        if cached and cached[1] == "fresh":
+            return cached[0]
+
+        if cached and cached[1] == "stale":
+            self.store.stale_served += 1
+            if self._claim_refresh(key):
+                def refresh():
+                    value = None
+                    try:
+                        value = compute(input_data)
+                    except Exception as e:
+                        value = {"error": str(e)}
+                    finally:
+                        self._finish_refresh(key, value)
+                threading.Thread(target=refresh, daemon=True).start()
+            return cached[0]
+
+        # Expired (or missing): an answer past its stale window is never served,
+        # not even when the fresh call fails
+        value = compute(input_data)
+        if not _is_error(value):
+            self.store.put(key, value)
+        return value
+
+    async def acall(self, input_data, compute: Callable[[Any], Awaitable[Any]]):
+        key = self.make_key(input_data)
+        cached = self._lookup(key)
+
+        if cached and cached[1] == "fresh":
+            return cached[0]
+
+        if cached and cached[1] == "stale":
+            self.store.stale_served += 1
+            if self._claim_refresh(key):
+                async def refresh():
+                    value = None
+                    try:
+                        value = await compute(input_data)
+                    except Exception as e:
+                        value = {"error": str(e)}
+                    finally:
+                        self._finish_refresh(key, value)
+                task = asyncio.create_task(refresh())
+                self._background_tasks.add(task)
+                task.add_done_callback(self._background_tasks.discard)
+            return cached[0]
+
+        # Expired (or missing): an answer past its stale window is never served,
+        # not even when the fresh call fails
+        value = await compute(input_data)
+        if not _is_error(value):
+            self.store.put(key, value)
+        return value
@@ -0,0 +1,87 @@
+# utils/retrieval.py
+#
+# Hybrid (BM25 + vector) retriever for the QA chain. Imported lazily by
+# utils/qa_chain.py, since it pulls in LangChain.
+
+import threading
+import weakref
+from typing import Any, List, Optional
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from utils.bm25 import BM25Index, LexicalReranker, reciprocal_rank_fusion
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Retrieves `fetch_k` chunks by vector similarity and `fetch_k` by BM25,
+    fuses the two rankings with reciprocal-rank fusion, optionally reranks
+    the fused candidates, and returns the best `k`.
+
+    Exact terms (clause numbers, SKUs, names) that embeddings blur are
+    caught by BM25, so a small `k` still finds them.
+    """
+
+    vectorstore: Any
+    lexical_index: Any
+    k: int = 4
+    fetch_k: int = 20
+    rrf_k: int = 60
+    reranker: Optional[Any] = None
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def _vector_positions(self, query: str) -> List[int]:
+        import numpy as np
+
+        vector = np.array([self.vectorstore.embeddings.embed_query(query)], dtype=np.float32)
+        if getattr(self.vectorstore, "_normalize_L2", False):
+            import faiss
+
+            faiss.normalize_L2(vector)
+        _, positions = self.vectorstore.index.search(vector, self.fetch_k)
+        return [int(pos) for pos in positions[0] if pos != -1]
+
+    def _document(self, position: int) -> Document:
+        return self.vectorstore.docstore.search(self.vectorstore.index_to_docstore_id[position])
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        lexical = [doc_id for doc_id, _ in self.lexical_index.search(query, self.fetch_k)]
+        fused = reciprocal_rank_fusion([self._vector_positions(query), lexical], k=self.rrf_k)
+        if self.reranker is not None:
+            candidates = [(pos, self._document(pos).page_content, score) for pos, score in fused[:self.fetch_k]]
+            fused = self.reranker.rerank(query, candidates)
+        return [self._document(pos) for pos, _ in fused[:self.k]]
+
+
+_lexical_indexes: "weakref.WeakKeyDictionary[Any, BM25Index]" = weakref.WeakKeyDictionary()
+_lexical_lock = threading.Lock()
+
+
+def lexical_index_for(vectorstore) -> BM25Index:
+    """
+    BM25 index over a FAISS store's chunks, in FAISS position order. Built
+    once per loaded store (utils.vector_store keeps recent stores loaded)
+    and dropped with it.
+    """
+    with _lexical_lock:
+        index = _lexical_indexes.get(vectorstore)
+    if index is None:
+        index = BM25Index(
+            vectorstore.docstore.search(vectorstore.index_to_docstore_id[pos]).page_content
+            for pos in range(len(vectorstore.index_to_docstore_id))
+        )
+        with _lexical_lock:
+            _lexical_indexes[vectorstore] = index
+    return index
+
+
+def make_reranker(name: str, index: BM25Index):
+    if name in ("", "none"):
+        return None
+    if name == "lexical":
+        return LexicalReranker(index)
+    raise ValueError(f"Unknown QA_RERANKER '{name}' (expected 'lexical' or 'none')")
@@ -1,13 +1,38 @@
 # utils/router.py
 
 import json
-from typing import List, Dict
-from langchain_openai import OpenAI
+from typing import Any, List, Dict
 import os 
 from dotenv import load_dotenv
+from utils.routing_index import RoutingIndex
+from utils.routing_cache import RoutingCache
+from utils.llm_client import get_llm
+from utils.concurrency import gather_bounded
+from utils.routing_cache import normalize_routing_key
+from utils.agent_registry import agent_registry
+from utils.resilience import ResiliencePolicy, register
 load_dotenv()
 openai_key = os.getenv("OPENAI_API_KEY")
 
+# Minimum local confidence (best score minus runner-up) needed to skip the LLM router
+ROUTER_CONFIDENCE_THRESHOLD = float(os.getenv("ROUTER_CONFIDENCE_THRESHOLD", "0.25"))
+
+_routing_indexes: Dict[tuple, RoutingIndex] = {}
+
+# Routing decisions are cached until the agent manifest or configs change
+routing_cache = RoutingCache(
+    max_size=int(os.getenv("ROUTER_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("ROUTER_CACHE_TTL", "3600")),
+)
+routing_cache.on_invalidate(_routing_indexes.clear)
+agent_registry.on_reload(routing_cache.invalidate)
+llm_calls_saved = 0
+
+# Deadline and retries for the LLM routing call
+ROUTER_TIMEOUT = float(os.getenv("ROUTER_TIMEOUT", "30"))
+ROUTER_RETRIES = int(os.getenv("ROUTER_RETRIES", "2"))
+router_policy = register(ResiliencePolicy(name="router", timeout=ROUTER_TIMEOUT, retries=ROUTER_RETRIES))
+
 def build_router_prompt(user_input: str, agents: List[Dict]) -> str:
     """
     Constructs a routing prompt with agent descriptions.
@@ -33,17 +58,128 @@ Respond with only a JSON object like:
 """
     return prompt.strip()
 
+def _router_llm():
+    # router_policy owns the retries, so the client must not retry on its own
+    return get_llm(model_name="gpt-3.5-turbo-instruct", temperature=0, max_retries=0 if ROUTER_RETRIES else None)
+
 def choose_agent(user_input: str, agents: List[Dict]) -> str:
     """
     Routes user input to the best matching agent.
     """
     prompt = build_router_prompt(user_input, agents)
-    llm = OpenAI(openai_api_key=openai_key, model_name="gpt-3.5-turbo-instruct", temperature=0)
-    result = llm.invoke(prompt).strip()
+    llm = _router_llm()
+    result = router_policy.call(llm.invoke, prompt).strip()
+    return _parse_selected_agent(result)
+
+async def achoose_agent(user_input: str, agents: List[Dict]) -> str:
+    """Async version of `choose_agent`."""
+    prompt = build_router_prompt(user_input, agents)
+    llm = _router_llm()
+    result = (await router_policy.acall(llm.ainvoke, prompt)).strip()
+    return _parse_selected_agent(result)
 
+def _parse_selected_agent(result: str) -> str:
     try:
         response = json.loads(result)
         return response.get("selected_agent", "")
     except Exception:
         return ""
 
+
+def get_routing_index(agents: List[Dict]) -> RoutingIndex:
+    """Returns the local routing index for this agent list, building it once."""
+    key = tuple(agent["name"] for agent in agents)
+    if key not in _routing_indexes:
+        _routing_indexes[key] = RoutingIndex(agents)
+    return _routing_indexes[key]
+
+def _route_without_llm(user_input, agents: List[Dict], threshold: float):
+    """
+    Tries the routing cache, then the local index.
+    Returns (decision or None, local confidence).
+    """
+    global llm_calls_saved
+
+    agent_registry.refresh()  # fires routing_cache.invalidate if configs changed
+    cached = routing_cache.get(user_input)
+    if cached is not None:
+        if cached["path"] == "llm":
+            llm_calls_saved += 1
+        return {**cached, "path": "cache"}, cached["confidence"]
+
+    threshold = ROUTER_CONFIDENCE_THRESHOLD if threshold is None else threshold
+    agent_name, confidence = get_routing_index(agents).route(user_input)
+
+    if agent_name and confidence >= threshold:
+        decision = {"agent": agent_name, "path": "local", "confidence": confidence}
+        routing_cache.put(user_input, decision)
+        return decision, confidence
+    return None, confidence
+
+def _llm_decision(user_input, agent_name: str, confidence: float) -> Dict[str, Any]:
+    decision = {"agent": agent_name, "path": "llm", "confidence": confidence}
+    if agent_name:
+        routing_cache.put(user_input, decision)
+    return decision
+
+def route(user_input: str | Dict[str, Any], agents: List[Dict], threshold: float = None) -> Dict[str, Any]:
+    """
+    Routes user input from the routing cache, then locally when the routing
+    index is confident enough, otherwise falls back to the LLM router.
+
+    Returns:
+        { "agent": "...", "path": "cache" | "local" | "llm", "confidence": 0.0-1.0 }
+    """
+    decision, confidence = _route_without_llm(user_input, agents, threshold)
+    if decision:
+        return decision
+
+    task_input = json.dumps(user_input) if isinstance(user_input, dict) else user_input
+    return _llm_decision(user_input, choose_agent(task_input, agents), confidence)
+
+async def aroute(user_input: str | Dict[str, Any], agents: List[Dict], threshold: float = None) -> Dict[str, Any]:
+    """Async version of `route`; only the LLM fallback is awaited."""
+    decision, confidence = _route_without_llm(user_input, agents, threshold)
+    if decision:
+        return decision
+
+    task_input = json.dumps(user_input) if isinstance(user_input, dict) else user_input
+    return _llm_decision(user_input, await achoose_agent(task_input, agents), confidence)
+
+async def aroute_batch(user_inputs: List[str | Dict[str, Any]], agents: List[Dict],
+                       concurrency: int = 8, threshold: float = None) -> List[Dict[str, Any]]:
+    """
+    Routes a whole batch before any agent runs. Cached and locally routable
+    inputs are resolved first; the rest share one LLM routing call per
+    distinct (normalized) input, run with bounded concurrency.
+    """
+    decisions: List[Dict[str, Any]] = [None] * len(user_inputs)
+    pending: Dict[str, List[int]] = {}
+    confidences: Dict[str, float] = {}
+
+    for idx, user_input in enumerate(user_inputs):
+        decision, confidence = _route_without_llm(user_input, agents, threshold)
+        if decision:
+            decisions[idx] = decision
+        else:
+            key = normalize_routing_key(user_input)
+            pending.setdefault(key, []).append(idx)
+            confidences[key] = confidence
+
+    async def route_with_llm(key):
+        user_input = user_inputs[pending[key][0]]
+        task_input = json.dumps(user_input) if isinstance(user_input, dict) else user_input
+        return _llm_decision(user_input, await achoose_agent(task_input, agents), confidences[key])
+
+    keys = list(pending)
+    results = await gather_bounded(keys, route_with_llm, concurrency)
+    for key, result in zip(keys, results):
+        if isinstance(result, BaseException):
+            result = {"agent": "", "path": "llm", "confidence": confidences[key], "error": str(result)}
+        for idx in pending[key]:
+            decisions[idx] = result
+    return decisions
+
+def routing_stats() -> Dict[str, Any]:
+    """Routing cache counters plus the number of LLM routing calls avoided."""
+    return {**routing_cache.stats(), "llm_calls_saved": llm_calls_saved}
@@ -0,0 +1,122 @@
+# utils/routing_cache.py
+
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_routing_key(user_input: str | Dict[str, Any]) -> str:
+    """
+    Builds the cache key for a routing decision.
+
+    Dict inputs (and strings that are JSON objects) are keyed by their set of
+    keys, which is what mostly decides the agent. Plain text is lowercased
+    with whitespace collapsed.
+    """
+    if isinstance(user_input, str):
+        stripped = user_input.strip()
+        if stripped.startswith("{"):
+            try:
+                user_input = json.loads(stripped)
+            except json.JSONDecodeError:
+                pass
+
+    if isinstance(user_input, dict):
+        return "keys:" + ",".join(sorted(str(k) for k in user_input.keys()))
+    return "text:" + WHITESPACE_PATTERN.sub(" ", str(user_input)).strip().lower()
+
+
+class RoutingCache:
+    """
+    Bounded LRU cache of routing decisions with a TTL.
+
+    The cache watches the agent manifest and is invalidated (firing any
+    registered hooks) when the file's mtime changes.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600, watch_path: str = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.watch_path = watch_path
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hooks: List[Callable[[], None]] = []
+        self._watched_mtime = self._current_mtime()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _current_mtime(self):
+        if not self.watch_path:
+            return None
+        try:
+            return os.path.getmtime(self.watch_path)
+        except OSError:
+            return None
+
+    def on_invalidate(self, hook: Callable[[], None]):
+        """Registers a callback fired whenever the cache is invalidated."""
+        self._hooks.append(hook)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+        for hook in self._hooks:
+            hook()
+
+    def _check_watched_file(self):
+        mtime = self._current_mtime()
+        if mtime != self._watched_mtime:
+            self._watched_mtime = mtime
+            print(f"[RoutingCache] {self.watch_path} changed, invalidating.")
+            self.invalidate()
+
+    def get(self, user_input: str | Dict[str, Any]):
+        self._check_watched_file()
+        key = normalize_routing_key(user_input)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, stored_at = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, user_input: str | Dict[str, Any], value):
+        key = normalize_routing_key(user_input)
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,99 @@
+# utils/routing_index.py
+
+import json
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+from utils.input_adapter import load_agent_manifest
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "for", "from",
+    "help", "i", "in", "is", "it", "me", "my", "of", "on", "or", "please", "the",
+    "this", "to", "with", "you", "your", "what", "want", "need", "would", "like",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercases text and splits it into word tokens (snake_case is split too)."""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+class RoutingIndex:
+    """
+    In-process TF-IDF index over agent configs, used to route clear-cut
+    queries without an LLM call.
+
+    Each agent's document is built from its config.json `description`,
+    `required_inputs` and optional `examples` utterances. Dict inputs are
+    scored by how well their keys match an agent's `required_inputs`
+    (or `routing_keys` for agents without required inputs).
+    """
+
+    def __init__(self, agents: List[Dict]):
+        self.agent_names = [a["name"] for a in agents]
+        self.key_signatures: Dict[str, set] = {}
+        documents: Dict[str, List[str]] = {}
+
+        for agent in agents:
+            config = {**agent, **load_agent_manifest(agent["name"])}
+            required = config.get("required_inputs") or config.get("routing_keys") or []
+            self.key_signatures[agent["name"]] = set(required)
+
+            parts = [config.get("description", ""), " ".join(required)]
+            parts.extend(config.get("examples", []))
+            documents[agent["name"]] = tokenize(" ".join(parts))
+
+        # Inverse document frequency over the agent documents
+        doc_freq = Counter()
+        for tokens in documents.values():
+            doc_freq.update(set(tokens))
+        n_docs = len(documents)
+        self.idf = {t: math.log((1 + n_docs) / (1 + df)) + 1 for t, df in doc_freq.items()}
+
+        self.vectors = {name: self._vectorize(tokens) for name, tokens in documents.items()}
+
+    def _vectorize(self, tokens: List[str]) -> Dict[str, float]:
+        counts = Counter(t for t in tokens if t in self.idf)
+        vector = {t: (1 + math.log(c)) * self.idf[t] for t, c in counts.items()}
+        norm = math.sqrt(sum(w * w for w in vector.values()))
+        return {t: w / norm for t, w in vector.items()} if norm else {}
+
+    def _score_text(self, text: str) -> Dict[str, float]:
+        query = self._vectorize(tokenize(text))
+        return {
+            name: sum(w * vector.get(t, 0.0) for t, w in query.items())
+            for name, vector in self.vectors.items()
+        }
+
+    def _score_keys(self, keys: set) -> Dict[str, float]:
+        scores = {}
+        for name, signature in self.key_signatures.items():
+            union = keys | signature
+            scores[name] = len(keys & signature) / len(union) if signature and union else 0.0
+        return scores
+
+    def score(self, user_input: str | Dict[str, Any]) -> List[Tuple[str, float]]:
+        """Returns (agent_name, score) pairs, best match first."""
+        scores = {}
+        if isinstance(user_input, dict):
+            scores = self._score_keys(set(user_input.keys()))
+            if not any(scores.values()):
+                scores = self._score_text(json.dumps(user_input))
+        else:
+            scores = self._score_text(str(user_input))
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+    def route(self, user_input: str | Dict[str, Any]) -> Tuple[str, float]:
+        """
+        Returns the best agent and a confidence in [0, 1], measured as the
+        margin between the best and the runner-up score.
+        """
+        ranked = self.score(user_input)
+        if not ranked or ranked[0][1] <= 0:
+            return "", 0.0
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        return ranked[0][0], ranked[0][1] - runner_up
@@ -0,0 +1,53 @@
+# utils/singleflight.py
+
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict
+
+
+def canonical_key(*parts) -> str:
+    """Stable hash of a request payload (dict key order does not matter)."""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """
+    Collapses identical concurrent async calls.
+
+    The first caller for a key (the leader) runs the call; callers that
+    arrive while it is in flight (followers) await the leader's result
+    instead of issuing their own call. Nothing is kept after completion.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.calls = 0
+        self.collapsed = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.collapsed += 1
+            # shield: a cancelled follower must not cancel the leader's call
+            return await asyncio.shield(task)
+
+        self.calls += 1
+        task = asyncio.ensure_future(fn())
+        self._in_flight[key] = task
+        task.add_done_callback(lambda t: self._finish(key, t))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every caller went away
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._in_flight),
+            "calls": self.calls,
+            "collapsed": self.collapsed,
+        }
@@ -0,0 +1,79 @@
+# utils/streaming.py
+
+import json
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from utils.resilience import current_policy, is_transient
+
+# Streaming events are plain dicts:
+#   {"event": "route",   "data": {...routing decision...}}
+#   {"event": "token",   "data": "<text chunk>"}
+#   {"event": "section", "data": {"name": "...", "content": "..."}}
+#   {"event": "result",  "data": <final parsed output>}
+#   {"event": "error",   "data": "<message>"}
+
+
+def sse_event(event: Dict[str, Any]) -> str:
+    """Formats a streaming event as a Server-Sent Events frame."""
+    return f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+class SectionTracker:
+    """
+    Emits a section as soon as it is complete, i.e. once the marker of the
+    following section has arrived (or the stream has ended).
+    """
+
+    def __init__(self, sections: List[Tuple[str, str]]):
+        self.sections = sections  # [(name, marker), ...] in expected order
+        self.emitted = set()
+
+    def _section_bounds(self, text: str, idx: int, final: bool):
+        name, marker = self.sections[idx]
+        start = text.find(marker)
+        if start < 0:
+            return None
+        start += len(marker)
+        for _, next_marker in self.sections[idx + 1:]:
+            end = text.find(next_marker, start)
+            if end >= 0:
+                return start, end
+        return (start, len(text)) if final else None
+
+    def feed(self, text: str, final: bool = False) -> List[Dict[str, str]]:
+        """Returns the sections that became complete with the text seen so far."""
+        completed = []
+        for idx, (name, _) in enumerate(self.sections):
+            if name in self.emitted:
+                continue
+            bounds = self._section_bounds(text, idx, final)
+            if bounds:
+                self.emitted.add(name)
+                completed.append({"name": name, "content": text[bounds[0]:bounds[1]].strip()})
+        return completed
+
+
+async def stream_completion(llm, prompt: str, parse_output: Callable[[str], Any],
+                            sections: Optional[List[Tuple[str, str]]] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Streams an LLM completion as token events (plus section events when
+    `sections` markers are given), then a final parsed result event.
+    """
+    tracker = SectionTracker(sections) if sections else None
+    text = ""
+    try:
+        async for chunk in llm.astream(prompt):
+            text += chunk
+            yield {"event": "token", "data": chunk}
+            if tracker:
+                for section in tracker.feed(text):
+                    yield {"event": "section", "data": section}
+
+        if tracker:
+            for section in tracker.feed(text, final=True):
+                yield {"event": "section", "data": section}
+        yield {"event": "result", "data": parse_output(text)}
+    except Exception as e:
+        if not text and is_transient(e) and current_policy() is not None:
+            raise  # nothing sent yet: let the policy running this stream retry it
+        yield {"event": "error", "data": str(e)}
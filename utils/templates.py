@@ -0,0 +1,117 @@
+# utils/templates.py
+#
+# The one placeholder syntax used by workflows, the CLI, the API and the
+# Streamlit app: `{{name}}` (whitespace inside the braces is allowed).
+# Single braces are plain text, so JSON or code in an input is left alone.
+# A string that is exactly one placeholder renders to the value itself
+# (a dict stays a dict); placeholders inside longer text are stringified,
+# dicts and lists as JSON.
+
+import json
+import re
+from collections.abc import Mapping
+from typing import Any, List, Set, Tuple, Union
+
+PLACEHOLDER = re.compile(r"\{\{\s*([A-Za-z_][\w]*)\s*\}\}")
+
+
+class StringTemplate:
+    """A string parsed once into literal chunks and placeholder names."""
+
+    __slots__ = ("source", "parts", "refs")
+
+    def __init__(self, source: str):
+        self.source = source
+        parts: List[Tuple[bool, str]] = []  # (is_placeholder, text or name)
+        last = 0
+        for match in PLACEHOLDER.finditer(source):
+            if match.start() > last:
+                parts.append((False, source[last:match.start()]))
+            parts.append((True, match.group(1)))
+            last = match.end()
+        if last < len(source):
+            parts.append((False, source[last:]))
+        self.parts = parts
+        self.refs = {text for is_ref, text in parts if is_ref}
+
+    def render(self, context: Mapping, strict: bool = True) -> Any:
+        if len(self.parts) == 1:
+            # "{{name}}" alone: pass the value through unchanged
+            name = self.parts[0][1]
+            try:
+                return context[name]
+            except KeyError:
+                if strict:
+                    raise
+                return self.source
+        out = []
+        for is_ref, text in self.parts:
+            if not is_ref:
+                out.append(text)
+                continue
+            try:
+                out.append(_to_text(context[text]))
+            except KeyError:
+                if strict:
+                    raise
+                out.append("{{" + text + "}}")  # leave unknown placeholders as written
+        return "".join(out)
+
+
+def _to_text(value) -> str:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+
+class Template:
+    """
+    A nested input (dicts, lists, strings, other values) compiled once.
+
+    Only strings that contain placeholders become `StringTemplate`s;
+    everything else is returned as-is by `render`, so rendering is a
+    single substitution pass over the referenced keys.
+    """
+
+    __slots__ = ("tree", "refs")
+
+    def __init__(self, data: Any):
+        self.refs: Set[str] = set()
+        self.tree = self._compile(data)
+
+    def _compile(self, data):
+        if isinstance(data, dict):
+            return {k: self._compile(v) for k, v in data.items()}
+        if isinstance(data, list):
+            return [self._compile(item) for item in data]
+        if isinstance(data, str) and "{{" in data:
+            template = StringTemplate(data)
+            if template.refs:
+                self.refs |= template.refs
+                return template
+        return data
+
+    def render(self, context: Mapping, strict: bool = True):
+        return self._render(self.tree, context, strict)
+
+    def _render(self, node, context, strict):
+        if isinstance(node, StringTemplate):
+            return node.render(context, strict)
+        if isinstance(node, dict):
+            return {k: self._render(v, context, strict) for k, v in node.items()}
+        if isinstance(node, list):
+            return [self._render(item, context, strict) for item in node]
+        return node
+
+
+def compile_template(data: Any) -> Template:
+    return Template(data)
+
+
+def render(data: Union[Any, Template], context: Mapping, strict: bool = True):
+    """
+    Renders `data` (raw or already compiled) against `context`. With
+    strict=False unknown placeholders are left in place instead of raising KeyError.
+    """
+    template = data if isinstance(data, Template) else Template(data)
+    return template.render(context, strict)
@@ -1,31 +1,443 @@
 # utils/vector_store.py
 
-# Updated import for modern LangChain
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import FAISS
-from langchain_openai import OpenAIEmbeddings
-from typing import Tuple
-from dotenv import load_dotenv
+import contextlib
+import hashlib
+import json
 import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from dotenv import load_dotenv
+from utils.embedding_cache import embedding_cache, chunk_hash, EMBEDDING_CACHE
+from utils.pdf_reader import file_hash, iter_pdf_pages
+from utils.resilience import ResiliencePolicy, register
 
-load_dotenv()  
+load_dotenv()
 openai_key = os.getenv("OPENAI_API_KEY")
 
-def embed_and_store(text: str) -> Tuple[FAISS, list]:
+# Splitter / embedding settings; changing any of them gives documents a new index key
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "500"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "50"))
+
+# Embedding pipeline: texts per API call, concurrent calls, per-call budget
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_MAX_IN_FLIGHT = int(os.getenv("EMBEDDING_MAX_IN_FLIGHT", "4"))
+embedding_policy = register(ResiliencePolicy(
+    name="embeddings",
+    timeout=float(os.getenv("EMBEDDING_TIMEOUT", "120")),
+    retries=int(os.getenv("EMBEDDING_RETRIES", "5")),
+    backoff_base=1.0,
+    backoff_max=30.0,
+))
+
+# On-disk FAISS index cache; set VECTOR_INDEX_CACHE=0 to rebuild on every call
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", ".vector_indexes")
+VECTOR_INDEX_CACHE = os.getenv("VECTOR_INDEX_CACHE", "1") == "1"
+VECTOR_INDEX_MAX_BYTES = int(os.getenv("VECTOR_INDEX_MAX_BYTES", str(1024 * 1024 * 1024)))  # 0 = unbounded
+# Recently used indexes kept loaded in this process
+VECTOR_INDEX_MEMORY_ENTRIES = int(os.getenv("VECTOR_INDEX_MEMORY_ENTRIES", "4"))
+
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+
+
+def splitter_config() -> Dict[str, Any]:
+    return {"splitter": "recursive_character", "chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP, "paged": True}
+
+
+def embedding_config() -> Dict[str, Any]:
+    from utils.embeddings import backend_id
+
+    return {"backend": backend_id()}
+
+
+def index_key(content_hash: str) -> str:
+    """Cache key of a document's index: its content hash plus splitter and embedding config."""
+    payload = json.dumps(
+        {"content": content_hash, "splitter": splitter_config(), "embedding": embedding_config()},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _splitter():
+    # Deferred so importing this module stays cheap (LangChain)
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    return RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+
+
+def split_text(text: str) -> List[str]:
+    return _splitter().split_text(text)
+
+
+def split_pages(pages: Iterable[str], window: int = 16) -> Iterable[str]:
+    """
+    Splits a stream of page texts into chunks as pages arrive.
+
+    Pages are buffered until about `window` chunks' worth of text is
+    available; every chunk but the last is emitted and the last one is
+    carried into the next buffer, so no chunk is cut at a buffer boundary.
+    """
+    splitter = _splitter()
+    buffer = ""
+    for text in pages:
+        buffer = f"{buffer}\n{text}" if buffer else text
+        if len(buffer) < window * CHUNK_SIZE:
+            continue
+        chunks = splitter.split_text(buffer)
+        yield from chunks[:-1]
+        buffer = chunks[-1] if chunks else ""
+    if buffer.strip():
+        yield from splitter.split_text(buffer.strip())
+
+
+def _batched(items: Iterable, size: int) -> Iterator[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class EmbeddingPipeline:
+    """
+    Embeds a stream of (key, text) items in batches of `batch_size`, with
+    up to `max_in_flight` batches being embedded at once.
+
+    Items are pulled lazily, so batches start embedding while the producer
+    (PDF extraction, splitting) is still running. Each batch call goes
+    through a `ResiliencePolicy` (deadline, jittered retries that honor
+    Retry-After on rate limits). `progress(done, total)` is called after
+    every batch; `total` is None while the stream is still open.
+    """
+
+    def __init__(self, backend=None, batch_size: int = EMBEDDING_BATCH_SIZE,
+                 max_in_flight: int = EMBEDDING_MAX_IN_FLIGHT, policy: Optional[ResiliencePolicy] = None,
+                 progress: Optional[Callable[[int, Optional[int]], None]] = None):
+        from utils.embeddings import get_embedding_backend
+
+        self.policy = policy or embedding_policy
+        # The policy retries each batch, so the default client must not retry on its own as well
+        self.backend = backend or get_embedding_backend(max_retries=0 if self.policy.retries else None)
+        self.batch_size = max(1, batch_size)
+        self.max_in_flight = max(1, max_in_flight)
+        self.progress = progress
+
+    def _embed_batch(self, batch: List[Tuple[str, str]]) -> Dict[str, List[float]]:
+        keys = [key for key, _ in batch]
+        vectors = self.policy.call(self.backend.embed_documents, [text for _, text in batch])
+        if len(vectors) != len(keys):
+            raise RuntimeError(f"Embedding backend returned {len(vectors)} vectors for {len(keys)} texts")
+        return dict(zip(keys, vectors))
+
+    def run(self, items: Iterable[Tuple[str, str]],
+            on_batch: Optional[Callable[[Dict[str, List[float]]], None]] = None) -> Dict[str, List[float]]:
+        """Returns {key: vector}; `on_batch` receives each finished batch (e.g. to cache it)."""
+        results: Dict[str, List[float]] = {}
+        submitted = 0
+
+        def collect(futures):
+            for future in futures:
+                vectors = future.result()
+                results.update(vectors)
+                if on_batch is not None:
+                    on_batch(vectors)
+                if self.progress is not None:
+                    self.progress(len(results), None if streaming else submitted)
+
+        with ThreadPoolExecutor(self.max_in_flight) as pool:
+            in_flight = set()
+            streaming = True
+            for batch in _batched(items, self.batch_size):
+                if len(in_flight) >= self.max_in_flight:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(finished)
+                in_flight.add(pool.submit(self._embed_batch, batch))
+                submitted += len(batch)
+            streaming = False
+            while in_flight:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(finished)
+        return results
+
+
+def embed_chunks(chunks: Iterable[str], backend=None,
+                 progress: Optional[Callable[[int, Optional[int]], None]] = None
+                 ) -> Tuple[List[Tuple[str, List[float]]], Dict[str, int]]:
+    """
+    Returns (text, vector) pairs in chunk order plus a report
+    {"chunks", "embedded", "reused"}.
+
+    Vectors come from `embedding_cache` where possible; only chunks whose
+    text (for this backend) was never embedded before go through the
+    `EmbeddingPipeline`, each distinct text once. `chunks` may be a lazy
+    stream: cache lookups and embedding start before it is exhausted.
+    """
+    from utils.embeddings import backend_id
+
+    pipeline = EmbeddingPipeline(backend, progress=progress)
+    model = backend_id()
+    ordered: List[Tuple[str, str]] = []
+    vectors: Dict[str, List[float]] = {}
+    reused = 0
+
+    def missing():
+        nonlocal reused
+        queued = set()
+        for block in _batched(chunks, pipeline.batch_size):
+            hashes = [chunk_hash(chunk) for chunk in block]
+            ordered.extend(zip(hashes, block))
+            if EMBEDDING_CACHE:
+                vectors.update(embedding_cache.get_many(model, hashes))
+            for digest, chunk in zip(hashes, block):
+                if digest in vectors:
+                    reused += 1
+                elif digest not in queued:
+                    queued.add(digest)
+                    yield digest, chunk
+
+    save = (lambda fresh: embedding_cache.put_many(model, fresh)) if EMBEDDING_CACHE else None
+    fresh = pipeline.run(missing(), on_batch=save)
+    vectors.update(fresh)
+
+    report = {"chunks": len(ordered), "embedded": len(fresh), "reused": reused}
+    print(f"[VectorStore] Embedded {report['embedded']} chunk(s), reused {reused} cached vector(s)")
+    return [(chunk, vectors[digest]) for digest, chunk in ordered], report
+
+
+def build_index(chunks: Iterable[str], progress: Optional[Callable[[int, Optional[int]], None]] = None
+                ) -> Tuple["FAISS", Dict[str, int]]:
+    """Builds a FAISS index over `chunks` from cached + newly embedded vectors."""
+    # Deferred so importing this module stays cheap (FAISS, LangChain)
+    from langchain_community.vectorstores import FAISS
+    from utils.embeddings import get_embedding_backend
+
+    pairs, report = embed_chunks(chunks, progress=progress)
+    # Query-time embeddings are not under the pipeline's policy, so this client keeps its retries
+    vectorstore = FAISS.from_embeddings(pairs, get_embedding_backend())
+    return vectorstore, report
+
+
+def embed_and_store(text: str) -> Tuple["FAISS", list]:
     """
     Splits text into chunks, embeds them, and stores them in a FAISS vector store.
-    
+
     Returns:
         - vectorstore: the FAISS vector DB
         - chunks: original text chunks (for debug)
     """
     # 1. Split text
-    splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-    chunks = splitter.split_text(text)
-    
-    # 2. Embed chunks
- 
-    embeddings = OpenAIEmbeddings(openai_api_key=openai_key)
-    vectorstore = FAISS.from_texts(chunks, embeddings)
-    
+    chunks = split_text(text)
+
+    # 2. Embed chunks (unchanged chunks reuse their cached vectors)
+    vectorstore, _ = build_index(chunks)
+
     return vectorstore, chunks
+
+
+def pdf_chunks(pdf_path: str, digest: Optional[str] = None) -> Iterator[str]:
+    """Chunks of a PDF, produced while its pages are still being extracted. `digest`: its file_hash, if known."""
+    return split_pages(text for _, text in iter_pdf_pages(pdf_path, digest=digest))
+
+
+class VectorIndexCache:
+    """
+    Saved FAISS indexes, one directory per index key:
+
+        <directory>/<key>/index.faiss   vectors
+        <directory>/<key>/index.pkl     docstore (chunk texts + metadata)
+        <directory>/<key>/meta.json     source path, chunk count, configs
+
+    Entries are written to a temp directory and renamed into place, so a
+    crashed build never leaves a half-written index. When the total size
+    exceeds `max_bytes` the least recently used entries are deleted. The
+    last `memory_entries` indexes also stay loaded, so repeated questions
+    about one document skip deserialization.
+    """
+
+    def __init__(self, directory: str = VECTOR_INDEX_DIR, max_bytes: int = VECTOR_INDEX_MAX_BYTES,
+                 memory_entries: int = VECTOR_INDEX_MEMORY_ENTRIES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self._loaded: "OrderedDict[str, FAISS]" = OrderedDict()
+        self._lock = threading.Lock()
+        # key -> (lock, number of callers holding or waiting for it); dropped when unused
+        self._key_locks: Dict[str, Tuple[threading.Lock, int]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    @contextlib.contextmanager
+    def key_lock(self, key: str):
+        """Per-key lock so concurrent questions about one document build its index once."""
+        with self._lock:
+            lock, users = self._key_locks.get(key) or (threading.Lock(), 0)
+            self._key_locks[key] = (lock, users + 1)
+        try:
+            with lock:
+                yield
+        finally:
+            with self._lock:
+                users = self._key_locks[key][1] - 1
+                if users:
+                    self._key_locks[key] = (lock, users)
+                else:
+                    del self._key_locks[key]
+
+    def load(self, key: str) -> Optional["FAISS"]:
+        from langchain_community.vectorstores import FAISS
+        from utils.embeddings import get_embedding_backend
+
+        path = self._path(key)
+        with self._lock:
+            vectorstore = self._loaded.get(key)
+            if vectorstore is not None:
+                self._loaded.move_to_end(key)
+        if vectorstore is not None and os.path.exists(os.path.join(path, "meta.json")):
+            os.utime(os.path.join(path, "meta.json"))
+            with self._lock:
+                self.hits += 1
+            return vectorstore
+
+        if not os.path.exists(os.path.join(path, "meta.json")):
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            # Only our own files are unpickled (the docstore written by `save`)
+            vectorstore = FAISS.load_local(path, get_embedding_backend(), allow_dangerous_deserialization=True)
+        except Exception as e:
+            print(f"[VectorStore] Discarding unreadable index {key[:12]}: {e}")
+            shutil.rmtree(path, ignore_errors=True)
+            with self._lock:
+                self.misses += 1
+            return None
+        os.utime(os.path.join(path, "meta.json"))  # mark as recently used
+        with self._lock:
+            self.hits += 1
+        self._keep_loaded(key, vectorstore)
+        return vectorstore
+
+    def _keep_loaded(self, key: str, vectorstore: "FAISS"):
+        with self._lock:
+            self._loaded[key] = vectorstore
+            self._loaded.move_to_end(key)
+            while len(self._loaded) > self.memory_entries:
+                self._loaded.popitem(last=False)
+
+    def save(self, key: str, vectorstore: "FAISS", meta: Dict[str, Any]):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self._path(key) + f".{os.getpid()}.{threading.get_ident()}.tmp"
+        vectorstore.save_local(tmp_path)
+        with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+            json.dump({**meta, "key": key, "stored_at": time.time()}, f)
+        shutil.rmtree(self._path(key), ignore_errors=True)
+        os.replace(tmp_path, self._path(key))
+        self._keep_loaded(key, vectorstore)
+        self.evict()
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Saved indexes with their size and last use, least recently used first."""
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for name in os.listdir(self.directory):
+            meta_path = os.path.join(self._path(name), "meta.json")
+            if name.endswith(".tmp") or not os.path.exists(meta_path):
+                continue
+            try:
+                with open(meta_path, "r") as f:
+                    meta = json.load(f)
+                size = sum(entry.stat().st_size for entry in os.scandir(self._path(name)))
+                entries.append({**meta, "key": name, "bytes": size, "last_used": os.path.getmtime(meta_path)})
+            except (OSError, ValueError):
+                continue
+        return sorted(entries, key=lambda entry: entry["last_used"])
+
+    def evict(self) -> int:
+        if not self.max_bytes:
+            return 0
+        entries = self.entries()
+        total = sum(entry["bytes"] for entry in entries)
+        removed = 0
+        for entry in entries[:-1]:  # never evict the most recent index
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(self._path(entry["key"]), ignore_errors=True)
+            with self._lock:
+                self._loaded.pop(entry["key"], None)
+            total -= entry["bytes"]
+            removed += 1
+            print(f"[VectorStore] Evicted index {entry['key'][:12]} ({entry.get('source')})")
+        with self._lock:
+            self.evictions += removed
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self.entries()
+        return {
+            "directory": self.directory,
+            "indexes": len(entries),
+            "bytes": sum(entry["bytes"] for entry in entries),
+            "max_bytes": self.max_bytes,
+            "loaded": len(self._loaded),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+index_cache = VectorIndexCache()
+
+
+def load_or_build_index(pdf_path: str, progress: Optional[Callable[[int, Optional[int]], None]] = None
+                        ) -> Tuple["FAISS", Dict[str, Any]]:
+    """
+    Returns the FAISS index of a PDF, loading it from `index_cache` when this
+    exact file was already indexed with the current splitter/embedding config.
+    Only on a miss is the PDF extracted, split and embedded, as one stream:
+    pages are split as they come out of the extraction pool and chunks are
+    embedded in batches while later pages are still being parsed.
+
+    Returns (vectorstore, info) where info has "key", "cached", "chunks"
+    and how many chunks were "embedded" vs "reused" from the embedding cache.
+    """
+    started = time.perf_counter()
+    # Hashed once: the same digest keys the index and the page cache
+    digest = file_hash(pdf_path)
+    key = index_key(digest)
+
+    if not VECTOR_INDEX_CACHE:
+        vectorstore, report = build_index(pdf_chunks(pdf_path, digest), progress)
+        return vectorstore, {"key": key, "cached": False, **report}
+
+    with index_cache.key_lock(key):
+        vectorstore = index_cache.load(key)
+        if vectorstore is not None:
+            chunks = len(vectorstore.index_to_docstore_id)
+            info = {"key": key, "cached": True, "chunks": chunks, "embedded": 0, "reused": chunks}
+        else:
+            vectorstore, report = build_index(pdf_chunks(pdf_path, digest), progress)
+            info = {"key": key, "cached": False, **report}
+            index_cache.save(key, vectorstore, {
+                "source": os.path.abspath(pdf_path),
+                "splitter": splitter_config(),
+                "embedding": embedding_config(),
+                **report,
+            })
+
+    elapsed = time.perf_counter() - started
+    print(f"[VectorStore] {'Loaded' if info['cached'] else 'Built'} index for {pdf_path} "
+          f"({info['chunks']} chunks) in {elapsed*1000:.0f} ms")
+    return vectorstore, {**info, "seconds": elapsed}
@@ -0,0 +1,200 @@
+# utils/workflow_dag.py
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from utils.templates import compile_template
+from utils.resilience import ResiliencePolicy, POLICY_KEYS
+
+# How many compiled workflow plans are kept (keyed by workflow hash)
+WORKFLOW_PLAN_CACHE_SIZE = int(os.getenv("WORKFLOW_PLAN_CACHE_SIZE", "128"))
+
+
+class WorkflowError(ValueError):
+    """A workflow definition that cannot be executed (unknown reference, cycle, ...)."""
+
+
+class WorkflowStep:
+    """
+    One step of a workflow plus the steps it must wait for.
+
+    A step with "type": "map" runs its agent once per element of the list
+    named by "over"; inside its input the element is `{{item}}` (renamed
+    with "as"). Without an "input" each element is passed to the agent as is:
+
+        {"type": "map", "agent": "resume_analyzer_agent", "over": "resumes",
+         "input": {"resume_text": "{{item}}", "job_description": "{{jd}}"},
+         "output_key": "analyses", "concurrency": 8, "stream": true}
+
+    Any step may set "timeout", "retries", "hedge" (and the other keys of
+    `ResiliencePolicy`) to bound each call of its agent; for a map step the
+    budget applies per item. These keys override the agent's own policy
+    for the step rather than adding a second layer of retries.
+    """
+
+    def __init__(self, index: int, definition: Dict[str, Any]):
+        self.index = index
+        self.definition = definition
+        self.kind = definition.get("type", "agent")
+        self.agent = definition.get("agent")
+        if self.kind == "map" and "input" not in definition:
+            self.input = "{{" + definition.get("as", "item") + "}}"
+        else:
+            self.input = definition.get("input", {})
+        self.output_key = definition.get("output_key", f"output_{index+1}")
+        self.step_id = definition.get("id", self.output_key)
+        self.template = compile_template(self.input)
+        self.refs = set(self.template.refs)
+        if self.kind == "map":
+            if not definition.get("over"):
+                raise WorkflowError(f"{self.label}: a map step needs 'over' (the context key of a list)")
+            self.over = definition["over"]
+            self.item_var = definition.get("as", "item")
+            self.refs.discard(self.item_var)
+            self.refs.add(self.over)
+        elif self.kind != "agent":
+            raise WorkflowError(f"{self.label}: unknown step type '{self.kind}'")
+        self.deps: Set[int] = set()
+        self.policy_settings = {key: definition[key] for key in POLICY_KEYS if key in definition}
+        # Lives on the cached plan, so latency samples (for hedging) accumulate across runs
+        self._policy = None
+
+    def policy_for(self, agent) -> Optional[ResiliencePolicy]:
+        """The agent's policy with this step's overrides, or None when the step sets none."""
+        if not self.policy_settings:
+            return None
+        if self._policy is None:
+            base = getattr(agent, "resilience", None)
+            if base is not None:
+                self._policy = base.override(self.policy_settings, name=self.label)
+            else:
+                self._policy = ResiliencePolicy.from_config(self.policy_settings, name=self.label, use_defaults=False)
+        return self._policy
+
+    @property
+    def label(self) -> str:
+        return f"Step {self.index+1} ({self.agent})"
+
+
+class WorkflowPlan:
+    """
+    Dependency graph of a workflow's steps.
+
+    A step depends on:
+      * the step producing each placeholder it references (the nearest
+        earlier producer, else a later one),
+      * every step named in its optional `depends_on` (by `id` or `output_key`),
+      * for output keys that are overwritten, the previous writer and every
+        reader of the previous value, so results match running the steps
+        in order.
+
+    Placeholders that no step produces must be in the initial context or,
+    checked per run by `validate`, in memory. Unknown references and cycles
+    raise `WorkflowError` before anything runs.
+    """
+
+    def __init__(self, steps: List[Dict[str, Any]], context_keys: Iterable[str]):
+        self.steps = [WorkflowStep(idx, step) for idx, step in enumerate(steps)]
+        self.external: Dict[str, str] = {}  # ref -> label of the first step that needs it from memory
+        context_keys = set(context_keys)
+
+        producers: Dict[str, List[int]] = {}
+        for step in self.steps:
+            producers.setdefault(step.output_key, []).append(step.index)
+        by_id = {step.step_id: step.index for step in self.steps}
+        by_id.update({step.output_key: step.index for step in self.steps})
+
+        for step in self.steps:
+            for ref in step.refs:
+                earlier = [i for i in producers.get(ref, []) if i < step.index]
+                later = [i for i in producers.get(ref, []) if i > step.index]
+                if earlier:
+                    step.deps.add(earlier[-1])
+                elif ref in context_keys:
+                    continue
+                elif later:
+                    step.deps.add(later[0])
+                else:
+                    self.external.setdefault(ref, step.label)
+
+            for dep in step.definition.get("depends_on", []):
+                if dep not in by_id:
+                    raise WorkflowError(f"{step.label} depends on unknown step '{dep}'")
+                step.deps.add(by_id[dep])
+
+        # Overwrites of the same key keep their sequential order
+        for key, writers in producers.items():
+            first = self.steps[writers[0]]
+            for reader in self.steps[:first.index]:
+                # Earlier readers of an initial/memory value run before it is overwritten
+                if key in reader.refs and first.index not in reader.deps:
+                    first.deps.add(reader.index)
+            for prev, nxt in zip(writers, writers[1:]):
+                self.steps[nxt].deps.add(prev)
+                for reader in self.steps:
+                    if key in reader.refs and prev in reader.deps and prev < reader.index < nxt:
+                        self.steps[nxt].deps.add(reader.index)
+
+        self.order = self._topological_order()
+
+    def validate(self, memory=None):
+        """Raises `WorkflowError` if a reference resolved from memory is missing there."""
+        for ref, label in self.external.items():
+            if memory is None or memory.get(ref) is None:
+                raise WorkflowError(f"{label} references unknown key '{ref}'")
+
+    def _topological_order(self) -> List[int]:
+        remaining = {step.index: set(step.deps) for step in self.steps}
+        order = []
+        while remaining:
+            ready = sorted(idx for idx, deps in remaining.items() if not deps)
+            if not ready:
+                cycle = ", ".join(self.steps[idx].label for idx in sorted(remaining))
+                raise WorkflowError(f"Workflow has a dependency cycle between: {cycle}")
+            for idx in ready:
+                del remaining[idx]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+            order.extend(ready)
+        return order
+
+    def ready(self, done: Set[int], started: Set[int]) -> List["WorkflowStep"]:
+        """Steps whose dependencies are all done, in definition order."""
+        return [
+            step for step in self.steps
+            if step.index not in started and step.deps <= done
+        ]
+
+
+_plan_cache: "OrderedDict[str, WorkflowPlan]" = OrderedDict()
+_plan_lock = threading.Lock()
+
+
+def workflow_hash(steps: List[Dict[str, Any]], context_keys: Iterable[str]) -> str:
+    payload = json.dumps({"steps": steps, "context": sorted(context_keys)}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def compile_workflow(steps: List[Dict[str, Any]], context_keys: Iterable[str]) -> WorkflowPlan:
+    """
+    Parses every step's templates and builds the dependency graph once per
+    distinct workflow; later runs of the same workflow reuse the cached plan.
+    """
+    context_keys = list(context_keys)
+    key = workflow_hash(steps, context_keys)
+    with _plan_lock:
+        plan = _plan_cache.get(key)
+        if plan is not None:
+            _plan_cache.move_to_end(key)
+            return plan
+
+    plan = WorkflowPlan(steps, context_keys)
+    with _plan_lock:
+        _plan_cache[key] = plan
+        while len(_plan_cache) > WORKFLOW_PLAN_CACHE_SIZE:
+            _plan_cache.popitem(last=False)
+    return plan